@@ -0,0 +1,31 @@
+from rest_framework import authentication, exceptions
+
+from core.api.keys import lookup_user
+
+
+class ApiKeyAuthentication(authentication.BaseAuthentication):
+    """
+    Authenticates `Authorization: Api-Key <key>` requests with the keys
+    issued by the api_key command. `request.auth` is the key's prefix.
+    """
+
+    keyword = "Api-Key"
+
+    def authenticate(self, request):
+        auth = authentication.get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed("Cabecera Api-Key inválida.")
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed("Cabecera Api-Key inválida.")
+
+        user = lookup_user(key)
+        if user is None:
+            raise exceptions.AuthenticationFailed("Clave de API inválida o revocada.")
+        return (user, key.split(".", 1)[0])
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,187 @@
+"""
+Bulk writes for the product catalog and supplier deliveries.
+
+A batch is validated as a whole before anything is written; the affected
+products are locked once, in pk order, and saved with `bulk_update` /
+`bulk_create` in a single transaction. Those skip model signals, so the
+catalog version and the sync change log are updated here.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from core.apps.backoffice.changelog import record_changes
+from core.apps.backoffice.models import Category, Product, SupplyEntry
+from core.apps.backoffice.versioning import bump_version
+
+
+class BatchError(Exception):
+    """Carries the per-row errors of a rejected batch."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+class ProductBatchSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(min_value=1, required=False)
+    category = serializers.IntegerField(
+        source="category_id", min_value=1, required=False, allow_null=True
+    )
+
+    class Meta:
+        model = Product
+        exclude = ["updated_at"]
+
+
+class SupplyBatchSerializer(serializers.ModelSerializer):
+    product = serializers.IntegerField(source="product_id", min_value=1)
+
+    class Meta:
+        model = SupplyEntry
+        fields = ["product", "quantity", "unit_cost", "supplier"]
+        extra_kwargs = {
+            "quantity": {"min_value": 1},
+            "unit_cost": {"min_value": Decimal("0")},
+        }
+
+
+def validate_rows(rows, make_serializer):
+    """
+    Runs `make_serializer(row)` over every row. Returns the validated data
+    (None for invalid rows) and one error dict per row (empty when valid).
+    """
+    errors = []
+    validated = []
+    for row in rows:
+        serializer = make_serializer(row)
+        if serializer.is_valid():
+            validated.append(serializer.validated_data)
+            errors.append({})
+        else:
+            validated.append(None)
+            errors.append(dict(serializer.errors))
+    return validated, errors
+
+
+def lock_products(pks, select_related=()):
+    """Locks the products in pk order so concurrent batches can't deadlock."""
+    queryset = (
+        Product.objects.filter(pk__in=pks)
+        .select_related(*select_related)
+        .select_for_update(of=("self",))
+        .order_by("pk")
+    )
+    return {product.pk: product for product in queryset}
+
+
+def upsert_products(rows):
+    """
+    Creates the rows without `id` and partially updates the ones with it.
+    Returns the saved products in the order of `rows`.
+    """
+    validated, errors = validate_rows(
+        rows,
+        lambda row: ProductBatchSerializer(
+            data=row, partial=isinstance(row, dict) and "id" in row
+        ),
+    )
+
+    valid = [data for data in validated if data is not None]
+    category_ids = {data["category_id"] for data in valid if data.get("category_id")}
+    categories = Category.objects.in_bulk(category_ids)
+
+    with transaction.atomic():
+        update_ids = {data["id"] for data in valid if "id" in data}
+        locked = lock_products(update_ids, select_related=["category"])
+        for data, row_errors in zip(validated, errors):
+            if data is None:
+                continue
+            if data.get("category_id") and data["category_id"] not in categories:
+                row_errors["category"] = ["Categoría inexistente."]
+            if "id" in data and data["id"] not in locked:
+                row_errors["id"] = ["Producto inexistente."]
+        if any(errors):
+            raise BatchError(errors)
+
+        now = timezone.now()
+        products = []
+        created = []
+        update_fields = {"updated_at"}
+        for data in validated:
+            data = dict(data)
+            product = locked[data.pop("id")] if "id" in data else Product()
+            for name, value in data.items():
+                setattr(product, name, value)
+            if "category_id" in data:
+                product.category = categories.get(data["category_id"])
+            if product.pk is None:
+                created.append(product)
+            else:
+                product.updated_at = now
+                update_fields.update(
+                    "category" if name == "category_id" else name for name in data
+                )
+            products.append(product)
+
+        Product.objects.bulk_create(created)
+        if locked:
+            Product.objects.bulk_update(locked.values(), sorted(update_fields))
+
+        touched = {product.pk for product in products}
+        record_changes(Product, sorted(touched))
+        bump_version(Product)
+    return products
+
+
+def receive_supplies(rows, user):
+    """
+    Records a supplier delivery: one SupplyEntry per row, with the stock
+    and weighted average cost of each product updated once for all of its
+    lines. Returns the created entries in the order of `rows`.
+    """
+    validated, errors = validate_rows(
+        rows, lambda row: SupplyBatchSerializer(data=row)
+    )
+
+    with transaction.atomic():
+        products = lock_products(
+            {data["product_id"] for data in validated if data is not None}
+        )
+        for data, row_errors in zip(validated, errors):
+            if data is None:
+                continue
+            product = products.get(data["product_id"])
+            if product is None:
+                row_errors["product"] = ["Producto inexistente."]
+            elif product.is_service:
+                # Product.receive_supplies() refuses them; report it per row.
+                row_errors["product"] = [Product.SERVICE_STOCK_ERROR]
+        if any(errors):
+            raise BatchError(errors)
+
+        lines = defaultdict(list)
+        entries = []
+        for data in map(dict, validated):
+            product = products[data.pop("product_id")]
+            lines[product.pk].append((data["quantity"], data["unit_cost"]))
+            entries.append(SupplyEntry(product=product, created_by=user, **data))
+
+        now = timezone.now()
+        for pk, product_lines in lines.items():
+            products[pk].receive_supplies(product_lines)
+            products[pk].updated_at = now
+
+        Product.objects.bulk_update(
+            products.values(), ["stock_qty", "cost", "updated_at"]
+        )
+        # Bypasses SupplyEntry.save(), which would update the stock again.
+        SupplyEntry.objects.bulk_create(entries)
+
+        record_changes(Product, sorted(products))
+        bump_version(Product)
+    return entries
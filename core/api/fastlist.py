@@ -0,0 +1,148 @@
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField
+from rest_framework.response import Response
+
+COMPUTED, MANY, VALUE = range(3)
+
+CONVERTED_FIELDS = (
+    serializers.DecimalField,
+    serializers.DateTimeField,
+    serializers.DateField,
+    serializers.TimeField,
+)
+
+
+def full_name(first_name, last_name):
+    """Mirrors User.get_full_name() for values() rows."""
+    return f"{first_name} {last_name}".strip()
+
+
+def display(choices):
+    """Returns a converter mirroring get_FOO_display() for `choices`."""
+    labels = dict(choices)
+    return lambda value: str(labels.get(value, value))
+
+
+class ValuesPlan:
+    """
+    Precomputed mapping from a ModelSerializer's fields to `values()`
+    lookups, so rows can be rendered straight from dicts in the same shape
+    (and field order) the serializer would produce.
+
+    `computed` maps a field name to `(lookups, func)` for fields backed by
+    methods; `func` receives the looked-up values in order. Nested many
+    fields are left as placeholders filled in by the caller.
+    """
+
+    def __init__(self, serializer, computed=None):
+        computed = computed or {}
+        model = serializer.Meta.model
+        concrete = {field.name: field for field in model._meta.concrete_fields}
+        self.entries = []
+        self.many_fields = {}
+        lookups = {model._meta.pk.name}
+
+        for name, field in serializer.fields.items():
+            if name in computed:
+                field_lookups, func = computed[name]
+                self.entries.append((COMPUTED, name, tuple(field_lookups), func, None))
+                lookups.update(field_lookups)
+                continue
+
+            if isinstance(field, (serializers.ListSerializer, ManyRelatedField)):
+                self.many_fields[name] = field
+                self.entries.append((MANY, name, (), None, None))
+                continue
+
+            source = field.source
+            guard = None
+            if source in concrete:
+                lookup = source
+                model_field = concrete[source]
+            else:
+                lookup = source.replace(".", "__")
+                guard = lookup.split("__")[0]
+                lookups.add(guard)
+                model_field = None
+
+            convert = None
+            if isinstance(field, CONVERTED_FIELDS):
+                convert = field.to_representation
+            elif isinstance(field, serializers.FileField) and model_field is not None:
+                convert = self.file_converter(field, model_field)
+
+            self.entries.append((VALUE, name, lookup, convert, guard))
+            lookups.add(lookup)
+
+        self.pk_name = model._meta.pk.name
+        self.lookups = sorted(lookups)
+
+    @staticmethod
+    def file_converter(field, model_field):
+        def convert(name):
+            return field.to_representation(model_field.attr_class(None, model_field, name))
+
+        return convert
+
+    def build(self, row, related=None):
+        data = {}
+        for kind, name, lookup, convert, guard in self.entries:
+            if kind == COMPUTED:
+                data[name] = convert(*(row[each] for each in lookup))
+            elif kind == MANY:
+                data[name] = related[name].get(row[self.pk_name], [])
+            elif guard is not None and row[guard] is None:
+                # DRF omits dotted read-only fields whose relation is empty.
+                continue
+            else:
+                value = row[lookup]
+                if value is not None and convert is not None:
+                    value = convert(value)
+                data[name] = value
+        return data
+
+    def rows(self, queryset):
+        return queryset.prefetch_related(None).values(*self.lookups)
+
+
+def group_rows(queryset, serializer, fk, computed=None):
+    """
+    Renders the rows of `queryset` with `serializer` (a nested child) and
+    groups them by the value of the `fk` column.
+    """
+    plan = ValuesPlan(serializer, computed)
+    grouped = {}
+    for row in queryset.values(*plan.lookups, fk):
+        grouped.setdefault(row[fk], []).append(plan.build(row))
+    return grouped
+
+
+class FastListMixin:
+    """
+    Opt-in read-only list mode (`API_FAST_LIST` setting): list responses
+    are built from `values()` rows with a precomputed field plan instead of
+    instantiating models and serializers per row. The JSON shape is the
+    same as the regular serializer output.
+    """
+
+    # Serializer field -> (values() lookups, func) for method-backed fields.
+    fast_list_computed = {}
+
+    def use_fast_list(self):
+        return getattr(settings, "API_FAST_LIST", False) and self.paginator is None
+
+    def get_fast_list_related(self, plan, queryset):
+        """
+        Returns {field name: {pk: value}} for the many fields in `plan`.
+        """
+        return {}
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_list():
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        plan = ValuesPlan(self.get_serializer(), self.fast_list_computed)
+        related = self.get_fast_list_related(plan, queryset) if plan.many_fields else None
+        return Response([plan.build(row, related) for row in plan.rows(queryset)])
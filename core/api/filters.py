@@ -0,0 +1,31 @@
+from functools import reduce
+from operator import or_
+
+from rest_framework import filters
+
+from core.apps.backoffice.search import search_q
+
+
+class IndexedSearchFilter(filters.SearchFilter):
+    """
+    Drop-in SearchFilter whose plain (`icontains`) search fields go through
+    the search index. Fields with a `^`, `=`, `@` or `$` prefix keep the
+    stock behaviour.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return queryset
+        if any(field[0] in self.lookup_prefixes for field in search_fields):
+            return super().filter_queryset(request, queryset, view)
+
+        for term in search_terms:
+            queryset = queryset.filter(
+                reduce(
+                    or_,
+                    (search_q(queryset.model, field, term, queryset.db) for field in search_fields),
+                )
+            )
+        return queryset
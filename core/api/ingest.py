@@ -0,0 +1,157 @@
+"""
+Batch ingestion of orders captured offline by the POS.
+
+A batch is validated as a whole (one product query for every line, one
+query for already ingested client references) and written with
+`bulk_create` in a single transaction. Each order keeps the time it was
+captured at, so sales land on the dashboard (and, for barbers, in the
+storefront availability) when they happened rather than when they synced.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from core.apps.backoffice.changelog import record_changes
+from core.apps.backoffice.models import Order, OrderItem, Product
+from core.apps.backoffice.versioning import bump_version
+
+MAX_BATCH_SIZE = 500
+
+# How far ahead of the server a POS clock may run.
+CLOCK_SKEW = timedelta(minutes=5)
+
+
+class OrderBatchItemSerializer(serializers.Serializer):
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+    unit_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=Decimal("0"), required=False
+    )
+
+
+class OrderBatchEntrySerializer(serializers.Serializer):
+    client_ref = serializers.CharField(max_length=64)
+    client_name = serializers.CharField(max_length=150)
+    created_at = serializers.DateTimeField(required=False)
+    items = OrderBatchItemSerializer(many=True, allow_empty=False)
+
+    def validate_created_at(self, value):
+        now = timezone.now()
+        if value > now + CLOCK_SKEW:
+            raise serializers.ValidationError("La fecha de captura está en el futuro.")
+        return min(value, now)
+
+
+def ingest_orders(entries, user):
+    """
+    Validates and inserts `entries` (raw dicts). Returns one result per
+    entry, in order, with its `client_ref` and a `status` of "created",
+    "duplicate" (already ingested, `id` is the existing order) or "error".
+    """
+    results = [None] * len(entries)
+    valid = {}
+
+    for index, entry in enumerate(entries):
+        serializer = OrderBatchEntrySerializer(data=entry)
+        if not serializer.is_valid():
+            results[index] = error_result(entry, serializer.errors)
+            continue
+        ref = serializer.validated_data["client_ref"]
+        if ref in valid:
+            results[index] = error_result(
+                entry, {"client_ref": ["Referencia repetida en el lote."]}
+            )
+            continue
+        valid[ref] = (index, serializer.validated_data)
+
+    product_ids = {
+        item["product"] for _, data in valid.values() for item in data["items"]
+    }
+    products = Product.objects.in_bulk(product_ids)
+
+    for ref, (index, data) in list(valid.items()):
+        missing = sorted({item["product"] for item in data["items"]} - products.keys())
+        if missing:
+            results[index] = error_result(
+                data, {"items": [f"Productos inexistentes: {missing}"]}
+            )
+            del valid[ref]
+
+    # A concurrent batch may ingest the same reference between the
+    # duplicate check and the insert; the unique index catches it and the
+    # batch is retried once with fresh duplicates.
+    for attempt in range(2):
+        existing = dict(
+            Order.objects.filter(client_ref__in=valid).values_list("client_ref", "pk")
+        )
+        for ref, pk in existing.items():
+            index, _ = valid.pop(ref)
+            results[index] = {"client_ref": ref, "status": "duplicate", "id": pk}
+        try:
+            created = insert_orders(valid, products, user)
+            break
+        except IntegrityError:
+            if attempt:
+                raise
+
+    for ref, order in created.items():
+        index, _ = valid[ref]
+        results[index] = {"client_ref": ref, "status": "created", "id": order.pk}
+    return results
+
+
+@transaction.atomic
+def insert_orders(valid, products, user):
+    if not valid:
+        # Every order was a duplicate or invalid: no caches to invalidate.
+        return {}
+
+    orders = {}
+    items = []
+    for ref, (_, data) in valid.items():
+        order = Order(
+            client_ref=ref,
+            client_name=data["client_name"],
+            created_by=user,
+            total_amount=0,
+        )
+        for line in data["items"]:
+            product = products[line["product"]]
+            unit_price = line.get("unit_price", product.price)
+            item = OrderItem(
+                order=order,
+                product=product,
+                quantity=line["quantity"],
+                unit_price=unit_price,
+                subtotal=unit_price * line["quantity"],
+            )
+            order.total_amount += item.subtotal
+            items.append(item)
+        orders[ref] = order
+
+    Order.objects.bulk_create(orders.values())
+    # created_at is auto_now_add, which bulk_create fills with the current
+    # time; bulk_update writes the capture times as given.
+    captured = []
+    for ref, order in orders.items():
+        created_at = valid[ref][1].get("created_at")
+        if created_at is not None:
+            order.created_at = created_at
+            captured.append(order)
+    if captured:
+        Order.objects.bulk_update(captured, ["created_at"])
+    OrderItem.objects.bulk_create(items)
+    # bulk_create skips model signals, so log the new orders for sync and
+    # bump their version.
+    record_changes(Order, [order.pk for order in orders.values()])
+    bump_version(Order)
+    return orders
+
+
+def error_result(entry, errors):
+    ref = entry.get("client_ref") if isinstance(entry, dict) else None
+    return {"client_ref": ref, "status": "error", "errors": errors}
@@ -0,0 +1,62 @@
+"""
+API keys for integrations.
+
+A key is "<prefix>.<secret>". Only a keyed SHA-256 HMAC of the whole key is
+stored, so checking one costs a digest instead of the PBKDF2 hash of Basic
+auth, and the key → user lookup is cached under the ApiKey and User table
+versions: issuing, rotating or revoking a key, or changing its user,
+invalidates it. Unknown keys are not cached: the unique digest index makes
+the miss cheap, and caching them would let random keys fill the cache.
+"""
+
+import secrets
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+from core.apps.backoffice.models import ApiKey
+from core.cache import versioned_key
+
+DIGEST_SALT = "core.api.keys"
+LOOKUP_TIMEOUT = 60 * 60
+
+
+def key_digest(key):
+    return salted_hmac(DIGEST_SALT, key, algorithm="sha256").hexdigest()
+
+
+def issue_key(user, name):
+    """Creates a key for `user`. Returns the ApiKey and the key itself."""
+    prefix = secrets.token_hex(4)
+    key = f"{prefix}.{secrets.token_urlsafe(32)}"
+    api_key = ApiKey.objects.create(
+        user=user, name=name, prefix=prefix, digest=key_digest(key)
+    )
+    return api_key, key
+
+
+def revoke_key(api_key):
+    api_key.revoked_at = timezone.now()
+    api_key.save(update_fields=["revoked_at"])
+
+
+def rotate_key(api_key):
+    """Revokes `api_key` and issues a new one for the same user and name."""
+    revoke_key(api_key)
+    return issue_key(api_key.user, api_key.name)
+
+
+def lookup_user(key):
+    """Returns the active user `key` belongs to, or None."""
+    digest = key_digest(key)
+    cache_key = versioned_key("apikey", [ApiKey, User], digest)
+    user = cache.get(cache_key)
+    if user is None:
+        user = User.objects.filter(
+            is_active=True, api_keys__digest=digest, api_keys__revoked_at=None
+        ).first()
+        if user is not None:
+            cache.set(cache_key, user, LOOKUP_TIMEOUT)
+    return user
@@ -0,0 +1,97 @@
+from rest_framework.exceptions import ValidationError
+
+from core.apps.backoffice.versioning import conditional_response
+
+
+def get_requested_fields(request):
+    """
+    Returns the set of field names asked for with `?fields=a,b` (plus any
+    nested relations in `?expand=`), or None when the client wants the
+    full representation. Only GET requests are narrowed.
+
+    The full representation already nests every relation, so `?expand=`
+    without `?fields=` would change nothing and is rejected with a 400.
+    """
+    if request is None or request.method != "GET":
+        return None
+
+    fields = request.query_params.get("fields")
+    expand = request.query_params.get("expand", "")
+    if not fields:
+        if expand:
+            raise ValidationError({
+                "expand": "Usa expand junto con fields; sin fields ya se "
+                "incluyen todas las relaciones."
+            })
+        return None
+
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    requested.update(name.strip() for name in expand.split(",") if name.strip())
+    return requested
+
+
+class SparseFieldsetMixin:
+    """
+    Narrows the viewset queryset to what the serializer will render when the
+    client uses `?fields=`: unrequested columns are deferred with `only()`
+    and relations are joined or prefetched only if a field needs them.
+    """
+
+    # Serializer field -> (select_related paths, prefetch_related paths)
+    relation_fields = {}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        requested = get_requested_fields(self.request)
+        if requested is None:
+            return queryset
+
+        queryset = queryset.select_related(None).prefetch_related(None)
+        model = queryset.model
+        concrete = {field.name for field in model._meta.concrete_fields}
+        columns = {model._meta.pk.name} | (requested & concrete)
+
+        for name, (select, prefetch) in self.relation_fields.items():
+            if name not in requested:
+                continue
+            if select:
+                queryset = queryset.select_related(*select)
+                columns.update(path.split("__")[0] for path in select)
+            if prefetch:
+                queryset = queryset.prefetch_related(*prefetch)
+
+        return queryset.only(*columns)
+
+
+class ConditionalGetMixin:
+    """
+    Answers list and detail GETs with 304 Not Modified while the version
+    stamps of `version_models` are unchanged, without touching the queryset.
+    """
+
+    version_models = []
+
+    def get_version_parts(self, request):
+        return [
+            request.get_full_path(),
+            request.accepted_media_type,
+            getattr(request, "version", None),
+        ]
+
+    def list(self, request, *args, **kwargs):
+        parent = super().list
+        return conditional_response(
+            request,
+            self.version_models,
+            self.get_version_parts(request),
+            lambda: parent(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        parent = super().retrieve
+        return conditional_response(
+            request,
+            self.version_models,
+            self.get_version_parts(request),
+            lambda: parent(request, *args, **kwargs),
+        )
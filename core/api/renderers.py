@@ -0,0 +1,27 @@
+from rest_framework.renderers import JSONRenderer
+
+from core import fastjson
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with `fastjson.dumps()`, through orjson when
+    it is installed and its stdlib fallback otherwise, so floats come out
+    the same either way. Indented output (browsable API, `; indent=` media
+    types) and non-default JSON settings go through the stock renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = fastjson.dumps(data, self.encoder_class)
+        # Same escaping as JSONRenderer so the output stays a JavaScript subset.
+        return ret.replace("\u2028".encode(), b"\\u2028").replace(
+            "\u2029".encode(), b"\\u2029"
+        )
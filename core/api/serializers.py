@@ -1,10 +1,25 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User, Group
-from django.contrib.auth.models import User, Group
 from core.apps.backoffice.models import Category, Product, Order, OrderItem, SupplyEntry, BarberProfile, WorkSchedule, Appointment
+from core.api.mixins import get_requested_fields
+
+
+class SparseFieldsMixin:
+    """
+    Drops every field not listed in `?fields=` (or `?expand=`) when the
+    serializer is used at the top level of a GET request.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = get_requested_fields(self.context.get("request"))
+        if requested is None:
+            return
+        for name in set(self.fields) - requested:
+            self.fields.pop(name)
 
 
-class SupplyEntrySerializer(serializers.ModelSerializer):
+class SupplyEntrySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(source="product.name", read_only=True)
     created_by_name = serializers.SerializerMethodField()
 
@@ -29,7 +44,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         read_only_fields = ["subtotal"]
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     created_by_name = serializers.SerializerMethodField()
 
@@ -45,7 +60,7 @@ class OrderSerializer(serializers.ModelSerializer):
         return "N/A"
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source="category.name", read_only=True)
 
     class Meta:
@@ -53,13 +68,13 @@ class ProductSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = "__all__"
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = [
@@ -74,7 +89,7 @@ class UserSerializer(serializers.ModelSerializer):
         ]
 
 
-class GroupSerializer(serializers.ModelSerializer):
+class GroupSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Group
         fields = ["id", "name"]
@@ -88,7 +103,7 @@ class WorkScheduleSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class BarberProfileSerializer(serializers.ModelSerializer):
+class BarberProfileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user_name = serializers.CharField(source="user.get_full_name", read_only=True)
     schedules = WorkScheduleSerializer(many=True, read_only=True)
 
@@ -97,7 +112,7 @@ class BarberProfileSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class AppointmentSerializer(serializers.ModelSerializer):
+class AppointmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     barber_name = serializers.CharField(source="barber.nickname", read_only=True)
     services_names = serializers.StringRelatedField(many=True, source="services", read_only=True)
 
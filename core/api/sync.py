@@ -0,0 +1,176 @@
+from datetime import timedelta
+
+from django.core import signing
+from django.utils import timezone
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.apps.backoffice.models import ChangeLogEntry
+from core.api.views import (
+    AppointmentViewSet,
+    BarberProfileViewSet,
+    CategoryViewSet,
+    OrderViewSet,
+    ProductViewSet,
+)
+
+CURSOR_SALT = "core.api.sync"
+
+# Response key -> viewset whose queryset and serializer render the rows.
+SYNC_RESOURCES = {
+    "categories": CategoryViewSet,
+    "products": ProductViewSet,
+    "barbers": BarberProfileViewSet,
+    "orders": OrderViewSet,
+    "appointments": AppointmentViewSet,
+}
+
+
+def make_cursor(last_id, resume=None):
+    """
+    `resume` is the (resource index, last pk) a paginated snapshot goes on
+    from; the snapshot is consistent as of the change log entry `last_id`.
+    """
+    payload = last_id if resume is None else [last_id, *resume]
+    return signing.dumps(payload, salt=CURSOR_SALT)
+
+
+def read_cursor(cursor):
+    """Returns (last_id, resume) from make_cursor()."""
+    payload = signing.loads(cursor, salt=CURSOR_SALT)
+    if isinstance(payload, list):
+        last_id, index, after = map(int, payload)
+        return last_id, (index, after)
+    return int(payload), None
+
+
+class SyncView(APIView):
+    """
+    API endpoint that returns the rows created, changed or deleted since
+    `?since=<cursor>`. Without a cursor it returns a full snapshot, in
+    pages of `page_size` rows followed while `has_more` is true.
+
+    Change log entries are written after their transaction commits (see
+    backoffice/changelog.py). Entries younger than `settle_delay` are still
+    left for the next call, so that ids taken by inserts that are about
+    to commit are not skipped over.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    page_size = 1000
+    settle_delay = timedelta(seconds=2)
+
+    def get(self, request, *args, **kwargs):
+        cutoff = timezone.now() - self.settle_delay
+        since = request.query_params.get("since")
+        if not since:
+            return self.snapshot(request, self.snapshot_id(cutoff), (0, 0))
+
+        try:
+            last_id, resume = read_cursor(since)
+        except (signing.BadSignature, ValueError, TypeError):
+            return Response(
+                {"detail": "Cursor inválido."}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # prune_changelog keeps the newest entry, so the log is only empty
+        # before anything was recorded, when no cursor can point past 0.
+        oldest = (
+            ChangeLogEntry.objects.order_by("pk").values_list("pk", flat=True).first()
+        )
+        if last_id and (oldest is None or last_id < oldest - 1):
+            return Response(
+                {"detail": "El cursor expiró. Se requiere una sincronización completa."},
+                status=status.HTTP_410_GONE,
+            )
+        if resume is not None:
+            return self.snapshot(request, last_id, resume)
+
+        entries = list(
+            ChangeLogEntry.objects.filter(pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", "table", "object_id", "action", "created_at")[
+                : self.page_size + 1
+            ]
+        )
+        has_more = len(entries) > self.page_size
+        entries = entries[: self.page_size]
+        for index, entry in enumerate(entries):
+            if entry[4] > cutoff:
+                entries = entries[:index]
+                has_more = False
+                break
+
+        # The latest action for each row wins.
+        latest = {}
+        for _, table, object_id, action, _ in entries:
+            latest.setdefault(table, {})[object_id] = action
+
+        changes = {}
+        for key, viewset in SYNC_RESOURCES.items():
+            actions = latest.get(viewset.queryset.model._meta.label_lower, {})
+            upserted = {
+                pk for pk, action in actions.items() if action == ChangeLogEntry.UPSERT
+            }
+            deleted = set(actions) - upserted
+            changes[key] = self.render_changes(request, viewset, upserted, deleted)
+
+        return Response(
+            {
+                "cursor": make_cursor(entries[-1][0] if entries else last_id),
+                "has_more": has_more,
+                "changes": changes,
+            }
+        )
+
+    def snapshot_id(self, cutoff):
+        return (
+            ChangeLogEntry.objects.filter(created_at__lte=cutoff)
+            .order_by("-pk")
+            .values_list("pk", flat=True)
+            .first()
+        ) or 0
+
+    def snapshot(self, request, last_id, resume):
+        """
+        One page of the snapshot: the rows of each resource in turn, by pk,
+        from `resume`. Rows changed while the client pages through it have
+        entries after `last_id`, so the delta sync afterwards sends them.
+        """
+        index, after = resume
+        keys = list(SYNC_RESOURCES)
+        changes = {key: {"updated": [], "deleted": []} for key in keys}
+        room = self.page_size
+        while index < len(keys) and room:
+            viewset = SYNC_RESOURCES[keys[index]]
+            rows = list(viewset.queryset.filter(pk__gt=after).order_by("pk")[: room + 1])
+            changes[keys[index]]["updated"] = viewset.serializer_class(
+                rows[:room], many=True, context={"request": request}
+            ).data
+            if len(rows) > room:
+                after = rows[room - 1].pk
+                room = 0
+            else:
+                room -= len(rows)
+                index, after = index + 1, 0
+
+        has_more = index < len(keys)
+        return Response(
+            {
+                "cursor": make_cursor(last_id, (index, after) if has_more else None),
+                "has_more": has_more,
+                "changes": changes,
+            }
+        )
+
+    def render_changes(self, request, viewset, upserted, deleted):
+        rows = []
+        if upserted:
+            queryset = viewset.queryset.filter(pk__in=upserted)
+            rows = viewset.serializer_class(
+                queryset, many=True, context={"request": request}
+            ).data
+            # Rows gone by now were deleted after this page; send tombstones.
+            deleted = deleted | (upserted - {row["id"] for row in rows})
+        return {"updated": rows, "deleted": sorted(deleted)}
@@ -0,0 +1,28 @@
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+from core.ratelimit import TokenBucket, client_ident
+
+
+class BucketThrottle(BaseThrottle):
+    """
+    DRF throttle backed by the token buckets of core.ratelimit. Uses the
+    view's `throttle_scope` bucket, or "api". Clients are told apart by API
+    key, then user, then IP.
+    """
+
+    default_scope = "api"
+
+    def allow_request(self, request, view):
+        name = getattr(view, "throttle_scope", None) or self.default_scope
+        if not settings.RATE_LIMITS.get(name):
+            return True
+        # ApiKeyAuthentication sets request.auth to the key's prefix.
+        api_key = request.auth if isinstance(request.auth, str) else None
+        self.retry_after = TokenBucket(name).take(
+            client_ident(request, request.user, api_key)
+        )
+        return not self.retry_after
+
+    def wait(self):
+        return self.retry_after
@@ -10,6 +10,7 @@ from core.api.views import (
     BarberProfileViewSet,
     AppointmentViewSet,
 )
+from core.api.sync import SyncView
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet)
@@ -22,5 +23,6 @@ router.register(r'barbers', BarberProfileViewSet)
 router.register(r'appointments', AppointmentViewSet)
 
 urlpatterns = [
+    path('sync/', SyncView.as_view(), name='sync'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,12 +1,19 @@
-from rest_framework import viewsets, permissions, filters, status
+from rest_framework import viewsets, permissions, status
 from django.db import transaction
+from django.db.models import F
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.contrib.auth.models import User, Group
 from django.core.exceptions import ValidationError
-from django.core.exceptions import ValidationError
-from django.core.exceptions import ValidationError
-from core.apps.backoffice.models import Category, Product, Order, SupplyEntry, BarberProfile, Appointment, OrderItem
+from core.apps.backoffice.models import Category, Product, Order, SupplyEntry, BarberProfile, WorkSchedule, Appointment, OrderItem
+from core.api.mixins import ConditionalGetMixin, SparseFieldsetMixin
+from core.api.fastlist import FastListMixin, full_name, display, group_rows
+from core.api.filters import IndexedSearchFilter
+from core.api.bulk import BatchError, receive_supplies, upsert_products
+from core.api.ingest import MAX_BATCH_SIZE, ingest_orders
+from core.apps.backoffice import exports
+from core.apps.backoffice.versioning import conditional_response
+from core.apps.backoffice.filters import AppointmentFilter, OrderFilter, SupplyEntryFilter
 from core.api.serializers import (
     UserSerializer,
     GroupSerializer,
@@ -19,29 +26,100 @@ from core.api.serializers import (
 )
 
 
-class SupplyEntryViewSet(viewsets.ModelViewSet):
+def check_batch(rows, label):
+    """Returns a 400 response unless `rows` is a non-empty list within limits."""
+    if not isinstance(rows, list) or not rows:
+        return Response(
+            {"detail": f"Se espera una lista de {label}."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if len(rows) > MAX_BATCH_SIZE:
+        return Response(
+            {"detail": f"Máximo {MAX_BATCH_SIZE} {label} por lote."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return None
+
+
+def stream_export(request, export, queryset, filterset_class):
+    """
+    Streams `export` for `queryset` narrowed by the same filterset the
+    backoffice list uses, in the `?output=` format (csv or ndjson).
+    """
+    filterset = filterset_class(
+        exports.filter_data(request.query_params, filterset_class),
+        queryset=queryset,
+        request=request,
+    )
+    if not filterset.is_valid():
+        return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    response = exports.export_response(request, export, filterset.qs)
+    if response is None:
+        return Response(
+            {"detail": "Formato de exportación no soportado."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return response
+
+
+class SupplyEntryViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows supply entries to be viewed or edited.
     """
 
-    queryset = SupplyEntry.objects.all().order_by("-date")
+    queryset = SupplyEntry.objects.select_related("product", "created_by").order_by("-date")
     serializer_class = SupplyEntrySerializer
     permission_classes = [permissions.DjangoModelPermissions]
-    filter_backends = [filters.SearchFilter]
+    relation_fields = {
+        "product_name": (["product"], []),
+        "created_by_name": (["created_by"], []),
+    }
+    filter_backends = [IndexedSearchFilter]
     search_fields = ["product__name", "supplier"]
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request):
+        """
+        Records a whole supplier delivery: a list of entries whose products
+        get their stock and average cost updated once per product.
+        """
+        error = check_batch(request.data, "entradas")
+        if error:
+            return error
 
-class OrderViewSet(viewsets.ModelViewSet):
+        try:
+            entries = receive_supplies(request.data, request.user)
+        except BatchError as e:
+            return Response({"errors": e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = self.get_serializer(entries, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        return stream_export(request, exports.SUPPLIES, queryset, SupplyEntryFilter)
+
+
+class OrderViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows orders to be viewed or edited.
     """
 
-    queryset = Order.objects.all().order_by("-created_at")
+    queryset = (
+        Order.objects.select_related("created_by")
+        .prefetch_related("items__product")
+        .order_by("-created_at")
+    )
     serializer_class = OrderSerializer
     permission_classes = [permissions.DjangoModelPermissions]
+    relation_fields = {
+        "items": ([], ["items__product"]),
+        "created_by_name": (["created_by"], []),
+    }
 
     @action(detail=True, methods=["post"], url_path="mark-as-paid")
     def mark_as_paid(self, request, pk=None):
@@ -67,20 +145,100 @@ class OrderViewSet(viewsets.ModelViewSet):
         except ValidationError as e:
             return Response({"detail": e.message}, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request):
+        """
+        Ingests a list of orders with nested items captured offline.
+        Each order carries a `client_ref` used to skip already ingested sales
+        and, optionally, the `created_at` it was captured at.
+        """
+        error = check_batch(request.data, "órdenes")
+        if error:
+            return error
+
+        results = ingest_orders(request.data, request.user)
+        return Response({"results": results})
+
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        return stream_export(request, exports.ORDERS, queryset, OrderFilter)
 
-class ProductViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=["get"], url_path="items/export")
+    def export_items(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        return stream_export(request, exports.ORDER_ITEMS, queryset, OrderFilter)
+
+
+class ProductViewSet(ConditionalGetMixin, FastListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows products to be viewed or edited.
     """
 
-    queryset = Product.objects.all().order_by("name")
+    queryset = Product.objects.select_related("category").order_by("name")
     serializer_class = ProductSerializer
     permission_classes = [permissions.DjangoModelPermissions]
-    filter_backends = [filters.SearchFilter]
+    version_models = [Product, Category]
+    relation_fields = {
+        "category_name": (["category"], []),
+    }
+    filter_backends = [IndexedSearchFilter]
     search_fields = ["name"]
+    autocomplete_limit = 20
+
+    @action(detail=False, methods=["get"], url_path="autocomplete")
+    def autocomplete(self, request):
+        """
+        Returns the first products whose name starts with `?q=`, for the
+        order form. The lookup is served by the prefix index on the name.
+        """
+
+        def render():
+            term = request.query_params.get("q", "").strip()
+            queryset = Product.objects.order_by("name")
+            if term:
+                queryset = queryset.filter(name__istartswith=term)
+            rows = queryset.values(
+                "id",
+                "name",
+                "price",
+                "stock_qty",
+                "min_stock_alert",
+                "is_service",
+                category_name=F("category__name"),
+            )[: self.autocomplete_limit]
+            return Response([{**row, "price": str(row["price"])} for row in rows])
+
+        return conditional_response(
+            request, self.version_models, self.get_version_parts(request), render
+        )
+
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request):
+        """
+        Creates or partially updates a list of products in one request.
+        Rows with an `id` update that product, the rest are created.
+        """
+        error = check_batch(request.data, "productos")
+        if error:
+            return error
+
+        updates = any(isinstance(row, dict) and "id" in row for row in request.data)
+        if updates and not request.user.has_perm("backoffice.change_product"):
+            return Response(
+                {"detail": "No tienes permiso para realizar esta acción."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        try:
+            products = upsert_products(request.data)
+        except BatchError as e:
+            return Response({"errors": e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = self.get_serializer(products, many=True)
+        return Response(serializer.data)
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ConditionalGetMixin, FastListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows categories to be viewed or edited.
     """
@@ -88,9 +246,10 @@ class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all().order_by("name")
     serializer_class = CategorySerializer
     permission_classes = [permissions.DjangoModelPermissions]
+    version_models = [Category]
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows users to be viewed or edited.
     """
@@ -100,7 +259,7 @@ class UserViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.DjangoModelPermissions]
 
 
-class GroupViewSet(viewsets.ModelViewSet):
+class GroupViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows groups to be viewed or edited.
     """
@@ -110,30 +269,82 @@ class GroupViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.DjangoModelPermissions]
 
 
-class BarberProfileViewSet(viewsets.ModelViewSet):
+class BarberProfileViewSet(ConditionalGetMixin, FastListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows barbers to be viewed or edited.
     """
 
-    queryset = BarberProfile.objects.all().order_by("nickname")
+    queryset = (
+        BarberProfile.objects.select_related("user")
+        .prefetch_related("schedules")
+        .order_by("nickname")
+    )
     serializer_class = BarberProfileSerializer
     permission_classes = [permissions.DjangoModelPermissions]
-    filter_backends = [filters.SearchFilter]
+    version_models = [BarberProfile, WorkSchedule, User]
+    relation_fields = {
+        "user_name": (["user"], []),
+        "schedules": ([], ["schedules"]),
+    }
+    filter_backends = [IndexedSearchFilter]
     search_fields = ["nickname", "user__username", "user__first_name"]
+    fast_list_computed = {
+        "user_name": (["user__first_name", "user__last_name"], full_name),
+    }
+
+    def get_fast_list_related(self, plan, queryset):
+        if "schedules" not in plan.many_fields:
+            return {}
+        schedules = WorkSchedule.objects.filter(barber__in=queryset.values("pk"))
+        return {
+            "schedules": group_rows(
+                schedules,
+                plan.many_fields["schedules"].child,
+                "barber_id",
+                {"day_name": (["day_of_week"], display(WorkSchedule.DAYS))},
+            )
+        }
 
 
-class AppointmentViewSet(viewsets.ModelViewSet):
+class AppointmentViewSet(FastListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows appointments to be viewed or edited.
     """
 
-    queryset = Appointment.objects.all().order_by("-date", "-start_time")
+    queryset = (
+        Appointment.objects.select_related("barber")
+        .prefetch_related("services")
+        .order_by("-date", "-start_time")
+    )
     serializer_class = AppointmentSerializer
     permission_classes = [permissions.DjangoModelPermissions]
-    filter_backends = [filters.SearchFilter]
-    filter_backends = [filters.SearchFilter]
+    relation_fields = {
+        "barber_name": (["barber"], []),
+        "services": ([], ["services"]),
+        "services_names": ([], ["services"]),
+    }
+    filter_backends = [IndexedSearchFilter]
     search_fields = ["client_name", "client_phone", "barber__nickname"]
 
+    def get_fast_list_related(self, plan, queryset):
+        links = (
+            Appointment.services.through.objects.filter(
+                appointment__in=queryset.values("pk")
+            )
+            .order_by("pk")
+            .values_list("appointment_id", "product_id", "product__name", "product__is_service")
+        )
+        services, names = {}, {}
+        for appointment_id, product_id, name, is_service in links:
+            services.setdefault(appointment_id, []).append(product_id)
+            names.setdefault(appointment_id, []).append(Product.label(name, is_service))
+        return {"services": services, "services_names": names}
+
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        return stream_export(request, exports.APPOINTMENTS, queryset, AppointmentFilter)
+
     @action(detail=True, methods=["post"], url_path="convert-to-order")
     def convert_to_order(self, request, pk=None):
         appointment = self.get_object()
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class BackofficeConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core.apps.backoffice"
+
+    def ready(self):
+        from core.apps.backoffice import search, signals
+
+        signals.connect()
+        post_migrate.connect(search.repair, sender=self)
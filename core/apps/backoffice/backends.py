@@ -0,0 +1,39 @@
+"""
+Authentication backend that keeps each user's permissions in the cache.
+
+ModelBackend reads a user's own and group permissions with two joined
+queries on the first check of every request. `CachedPermissionBackend`
+stores the resulting set under the User, Group and Permission table
+versions instead: saving a user, a group or their permission and
+membership relations (see signals.py) bumps one of them, so a request
+costs a single version lookup.
+"""
+
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import cache
+
+from core.cache import versioned_key
+
+PERMISSION_MODELS = [User, Group, Permission]
+
+
+class CachedPermissionBackend(ModelBackend):
+    timeout = 60 * 60 * 24
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if (
+            not user_obj.is_active
+            or user_obj.is_anonymous
+            or obj is not None
+            or hasattr(user_obj, "_perm_cache")
+        ):
+            return super().get_all_permissions(user_obj, obj)
+
+        key = versioned_key("perms", PERMISSION_MODELS, user_obj.pk)
+        perms = cache.get(key)
+        if perms is None:
+            perms = super().get_all_permissions(user_obj)
+            cache.set(key, perms, self.timeout)
+        user_obj._perm_cache = perms
+        return perms
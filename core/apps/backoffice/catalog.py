@@ -0,0 +1,88 @@
+"""
+Versioned snapshot of the service catalog.
+
+The appointment forms, the storefront home and the public booking form all
+need the price and duration of every service. `get_catalog()` returns an
+immutable snapshot built once per Product/Category version: kept in the
+shared cache across processes and in memory within this one, so a call
+while nothing changed costs a single version lookup.
+"""
+
+from collections import namedtuple
+from types import MappingProxyType
+
+from django.core.cache import cache
+
+from core import fastjson
+from core.apps.backoffice.models import Category, Product
+from core.apps.backoffice.versioning import cache_stamp
+
+Service = namedtuple(
+    "Service", "id name price duration category_name category_active"
+)
+
+TIMEOUT = 60 * 60 * 24
+
+_snapshot = None
+
+
+class ServiceCatalog:
+    """
+    Services by id, plus what the call sites render from them: the ones
+    offered to the public (active category) and the JSON the appointment
+    form reads prices and durations from.
+    """
+
+    def __init__(self, stamp, services):
+        self.stamp = stamp
+        self.services = MappingProxyType({service.id: service for service in services})
+        self.public = tuple(service for service in services if service.category_active)
+        self.public_ids = frozenset(service.id for service in self.public)
+        self.json = fastjson.dumps(
+            {
+                service.id: {"price": float(service.price), "duration": service.duration}
+                for service in services
+            }
+        ).decode()
+
+    def __contains__(self, pk):
+        return pk in self.services
+
+    def __getitem__(self, pk):
+        return self.services[pk]
+
+    def totals(self, pks):
+        """Returns (total price, total minutes) for the services `pks`."""
+        services = [self.services[pk] for pk in pks]
+        return (
+            sum((service.price for service in services), 0),
+            sum(service.duration for service in services),
+        )
+
+
+def build_services():
+    rows = (
+        Product.objects.filter(is_service=True)
+        .order_by("pk")
+        .values_list("pk", "name", "price", "duration", "category__name", "category__status")
+    )
+    return [
+        Service(pk, name, price, duration, category_name, bool(category_status))
+        for pk, name, price, duration, category_name, category_status in rows
+    ]
+
+
+def get_catalog():
+    global _snapshot
+    stamp = cache_stamp(Product, Category)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.stamp == stamp:
+        return snapshot
+
+    key = f"catalog:services:{stamp}"
+    services = cache.get(key)
+    if services is None:
+        services = build_services()
+        cache.set(key, services, TIMEOUT)
+    _snapshot = snapshot = ServiceCatalog(stamp, services)
+    return snapshot
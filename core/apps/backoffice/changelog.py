@@ -0,0 +1,35 @@
+"""
+Change log feeding the API delta sync (see core/api/sync.py).
+
+Model signals record every create, update and delete of the synced tables.
+Changes to nested rows (order items, work schedules, appointment services)
+are recorded as an update of their parent. Bulk writes that skip signals
+must call `record_changes()` themselves.
+
+Entries are built and written once the change commits, and the database
+stamps them as it inserts them, so their ids and `created_at` follow commit
+order rather than the order in which transactions started: a slow
+transaction can't end up behind a cursor that already moved past it. A
+crash between the commit and the write loses its entries; clients recover
+them on their next full sync.
+
+`prune_changelog` always keeps the newest entry, so the oldest id left
+still tells the sync view which cursors point into pruned history.
+"""
+
+from django.db import transaction
+
+from core.apps.backoffice.models import ChangeLogEntry
+
+
+def record_changes(model, pks, action=ChangeLogEntry.UPSERT):
+    label = model._meta.label_lower
+    pks = [pk for pk in pks if pk is not None]
+    if pks:
+        transaction.on_commit(lambda: write_entries(label, pks, action))
+
+
+def write_entries(label, pks, action):
+    ChangeLogEntry.objects.bulk_create(
+        ChangeLogEntry(table=label, object_id=pk, action=action) for pk in pks
+    )
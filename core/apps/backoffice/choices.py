@@ -0,0 +1,207 @@
+"""
+Cached choice lists for the backoffice selects and filter dropdowns.
+
+A ChoiceList renders its queryset once into `(pk, label)` pairs and keeps
+them in the cache under the current versions of the tables the labels
+depend on, so any save or delete (which bumps the version) invalidates it.
+Within a request the list is also memoized in a context variable, so every
+form of a formset shares a single version lookup and no choice queries at
+all. A context variable, unlike a thread local, stays per request under
+ASGI, where concurrent requests share threads.
+
+The memo only lives between `request_started` and `request_finished`, or
+inside `memoized()`; elsewhere (management commands, workers) every call
+checks the version. Saves and deletes clear it through signals; a request
+that writes with `bulk_create` / `update` and then renders choices must
+call `forget()` itself.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django import forms
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils.choices import BaseChoiceIterator
+
+from core.apps.backoffice.models import BarberProfile, Category, Product
+from core.cache import versioned_key
+
+# (lists, labels) memoized by the current request, or None outside one.
+_memo = ContextVar("choices_memo", default=None)
+
+
+def start(**kwargs):
+    """Starts memoizing lists in this context. Connected to `request_started`."""
+    _memo.set(({}, {}))
+
+
+def finish(**kwargs):
+    """Stops memoizing lists in this context. Connected to `request_finished`."""
+    _memo.set(None)
+
+
+def forget(**kwargs):
+    """
+    Drops the lists memoized so far, if any. Connected to the save/delete
+    signals of the versioned models.
+    """
+    if _memo.get() is not None:
+        start()
+
+
+@contextmanager
+def memoized():
+    """Memoizes lists in this context outside a request, e.g. in a command."""
+    token = _memo.set(({}, {}))
+    try:
+        yield
+    finally:
+        _memo.reset(token)
+
+
+class ChoiceList:
+    timeout = 60 * 60 * 24
+
+    def __init__(self, name, queryset, models, label=str):
+        self.name = name
+        self.queryset = queryset
+        self.models = models
+        self.label = label
+
+    def cache_key(self):
+        return versioned_key(f"choices:{self.name}", self.models)
+
+    def build(self):
+        return [(obj.pk, self.label(obj)) for obj in self.queryset.all()]
+
+    def load(self):
+        key = self.cache_key()
+        choices = cache.get(key)
+        if choices is None:
+            choices = self.build()
+            cache.set(key, choices, self.timeout)
+        return choices
+
+    def choices(self):
+        memo = _memo.get()
+        if memo is None:
+            return self.load()
+        lists = memo[0]
+        if self.name not in lists:
+            lists[self.name] = self.load()
+        return lists[self.name]
+
+    def labels(self):
+        """{str(pk): label} for the current list, built once per request."""
+        memo = _memo.get()
+        if memo is None:
+            return {str(pk): label for pk, label in self.choices()}
+        labels = memo[1]
+        if self.name not in labels:
+            labels[self.name] = {str(pk): label for pk, label in self.choices()}
+        return labels[self.name]
+
+
+ACTIVE_USERS = ChoiceList(
+    "active_users", User.objects.filter(is_active=True).order_by("username"), [User]
+)
+# BarberProfile.__str__ falls back to the user's full name.
+BARBERS = ChoiceList(
+    "barbers",
+    BarberProfile.objects.select_related("user").order_by("pk"),
+    [BarberProfile, User],
+)
+ACTIVE_CATEGORIES = ChoiceList(
+    "active_categories", Category.objects.filter(status=True).order_by("name"), [Category]
+)
+PRODUCTS = ChoiceList("products", Product.objects.order_by("name"), [Product])
+STOCK_PRODUCTS = ChoiceList(
+    "stock_products", Product.objects.filter(is_service=False).order_by("name"), [Product]
+)
+SERVICES = ChoiceList(
+    "services", Product.objects.filter(is_service=True).order_by("name"), [Product]
+)
+
+
+class CachedChoiceIterator(BaseChoiceIterator):
+    """Lazy like ModelChoiceIterator, but reads the field's ChoiceList."""
+
+    def __init__(self, field):
+        self.field = field
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        yield from self.field.choice_list.choices()
+
+    def __len__(self):
+        return len(self.field.choice_list.choices()) + (
+            self.field.empty_label is not None
+        )
+
+
+class CachedChoicesMixin:
+    """
+    Serves the choices of a model choice field from a ChoiceList. Submitted
+    values are still validated against the queryset.
+    """
+
+    iterator = CachedChoiceIterator
+
+    def __init__(self, choice_list, *args, **kwargs):
+        self.choice_list = choice_list
+        kwargs.setdefault("queryset", choice_list.queryset)
+        super().__init__(*args, **kwargs)
+
+
+class CachedModelChoiceField(CachedChoicesMixin, forms.ModelChoiceField):
+    # {pk: instance} read up front by a formset for all of its rows, so
+    # to_python() can skip its per-row query.
+    preloaded = None
+
+    def to_python(self, value):
+        if self.preloaded and value not in self.empty_values:
+            try:
+                return self.preloaded[int(value)]
+            except (KeyError, TypeError, ValueError):
+                pass
+        return super().to_python(value)
+
+
+class CachedModelMultipleChoiceField(
+    CachedChoicesMixin, forms.ModelMultipleChoiceField
+):
+    pass
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    Select for a CachedModelChoiceField that only renders the empty option
+    and the selected ones; the page script adds the rest as they are picked.
+    `url` is exposed as `data-autocomplete-url` for type-ahead lookups.
+    Keeps the page size independent of the catalog size.
+    """
+
+    def __init__(self, url, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context["widget"]["attrs"]["data-autocomplete-url"] = str(self.url)
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        field = self.choices.field
+        labels = field.choice_list.labels()
+        choices = [("", field.empty_label or "")]
+        choices += [(pk, labels[pk]) for pk in value if pk in labels]
+        return [
+            (
+                None,
+                [self.create_option(name, pk, label, pk in value, index, attrs=attrs)],
+                index,
+            )
+            for index, (pk, label) in enumerate(choices)
+        ]
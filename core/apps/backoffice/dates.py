@@ -0,0 +1,27 @@
+"""
+Local-time datetime bounds for filtering DateTimeFields by day or month.
+
+`field__date=day` (and `__month`) compile to a function call on the
+column, which no index can serve; `field__gte=start, field__lt=end` with
+these bounds selects the same rows and lets the database seek the index.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def day_range(day):
+    """Returns the `[start, end)` datetimes of `day` in the current timezone."""
+    return start_of_day(day), start_of_day(day + timedelta(days=1))
+
+
+def month_range(day):
+    """Returns the `[start, end)` datetimes of the month containing `day`."""
+    first = day.replace(day=1)
+    next_month = (first + timedelta(days=32)).replace(day=1)
+    return start_of_day(first), start_of_day(next_month)
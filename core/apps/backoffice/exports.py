@@ -0,0 +1,194 @@
+"""
+Streaming CSV / NDJSON exports shared by the backoffice lists and the API.
+
+Rows are read with `values_list().iterator(chunk_size=...)` and written to
+a StreamingHttpResponse as they arrive, so memory stays flat and the first
+bytes go out right away however long the date range is. Under ASGI the
+response gets an async iterator that pulls the lines one chunk at a time,
+since Django would read a sync iterator to the end before sending it.
+"""
+
+import csv
+from datetime import datetime
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from core import fastjson
+from core.apps.backoffice.models import OrderItem
+
+CHUNK_SIZE = 2000
+
+# Spreadsheet apps run a cell starting with one of these as a formula.
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+class Export:
+    """
+    An export: the `(lookup, column)` pairs to write and, optionally, how
+    to get its rows from the filtered queryset of the list it hangs off.
+    """
+
+    def __init__(self, name, columns, rows=None):
+        self.name = name
+        self.lookups = [lookup for lookup, _ in columns]
+        self.headers = [header for _, header in columns]
+        self.rows = rows
+
+    def queryset(self, filtered):
+        if self.rows is not None:
+            filtered = self.rows(filtered)
+        return (
+            filtered.select_related(None)
+            .prefetch_related(None)
+            .values_list(*self.lookups)
+        )
+
+
+ORDERS = Export(
+    "ventas",
+    [
+        ("pk", "id"),
+        ("created_at", "created_at"),
+        ("client_name", "client_name"),
+        ("status", "status"),
+        ("total_amount", "total_amount"),
+        ("paid_at", "paid_at"),
+        ("created_by__username", "created_by"),
+        ("collected_by__username", "collected_by"),
+    ],
+)
+
+ORDER_ITEMS = Export(
+    "detalle-ventas",
+    [
+        ("order_id", "order_id"),
+        ("order__created_at", "order_created_at"),
+        ("order__status", "order_status"),
+        ("product_id", "product_id"),
+        ("product__name", "product_name"),
+        ("quantity", "quantity"),
+        ("unit_price", "unit_price"),
+        ("subtotal", "subtotal"),
+    ],
+    rows=lambda orders: OrderItem.objects.filter(
+        order__in=orders.order_by().values("pk")
+    ).order_by("order_id", "pk"),
+)
+
+SUPPLIES = Export(
+    "entradas",
+    [
+        ("pk", "id"),
+        ("date", "date"),
+        ("product_id", "product_id"),
+        ("product__name", "product_name"),
+        ("quantity", "quantity"),
+        ("unit_cost", "unit_cost"),
+        ("supplier", "supplier"),
+        ("created_by__username", "created_by"),
+    ],
+)
+
+APPOINTMENTS = Export(
+    "citas",
+    [
+        ("pk", "id"),
+        ("date", "date"),
+        ("start_time", "start_time"),
+        ("end_time", "end_time"),
+        ("client_name", "client_name"),
+        ("client_phone", "client_phone"),
+        ("barber__nickname", "barber"),
+        ("status", "status"),
+        ("total_amount", "total_amount"),
+    ],
+)
+
+
+class Echo:
+    """File-like object whose write() returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def local(value):
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return timezone.localtime(value)
+    return value
+
+
+def csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # Free text (client names, products, suppliers) is shown, not run.
+        return "'" + value
+    return local(value)
+
+
+def csv_lines(headers, rows):
+    writer = csv.writer(Echo())
+    # BOM so spreadsheet apps open the file as UTF-8.
+    yield "\ufeff" + writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([csv_cell(value) for value in row])
+
+
+def ndjson_lines(headers, rows):
+    for row in rows:
+        yield fastjson.dumps(dict(zip(headers, map(local, row)))) + b"\n"
+
+
+def filter_data(params, filterset_class):
+    """
+    The query params `filterset_class` filters on (range filters take
+    `<name>_after` / `<name>_before`), leaving out `output`, `page`,
+    `cursor`, `search` and the like; None when none is left so the
+    filterset applies its default ranges, the same way the list view does
+    on a bare URL.
+    """
+    names = filterset_class.base_filters
+    data = params.copy()
+    for key in list(data):
+        if key not in names and key.rsplit("_", 1)[0] not in names:
+            del data[key]
+    return data or None
+
+
+async def aiter_lines(lines):
+    """Async iterator over the sync `lines`, read CHUNK_SIZE lines at a time."""
+    # Thread-sensitive, so every chunk reads from the same connection.
+    next_chunk = sync_to_async(lambda: list(islice(lines, CHUNK_SIZE)))
+    while chunk := await next_chunk():
+        for line in chunk:
+            yield line
+
+
+def export_response(request, export, filtered):
+    """
+    Streams the rows of `export` for the `filtered` queryset in the
+    `?output=` format. Returns None for an unknown format so the caller can
+    answer with its own error.
+    """
+    output = request.GET.get("output", "csv")
+    if output not in FORMATS:
+        return None
+
+    rows = export.queryset(filtered).iterator(chunk_size=CHUNK_SIZE)
+    lines = (csv_lines if output == "csv" else ndjson_lines)(export.headers, rows)
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        lines = aiter_lines(lines)
+    response = StreamingHttpResponse(lines, content_type=FORMATS[output])
+    filename = f"{export.name}-{timezone.localdate():%Y%m%d}.{output}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
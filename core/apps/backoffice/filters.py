@@ -1,14 +1,26 @@
 import django_filters
 from django import forms
 from django.utils import timezone
-from django.db.models import Q
 from django.contrib.auth.models import User, Group
-from core.apps.backoffice.models import Category, Product, Order, SupplyEntry, BarberProfile, Appointment
+from core.apps.backoffice.models import Category, Product, Order, SupplyEntry, Appointment
+from core.apps.backoffice import choices
+from core.apps.backoffice.search import search_method
+
+
+class CachedModelChoiceFilter(django_filters.ModelChoiceFilter):
+    """ModelChoiceFilter whose dropdown is served from a ChoiceList."""
+
+    field_class = choices.CachedModelChoiceField
+
+    def __init__(self, choice_list, *args, **kwargs):
+        kwargs["choice_list"] = choice_list
+        kwargs.setdefault("queryset", choice_list.queryset)
+        super().__init__(*args, **kwargs)
 
 
 class SupplyEntryFilter(django_filters.FilterSet):
     keywords = django_filters.CharFilter(
-        method="filter_keywords",
+        method=search_method("product__name", "supplier"),
         label="Buscar",
         widget=forms.TextInput(
             attrs={"class": "form-control", "placeholder": "Producto o proveedor..."}
@@ -21,11 +33,6 @@ class SupplyEntryFilter(django_filters.FilterSet):
         ),
     )
 
-    def filter_keywords(self, queryset, name, value):
-        return queryset.filter(
-            Q(product__name__icontains=value) | Q(supplier__icontains=value)
-        )
-
     def __init__(self, data=None, queryset=None, *, request=None, prefix=None):
         if data is None:
             data = {}
@@ -55,13 +62,13 @@ class SupplyEntryFilter(django_filters.FilterSet):
 
 
 class OrderFilter(django_filters.FilterSet):
-    created_by = django_filters.ModelChoiceFilter(
-        queryset=User.objects.filter(is_active=True),
+    created_by = CachedModelChoiceFilter(
+        choices.ACTIVE_USERS,
         label="Registrado por",
         widget=forms.Select(attrs={"class": "form-select"}),
     )
     client_name = django_filters.CharFilter(
-        lookup_expr="icontains",
+        method=search_method(),
         label="Cliente",
         widget=forms.TextInput(
             attrs={"class": "form-control", "placeholder": "Buscar cliente..."}
@@ -106,14 +113,14 @@ class OrderFilter(django_filters.FilterSet):
 
 class ProductFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(
-        lookup_expr="icontains",
+        method=search_method(),
         label="Nombre",
         widget=forms.TextInput(
             attrs={"class": "form-control", "placeholder": "Buscar por nombre..."}
         ),
     )
-    category = django_filters.ModelChoiceFilter(
-        queryset=Category.objects.filter(status=True),
+    category = CachedModelChoiceFilter(
+        choices.ACTIVE_CATEGORIES,
         label="Categoría",
         widget=forms.Select(attrs={"class": "form-select"}),
     )
@@ -132,7 +139,7 @@ class ProductFilter(django_filters.FilterSet):
 
 class CategoryFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(
-        lookup_expr="icontains",
+        method=search_method(),
         label="Nombre",
         widget=forms.TextInput(
             attrs={"class": "form-control", "placeholder": "Buscar por nombre..."}
@@ -162,14 +169,14 @@ class CategoryFilter(django_filters.FilterSet):
 
 class UserFilter(django_filters.FilterSet):
     username = django_filters.CharFilter(
-        lookup_expr="icontains",
+        method=search_method(),
         label="Usuario",
         widget=forms.TextInput(
             attrs={"class": "form-control", "placeholder": "Buscar por usuario..."}
         ),
     )
     email = django_filters.CharFilter(
-        lookup_expr="icontains",
+        method=search_method(),
         label="Email",
         widget=forms.TextInput(
             attrs={"class": "form-control", "placeholder": "Buscar por email..."}
@@ -199,7 +206,7 @@ class UserFilter(django_filters.FilterSet):
 
 class GroupFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(
-        lookup_expr="icontains",
+        method=search_method(),
         label="Nombre",
         widget=forms.TextInput(
             attrs={"class": "form-control", "placeholder": "Buscar por nombre..."}
@@ -213,7 +220,7 @@ class GroupFilter(django_filters.FilterSet):
 
 class BarberProfileFilter(django_filters.FilterSet):
     nickname = django_filters.CharFilter(
-        lookup_expr="icontains",
+        method=search_method(),
         label="Apodo",
         widget=forms.TextInput(
             attrs={"class": "form-control", "placeholder": "Buscar por apodo..."}
@@ -239,14 +246,14 @@ class BarberProfileFilter(django_filters.FilterSet):
 
 class AppointmentFilter(django_filters.FilterSet):
     client_name = django_filters.CharFilter(
-        lookup_expr="icontains",
+        method=search_method(),
         label="Cliente",
         widget=forms.TextInput(
             attrs={"class": "form-control", "placeholder": "Buscar cliente..."}
         ),
     )
-    barber = django_filters.ModelChoiceFilter(
-        queryset=BarberProfile.objects.all(),
+    barber = CachedModelChoiceFilter(
+        choices.BARBERS,
         label="Barbero",
         widget=forms.Select(attrs={"class": "form-select"}),
     )
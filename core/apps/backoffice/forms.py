@@ -1,15 +1,33 @@
 from django import forms
-from django.contrib.auth.models import User, Group, Permission
-from django.apps import apps
+from django.contrib.auth.models import User, Group
+from django.urls import reverse_lazy
+from django.utils.functional import cached_property
 from core.apps.backoffice.models import Category, Product, Order, OrderItem, SupplyEntry, BarberProfile, WorkSchedule, Appointment
+from core.apps.backoffice.choices import (
+    BARBERS,
+    PRODUCTS,
+    SERVICES,
+    STOCK_PRODUCTS,
+    AutocompleteSelect,
+    CachedModelChoiceField,
+    CachedModelMultipleChoiceField,
+)
+from core.apps.backoffice.permissions import get_permission_tree
+from core.apps.backoffice.stock import check_stock
 
 
 class SupplyEntryForm(forms.ModelForm):
+    # Solo productos (no servicios)
+    product = CachedModelChoiceField(
+        STOCK_PRODUCTS,
+        widget=forms.Select(attrs={"class": "form-select choices"}),
+        label="Producto",
+    )
+
     class Meta:
         model = SupplyEntry
         fields = ["product", "quantity", "unit_cost", "supplier"]
         widgets = {
-            "product": forms.Select(attrs={"class": "form-select choices"}),
             "quantity": forms.NumberInput(
                 attrs={"class": "form-control", "placeholder": "0"}
             ),
@@ -21,7 +39,6 @@ class SupplyEntryForm(forms.ModelForm):
             ),
         }
         labels = {
-            "product": "Producto",
             "quantity": "Cantidad",
             "unit_cost": "Costo Unitario",
             "supplier": "Proveedor",
@@ -29,9 +46,6 @@ class SupplyEntryForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Filtrar solo productos (no servicios)
-        self.fields['product'].queryset = Product.objects.filter(is_service=False).order_by('name')
-
         for field_name in self.errors:
             if field_name in self.fields:
                 current_class = self.fields[field_name].widget.attrs.get("class", "")
@@ -68,11 +82,25 @@ class OrderForm(forms.ModelForm):
 
 
 class OrderItemForm(forms.ModelForm):
+    # Solo se renderiza el producto elegido; el resto se busca en el
+    # autocompletado, así la página no crece con catálogo × filas.
+    product = CachedModelChoiceField(
+        PRODUCTS,
+        widget=AutocompleteSelect(
+            reverse_lazy("product-autocomplete"),
+            attrs={"class": "form-select product-select"},
+        ),
+    )
+
+    # `product` queda fuera de Meta.fields y clean_product() lo asigna a la
+    # instancia: el campo ya solo devuelve productos existentes, así la
+    # validación del modelo no repite por fila el SELECT de la ForeignKey.
+    field_order = ["product", "quantity", "unit_price"]
+
     class Meta:
         model = OrderItem
-        fields = ["product", "quantity", "unit_price"]
+        fields = ["quantity", "unit_price"]
         widgets = {
-            "product": forms.Select(attrs={"class": "form-select product-select"}),
             "quantity": forms.NumberInput(
                 attrs={"class": "form-control quantity-input", "min": "1"}
             ),
@@ -81,8 +109,12 @@ class OrderItemForm(forms.ModelForm):
             ),
         }
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, products=None, **kwargs):
         super().__init__(*args, **kwargs)
+        if self.instance.product_id is not None:
+            self.initial.setdefault("product", self.instance.product_id)
+        # Productos ya leídos por el formset para todas las filas
+        self.fields["product"].preloaded = products
         for field_name in self.errors:
             if field_name in self.fields:
                 current_class = self.fields[field_name].widget.attrs.get("class", "")
@@ -91,17 +123,52 @@ class OrderItemForm(forms.ModelForm):
                         "class"
                     ] = f"{current_class} is-invalid".strip()
 
+    def clean_product(self):
+        product = self.cleaned_data["product"]
+        self.instance.product = product
+        return product
+
+
+class BaseOrderItemFormSet(forms.BaseInlineFormSet):
+    """
+    Valida el stock de todas las filas a la vez: los productos se leen en
+    una sola consulta y las cantidades se suman por producto, así dos filas
+    del mismo producto no pasan cada una por separado.
+    """
+
+    @cached_property
+    def products(self):
+        pks = set()
+        if self.is_bound:
+            for i in range(self.total_form_count()):
+                value = self.data.get(f"{self.add_prefix(i)}-product")
+                if value and str(value).isdigit():
+                    pks.add(int(value))
+        return self.form.base_fields["product"].queryset.in_bulk(pks)
+
+    def get_form_kwargs(self, index):
+        kwargs = super().get_form_kwargs(index)
+        kwargs["products"] = self.products
+        return kwargs
+
     def clean(self):
-        cleaned_data = super().clean()
-        product = cleaned_data.get("product")
-        quantity = cleaned_data.get("quantity")
-
-        if product and quantity:
-            if not product.is_service and product.stock_qty < quantity:
-                self.add_error(
-                    "quantity", f"Stock insuficiente. Disponible: {product.stock_qty}."
-                )
-        return cleaned_data
+        super().clean()
+        rows = []
+        for form in self.forms:
+            if not hasattr(form, "cleaned_data") or self._should_delete_form(form):
+                continue
+            product = form.cleaned_data.get("product")
+            quantity = form.cleaned_data.get("quantity")
+            if product and quantity:
+                rows.append((form, product, quantity))
+
+        _, shortages = check_stock(
+            [(product.pk, quantity) for _, product, quantity in rows],
+            products={product.pk: product for _, product, _ in rows},
+        )
+        for form, product, _ in rows:
+            if product.pk in shortages:
+                form.add_error("quantity", shortages[product.pk])
 
 
 class ProductForm(forms.ModelForm):
@@ -302,60 +369,31 @@ class GroupForm(forms.ModelForm):
             "permissions": "Permisos",
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.permission_tree = get_permission_tree()
+        # Etiquetas precalculadas en lugar de str() de cada permiso.
+        self.fields["permissions"].choices = self.permission_tree.choices
+
     def get_grouped_permissions(self):
         """
         Returns permissions grouped by ContentType (App | Model).
-        Maps the form's bound widgets to the correct structure.
+        Maps the form's bound widgets to the prebuilt permission tree.
         """
         widgets = {}
         for widget in self["permissions"]:
             widgets[int(str(widget.data["value"]))] = widget
 
-        perms = Permission.objects.select_related("content_type").order_by(
-            "content_type__app_label", "content_type__model", "codename"
-        )
-
-        grouped = {}
-        for p in perms:
-            app_label = p.content_type.app_label
-            try:
-                app_config = apps.get_app_config(app_label)
-                app_verbose = app_config.verbose_name
-            except LookupError:
-                app_verbose = app_label.title()
-
-            model_class = p.content_type.model_class()
-            if model_class:
-                model_verbose = model_class._meta.verbose_name
-            else:
-                model_verbose = p.content_type.name
-
-            label = f"{app_verbose} | {model_verbose.title()}"
-
-            if label not in grouped:
-                grouped[label] = []
-
-            if p.id in widgets:
-                widget = widgets[p.id]
-
-                codename = p.codename
-                perm_label = p.name
-
-                if model_class:
-                    model_name_lower = model_verbose.lower()
-                    if codename.startswith("add_"):
-                        perm_label = f"Agregar {model_name_lower}"
-                    elif codename.startswith("change_"):
-                        perm_label = f"Editar {model_name_lower}"
-                    elif codename.startswith("delete_"):
-                        perm_label = f"Eliminar {model_name_lower}"
-                    elif codename.startswith("view_"):
-                        perm_label = f"Ver {model_name_lower}"
-
-                widget.custom_label = perm_label
-                grouped[label].append(widget)
-
-        return grouped.items()
+        grouped = []
+        for group in self.permission_tree.groups:
+            group_widgets = []
+            for pk, label in group.permissions:
+                if pk in widgets:
+                    widget = widgets[pk]
+                    widget.custom_label = label
+                    group_widgets.append(widget)
+            grouped.append((group.label, group_widgets))
+        return grouped
 
 
 class BarberProfileForm(forms.ModelForm):
@@ -547,6 +585,17 @@ class AppointmentForm(forms.ModelForm):
         input_formats=["%H:%M", "%I:%M %p", "%I:%M%p"],
         label="Hora Fin"
     )
+    barber = CachedModelChoiceField(
+        BARBERS,
+        widget=forms.Select(attrs={"class": "form-select choices"}),
+        label="Barbero",
+    )
+    # Solo productos marcados como servicio
+    services = CachedModelMultipleChoiceField(
+        SERVICES,
+        widget=forms.SelectMultiple(attrs={"class": "form-select choices multiple-remove"}),
+        label="Servicios",
+    )
 
     class Meta:
         model = Appointment
@@ -564,8 +613,6 @@ class AppointmentForm(forms.ModelForm):
         widgets = {
             "client_name": forms.TextInput(attrs={"class": "form-control"}),
             "client_phone": forms.TextInput(attrs={"class": "form-control"}),
-            "barber": forms.Select(attrs={"class": "form-select choices"}),
-            "services": forms.SelectMultiple(attrs={"class": "form-select choices multiple-remove"}),
             "date": forms.TextInput(attrs={"class": "form-control flatpickr-date", "placeholder": "YYYY-MM-DD"}),
             "start_time": forms.TextInput(attrs={"class": "form-control flatpickr-time h-100", "placeholder": "09:00 AM"}),
             "end_time": forms.TextInput(attrs={"class": "form-control flatpickr-time h-100", "placeholder": "10:00 AM"}),
@@ -575,8 +622,6 @@ class AppointmentForm(forms.ModelForm):
         labels = {
             "client_name": "Nombre Cliente",
             "client_phone": "Teléfono / WhatsApp",
-            "barber": "Barbero",
-            "services": "Servicios",
             "date": "Fecha",
             # Labels for start/end time handled in field definition
             "total_amount": "Total Estimado",
@@ -601,9 +646,6 @@ class AppointmentForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Filter services to only show products marked as is_service=True
-        self.fields['services'].queryset = Product.objects.filter(is_service=True)
-        
         for field_name in self.errors:
             if field_name in self.fields:
                 current_class = self.fields[field_name].widget.attrs.get("class", "")
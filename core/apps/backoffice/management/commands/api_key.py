@@ -0,0 +1,54 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.api.keys import issue_key, revoke_key, rotate_key
+from core.apps.backoffice.models import ApiKey
+
+
+class Command(BaseCommand):
+    help = (
+        "Emite, rota, revoca o lista las claves de API de las integraciones. "
+        "La clave solo se muestra al emitirla o rotarla."
+    )
+
+    def add_arguments(self, parser):
+        subcommands = parser.add_subparsers(dest="action", required=True)
+        issue = subcommands.add_parser("issue", help="Emite una clave para un usuario.")
+        issue.add_argument("username")
+        issue.add_argument("--name", required=True, help="Nombre de la integración.")
+        for action, help_text in (
+            ("rotate", "Revoca una clave y emite otra para la misma integración."),
+            ("revoke", "Revoca una clave."),
+        ):
+            subcommand = subcommands.add_parser(action, help=help_text)
+            subcommand.add_argument("prefix")
+        subcommands.add_parser("list", help="Lista las claves vigentes.")
+
+    def handle(self, *args, **options):
+        action = options["action"]
+        if action == "issue":
+            try:
+                user = User.objects.get(username=options["username"])
+            except User.DoesNotExist:
+                raise CommandError(f"No existe el usuario '{options['username']}'.")
+            self.write_key(*issue_key(user, options["name"]))
+        elif action == "list":
+            for api_key in ApiKey.objects.filter(revoked_at=None).select_related("user"):
+                self.stdout.write(
+                    f"{api_key.prefix}  {api_key.name}  {api_key.user.username}  "
+                    f"{api_key.created_at:%Y-%m-%d}"
+                )
+        else:
+            try:
+                api_key = ApiKey.objects.get(prefix=options["prefix"], revoked_at=None)
+            except ApiKey.DoesNotExist:
+                raise CommandError(f"No hay una clave vigente con prefijo '{options['prefix']}'.")
+            if action == "rotate":
+                self.write_key(*rotate_key(api_key))
+            else:
+                revoke_key(api_key)
+                self.stdout.write(self.style.SUCCESS(f"Clave {api_key} revocada."))
+
+    def write_key(self, api_key, key):
+        self.stdout.write(self.style.SUCCESS(f"Clave {api_key} emitida para {api_key.user}:"))
+        self.stdout.write(key)
@@ -0,0 +1,133 @@
+import time as timer
+from datetime import time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.api.views import (
+    AppointmentViewSet,
+    BarberProfileViewSet,
+    CategoryViewSet,
+    ProductViewSet,
+)
+from core.apps.backoffice.models import (
+    Appointment,
+    BarberProfile,
+    Category,
+    Product,
+    WorkSchedule,
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el tiempo de los listados del API con serializers vs. el modo "
+        "rápido basado en values(). Los datos de prueba se revierten al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", type=int, nargs="+", default=[1000, 10000],
+            help="Cantidad de filas por endpoint.",
+        )
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options["sizes"], options["repeat"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, sizes, repeat):
+        factory = APIRequestFactory()
+        user = User.objects.create_superuser(username="bench_api_lists")
+        endpoints = [
+            ("products", ProductViewSet, self.seed_products),
+            ("categories", CategoryViewSet, self.seed_categories),
+            ("barbers", BarberProfileViewSet, self.seed_barbers),
+            ("appointments", AppointmentViewSet, self.seed_appointments),
+        ]
+        view_kwargs = {"get": "list"}
+
+        for name, viewset, seed in endpoints:
+            created = 0
+            for size in sizes:
+                seed(size - created, created)
+                created = size
+                view = viewset.as_view(view_kwargs)
+                results = {}
+                for fast in (False, True):
+                    with override_settings(API_FAST_LIST=fast):
+                        best = None
+                        for _ in range(repeat):
+                            request = factory.get(f"/api/{name}/")
+                            force_authenticate(request, user=user)
+                            start = timer.perf_counter()
+                            response = view(request)
+                            response.render()
+                            elapsed = timer.perf_counter() - start
+                            best = elapsed if best is None else min(best, elapsed)
+                        results[fast] = best
+                self.stdout.write(
+                    f"{name:<13} {size:>6} filas  serializer {results[False] * 1000:8.1f} ms"
+                    f"  values() {results[True] * 1000:8.1f} ms"
+                    f"  x{results[False] / results[True]:.1f}"
+                )
+
+    def seed_products(self, count, offset):
+        category = Category.objects.create(name=f"Bench {offset}")
+        Product.objects.bulk_create(
+            Product(name=f"Producto {offset + i}", price="9.90", category=category)
+            for i in range(count)
+        )
+
+    def seed_categories(self, count, offset):
+        Category.objects.bulk_create(
+            Category(name=f"Categoría bench {offset + i}") for i in range(count)
+        )
+
+    def seed_barbers(self, count, offset):
+        users = User.objects.bulk_create(
+            User(username=f"bench_barber_{offset + i}", first_name="Bench")
+            for i in range(count)
+        )
+        barbers = BarberProfile.objects.bulk_create(
+            BarberProfile(user=user, nickname=user.username) for user in users
+        )
+        WorkSchedule.objects.bulk_create(
+            WorkSchedule(
+                barber=barber, day_of_week=day, start_hour=time(9), end_hour=time(18)
+            )
+            for barber in barbers
+            for day in range(6)
+        )
+
+    def seed_appointments(self, count, offset):
+        user = User.objects.create_user(username=f"bench_agenda_{offset}")
+        barber = BarberProfile.objects.create(user=user, nickname="Bench")
+        service = Product.objects.create(
+            name=f"Servicio bench {offset}", price="25.00", is_service=True
+        )
+        date = timezone.localdate() + timedelta(days=1)
+        appointments = Appointment.objects.bulk_create(
+            Appointment(
+                client_name=f"Cliente {offset + i}", client_phone="999999999",
+                barber=barber, date=date, start_time=time(10), end_time=time(10, 30),
+                total_amount="25.00",
+            )
+            for i in range(count)
+        )
+        Appointment.services.through.objects.bulk_create(
+            Appointment.services.through(appointment=appointment, product=service)
+            for appointment in appointments
+        )
@@ -0,0 +1,73 @@
+import threading
+import time as timer
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, transaction
+
+from core.apps.backoffice import signals
+from core.apps.backoffice.models import Order
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide cuántas transacciones con ventas por segundo admite la base de "
+        "datos con y sin el incremento de la versión de tabla, que se hace "
+        "tras el commit. Las ventas de prueba se eliminan al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--transactions", type=int, default=50)
+        parser.add_argument(
+            "--hold", type=float, default=5,
+            help="Milisegundos que cada transacción sigue abierta tras guardar.",
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(username="bench_version_bumps")
+        try:
+            args = (user, options["threads"], options["transactions"], options["hold"])
+            results = {True: self.run(*args)}
+            with mock.patch.object(signals, "bump_version", lambda *models: None):
+                results[False] = self.run(*args)
+        finally:
+            Order.objects.filter(created_by=user).delete()
+            user.delete()
+
+        self.stdout.write(
+            f"{connection.vendor:<10} con versión {results[True]:8.1f} tx/s"
+            f"  sin versión {results[False]:8.1f} tx/s"
+            f"  x{results[False] / results[True]:.1f}"
+        )
+
+    def run(self, user, threads, transactions, hold):
+        committed = []
+        failed = []
+
+        def work():
+            try:
+                for _ in range(transactions):
+                    try:
+                        with transaction.atomic():
+                            Order.objects.create(client_name="Bench", created_by=user)
+                            timer.sleep(hold / 1000)
+                    except DatabaseError:
+                        # SQLite gives up on lock upgrades instead of waiting.
+                        failed.append(1)
+                    else:
+                        committed.append(1)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=work) for _ in range(threads)]
+        start = timer.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = timer.perf_counter() - start
+        if failed:
+            self.stdout.write(f"{len(failed)} transacciones fallaron por bloqueo.")
+        return len(committed) / elapsed
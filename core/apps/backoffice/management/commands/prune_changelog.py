@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.apps.backoffice.models import ChangeLogEntry
+
+
+class Command(BaseCommand):
+    help = (
+        "Elimina del registro de cambios las entradas más antiguas que N días. "
+        "Los clientes con un cursor anterior deberán sincronizar todo de nuevo. "
+        "La entrada más reciente se conserva siempre: marca hasta dónde se podó."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        newest = ChangeLogEntry.objects.order_by("-pk").values_list("pk", flat=True).first()
+        deleted, _ = (
+            ChangeLogEntry.objects.filter(created_at__lt=cutoff)
+            .exclude(pk=newest)
+            .delete()
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Entradas eliminadas del registro de cambios: {deleted}")
+        )
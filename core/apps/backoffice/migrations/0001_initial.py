@@ -0,0 +1,228 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:36
+
+import django.db.models.deletion
+import django.db.models.functions.datetime
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Nombre')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='Descripción')),
+                ('status', models.BooleanField(default=True, verbose_name='Estado')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Última Modificación')),
+            ],
+            options={
+                'verbose_name': 'Categoría',
+                'verbose_name_plural': 'Categorías',
+            },
+        ),
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=100, verbose_name='Tabla')),
+                ('object_id', models.BigIntegerField(verbose_name='ID del Registro')),
+                ('action', models.CharField(choices=[('UPSERT', 'Creado / Modificado'), ('DELETE', 'Eliminado')], max_length=10, verbose_name='Acción')),
+                ('created_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), db_index=True, verbose_name='Fecha')),
+            ],
+            options={
+                'verbose_name': 'Cambio Registrado',
+                'verbose_name_plural': 'Registro de Cambios',
+            },
+        ),
+        migrations.CreateModel(
+            name='TableVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=100, unique=True, verbose_name='Tabla')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Versión')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Última Modificación')),
+            ],
+            options={
+                'verbose_name': 'Versión de Tabla',
+                'verbose_name_plural': 'Versiones de Tablas',
+            },
+        ),
+        migrations.CreateModel(
+            name='ApiKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Nombre')),
+                ('prefix', models.CharField(max_length=16, unique=True, verbose_name='Prefijo')),
+                ('digest', models.CharField(max_length=64, unique=True, verbose_name='Huella')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('revoked_at', models.DateTimeField(blank=True, null=True, verbose_name='Revocada el')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='api_keys', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Clave de API',
+                'verbose_name_plural': 'Claves de API',
+            },
+        ),
+        migrations.CreateModel(
+            name='BarberProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nickname', models.CharField(blank=True, max_length=50, null=True, verbose_name='Apodo')),
+                ('photo', models.ImageField(blank=True, null=True, upload_to='barbers/')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Disponible en Web')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Última Modificación')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='barber_profile', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Perfil de Barbero',
+                'verbose_name_plural': 'Perfiles de Barberos',
+            },
+        ),
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('client_name', models.CharField(max_length=150, verbose_name='Nombre del Cliente')),
+                ('client_ref', models.CharField(blank=True, help_text='ID generado por el POS offline, evita registrar la venta dos veces.', max_length=64, null=True, unique=True, verbose_name='Referencia del Cliente')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('paid_at', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Pago')),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente de Pago'), ('PAID', 'Pagado / Finalizado'), ('CANCELED', 'Anulado')], default='PENDING', max_length=20, verbose_name='Estado')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Total')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Última Modificación')),
+                ('collected_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='collected_orders', to=settings.AUTH_USER_MODEL, verbose_name='Cobrado por')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='created_orders', to=settings.AUTH_USER_MODEL, verbose_name='Registrado por')),
+            ],
+            options={
+                'verbose_name': 'Venta',
+                'verbose_name_plural': 'Ventas',
+                'permissions': [('can_print_order', 'Puede imprimir orden'), ('can_mark_order_as_paid', 'Puede marcar orden como pagada')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='Nombre del Producto/Servicio')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Precio de Venta')),
+                ('cost', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Costo de Compra')),
+                ('is_service', models.BooleanField(default=False, help_text='Marcar si es corte, barba, etc.', verbose_name='¿Es Servicio?')),
+                ('duration', models.PositiveIntegerField(default=30, help_text='Tiempo estimado en minutos.', verbose_name='Duración (min)')),
+                ('stock_qty', models.IntegerField(default=0, verbose_name='Stock Actual')),
+                ('min_stock_alert', models.IntegerField(default=5, verbose_name='Alerta de Stock Mínimo')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Última Modificación')),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='backoffice.category', verbose_name='Categoría')),
+            ],
+            options={
+                'verbose_name': 'Producto / Servicio',
+                'verbose_name_plural': 'Productos y Servicios',
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(default=1, verbose_name='Cantidad')),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Precio Unitario')),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Subtotal')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='backoffice.order')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='backoffice.product', verbose_name='Item')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Appointment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('client_name', models.CharField(max_length=150, verbose_name='Nombre Cliente')),
+                ('client_phone', models.CharField(max_length=20, verbose_name='WhatsApp / Teléfono')),
+                ('date', models.DateField(verbose_name='Fecha')),
+                ('start_time', models.TimeField(verbose_name='Hora Inicio')),
+                ('end_time', models.TimeField(verbose_name='Hora Fin')),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Total Estimado')),
+                ('status', models.CharField(choices=[('REQUESTED', 'Solicitud (Pendiente de Contacto)'), ('CONFIRMED', 'Confirmada (Cliente Contactado)'), ('COMPLETED', 'Atendida'), ('CANCELED', 'Cancelada / No Contestó')], default='REQUESTED', max_length=20, verbose_name='Estado Actual')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('barber', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='backoffice.barberprofile', verbose_name='Barbero')),
+                ('services', models.ManyToManyField(to='backoffice.product', verbose_name='Servicios Solicitados')),
+            ],
+            options={
+                'verbose_name': 'Solicitud de Cita',
+                'verbose_name_plural': 'Agenda de Solicitudes',
+                'ordering': ['date', 'start_time'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SupplyEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Cantidad (Unidades)')),
+                ('unit_cost', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Costo Unitario')),
+                ('supplier', models.CharField(blank=True, max_length=100, null=True, verbose_name='Proveedor')),
+                ('date', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Ingreso')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Registrado por')),
+                ('product', models.ForeignKey(limit_choices_to={'is_service': False}, on_delete=django.db.models.deletion.PROTECT, to='backoffice.product', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Entrada de Insumo',
+                'verbose_name_plural': 'Entradas de Inventario',
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day_of_week', models.IntegerField(choices=[(0, 'Lunes'), (1, 'Martes'), (2, 'Miércoles'), (3, 'Jueves'), (4, 'Viernes'), (5, 'Sábado'), (6, 'Domingo')], verbose_name='Día de la Semana')),
+                ('start_hour', models.TimeField(verbose_name='Hora Entrada')),
+                ('end_hour', models.TimeField(verbose_name='Hora Salida')),
+                ('lunch_start', models.TimeField(blank=True, null=True, verbose_name='Inicio Refrigerio')),
+                ('lunch_end', models.TimeField(blank=True, null=True, verbose_name='Fin Refrigerio')),
+                ('barber', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='backoffice.barberprofile')),
+            ],
+            options={
+                'verbose_name': 'Horario Laboral',
+                'verbose_name_plural': 'Horarios Laborales',
+                'ordering': ['day_of_week'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 'PAID')), fields=['paid_at'], name='order_paid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_by', 'status', 'created_at'], name='order_creator_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at'], name='order_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 'PENDING')), fields=['created_at'], name='order_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_service', False)), fields=['stock_qty', 'min_stock_alert'], name='product_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['barber', 'date', 'start_time'], name='appt_barber_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['date', 'start_time'], name='appt_date_start_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='workschedule',
+            unique_together={('barber', 'day_of_week')},
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from core.apps.backoffice import search
+
+try:
+    from django.contrib.postgres.operations import TrigramExtension
+except ImportError:
+    # No PostgreSQL driver installed, so there is no database to create it in.
+    extension = []
+else:
+    extension = [TrigramExtension()]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("backoffice", "0001_initial"),
+    ]
+
+    operations = [
+        *extension,
+        migrations.RunPython(search.install, search.uninstall, elidable=False),
+    ]
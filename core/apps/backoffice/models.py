@@ -5,11 +5,13 @@ This module defines the data structures used in the backoffice.
 
 from datetime import time, timedelta, date, datetime
 from django.db import models, transaction, IntegrityError
-from django.db.models import Sum
+from django.db.models import Q, Sum
+from django.db.models.functions import Now
 from django.contrib.auth.models import User, Group
 from django.core.exceptions import ValidationError
 from decimal import Decimal
 from django.utils import timezone
+from core.apps.backoffice.dates import day_range
 
 
 class Category(models.Model):
@@ -20,6 +22,9 @@ class Category(models.Model):
     name = models.CharField(max_length=100, unique=True, verbose_name="Nombre")
     description = models.TextField(blank=True, null=True, verbose_name="Descripción")
     status = models.BooleanField(default=True, verbose_name="Estado")
+    updated_at = models.DateTimeField(
+        auto_now=True, db_index=True, verbose_name="Última Modificación"
+    )
 
     class Meta:
         verbose_name = "Categoría"
@@ -60,13 +65,53 @@ class Product(models.Model):
     min_stock_alert = models.IntegerField(
         default=5, verbose_name="Alerta de Stock Mínimo"
     )
+    updated_at = models.DateTimeField(
+        auto_now=True, db_index=True, verbose_name="Última Modificación"
+    )
 
     class Meta:
         verbose_name = "Producto / Servicio"
         verbose_name_plural = "Productos y Servicios"
+        indexes = [
+            # Alerta de stock bajo del dashboard (solo productos físicos)
+            models.Index(
+                fields=["stock_qty", "min_stock_alert"],
+                condition=Q(is_service=False),
+                name="product_stock_idx",
+            ),
+        ]
+
+    SERVICE_STOCK_ERROR = "Los servicios no llevan control de stock."
 
     def __str__(self):
-        return f"{self.name} ({'Servicio' if self.is_service else 'Producto'})"
+        return self.label(self.name, self.is_service)
+
+    @staticmethod
+    def label(name, is_service):
+        """Etiqueta de un producto a partir de columnas sueltas, sin instanciarlo."""
+        return f"{name} ({'Servicio' if is_service else 'Producto'})"
+
+    def receive_supplies(self, entries):
+        """
+        Suma al stock las entradas `(cantidad, costo_unitario)` y recalcula
+        el costo promedio ponderado en memoria. No guarda el producto.
+
+        El costo se redondea a los decimales del campo después de cada
+        entrada, igual que al guardar las entradas una por una.
+        """
+        if self.is_service:
+            raise ValidationError(self.SERVICE_STOCK_ERROR)
+
+        cents = Decimal(1).scaleb(-self._meta.get_field("cost").decimal_places)
+        for quantity, unit_cost in entries:
+            # Valor total del inventario existente más el de lo nuevo
+            new_total_stock = self.stock_qty + quantity
+            if new_total_stock > 0:
+                inventory_value = self.stock_qty * self.cost + quantity * Decimal(unit_cost)
+                self.cost = (inventory_value / new_total_stock).quantize(cents)
+            else:
+                self.cost = Decimal(unit_cost)
+            self.stock_qty = new_total_stock
 
 
 class Order(models.Model):
@@ -82,6 +127,14 @@ class Order(models.Model):
     ]
 
     client_name = models.CharField(max_length=150, verbose_name="Nombre del Cliente")
+    client_ref = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name="Referencia del Cliente",
+        help_text="ID generado por el POS offline, evita registrar la venta dos veces.",
+    )
 
     created_by = models.ForeignKey(
         User,
@@ -111,10 +164,34 @@ class Order(models.Model):
     total_amount = models.DecimalField(
         max_digits=10, decimal_places=2, default=0, verbose_name="Total"
     )
+    updated_at = models.DateTimeField(
+        auto_now=True, db_index=True, verbose_name="Última Modificación"
+    )
 
     class Meta:
         verbose_name = "Venta"
         verbose_name_plural = "Ventas"
+        indexes = [
+            # Ventas cobradas por día / mes (dashboard)
+            models.Index(
+                fields=["paid_at"],
+                condition=Q(status="PAID"),
+                name="order_paid_idx",
+            ),
+            # Órdenes en curso de un barbero en un día (disponibilidad)
+            models.Index(
+                fields=["created_by", "status", "created_at"],
+                name="order_creator_status_idx",
+            ),
+            # Órdenes del día y listados por fecha
+            models.Index(fields=["created_at"], name="order_created_idx"),
+            # Vista por defecto del listado: pendientes de la semana
+            models.Index(
+                fields=["created_at"],
+                condition=Q(status="PENDING"),
+                name="order_pending_idx",
+            ),
+        ]
         permissions = [
             ("can_print_order", "Puede imprimir orden"),
             ("can_mark_order_as_paid", "Puede marcar orden como pagada"),
@@ -129,7 +206,7 @@ class Order(models.Model):
         """
         total = self.items.aggregate(total=Sum('subtotal'))['total'] or 0
         self.total_amount = total
-        self.save(update_fields=['total_amount'])
+        self.save(update_fields=['total_amount', 'updated_at'])
 
     @transaction.atomic
     def mark_as_paid(self, user_who_collected):
@@ -140,20 +217,14 @@ class Order(models.Model):
         if self.status == "PAID":
             return
 
-        for item in self.items.all():
-            if not item.product.is_service:
-                product_locked = Product.objects.select_for_update().get(
-                    pk=item.product.pk
-                )
-
-                if product_locked.stock_qty < item.quantity:
-                    raise ValidationError(
-                        f"Stock insuficiente para '{product_locked.name}'. "
-                        f"Solicitado: {item.quantity}, Disponible: {product_locked.stock_qty}"
-                    )
+        # stock.py importa este módulo.
+        from core.apps.backoffice.stock import check_stock, deduct_stock
 
-                product_locked.stock_qty -= item.quantity
-                product_locked.save()
+        lines = list(self.items.values_list("product_id", "quantity"))
+        products, shortages = check_stock(lines, lock=True)
+        if shortages:
+            raise ValidationError("; ".join(shortages.values()))
+        deduct_stock(lines, products)
 
         self.status = "PAID"
         self.collected_by = user_who_collected
@@ -197,7 +268,10 @@ class SupplyEntry(models.Model):
     """
 
     product = models.ForeignKey(
-        Product, on_delete=models.PROTECT, verbose_name="Producto"
+        Product,
+        on_delete=models.PROTECT,
+        limit_choices_to={"is_service": False},
+        verbose_name="Producto",
     )
     created_by = models.ForeignKey(
         User,
@@ -229,29 +303,8 @@ class SupplyEntry(models.Model):
                     pk=self.product.pk
                 )
 
-                current_stock = locked_product.stock_qty
-                current_cost = locked_product.cost
-
-                # B. Calcular Valor Total del Inventario Existente
-                current_inventory_value = current_stock * current_cost
-
-                # C. Calcular Valor Total de lo Nuevo
-                new_entry_value = self.quantity * Decimal(self.unit_cost)
-
-                # D. Nuevo Stock Total
-                new_total_stock = current_stock + self.quantity
-
-                # E. Calcular Nuevo Costo Promedio
-                if new_total_stock > 0:
-                    new_average_cost = (
-                        current_inventory_value + new_entry_value
-                    ) / new_total_stock
-                else:
-                    new_average_cost = self.unit_cost
-
                 # Actualizar el producto BLOQUEADO
-                locked_product.stock_qty = new_total_stock
-                locked_product.cost = new_average_cost
+                locked_product.receive_supplies([(self.quantity, self.unit_cost)])
                 locked_product.save()  # Guardamos el producto actualizado
 
                 # Finalmente guardamos la entrada (SupplyEntry)
@@ -271,6 +324,9 @@ class BarberProfile(models.Model):
     nickname = models.CharField(max_length=50, verbose_name="Apodo", blank=True, null=True)
     photo = models.ImageField(upload_to="barbers/", blank=True, null=True)
     is_active = models.BooleanField(default=True, verbose_name="Disponible en Web")
+    updated_at = models.DateTimeField(
+        auto_now=True, db_index=True, verbose_name="Última Modificación"
+    )
 
     class Meta:
         verbose_name = "Perfil de Barbero"
@@ -345,11 +401,21 @@ class Appointment(models.Model):
         verbose_name="Estado Actual"
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = "Solicitud de Cita"
         verbose_name_plural = "Agenda de Solicitudes"
         ordering = ['date', 'start_time']
+        indexes = [
+            # Citas de un barbero en un día, ya ordenadas por hora
+            # (disponibilidad y solapamientos)
+            models.Index(
+                fields=["barber", "date", "start_time"], name="appt_barber_day_idx"
+            ),
+            # Calendario y agenda por rango de fechas
+            models.Index(fields=["date", "start_time"], name="appt_date_start_idx"),
+        ]
 
     def __str__(self):
         return f"{self.client_name} - {self.date} {self.start_time}"
@@ -484,10 +550,12 @@ class Appointment(models.Model):
         # Check Active Orders (Walk-ins)
         # We assume the barber user is the one who created the order
         if self.barber and self.barber.user:
+            day_start, day_end = day_range(self.date)
             active_orders = Order.objects.filter(
                 created_by=self.barber.user,
                 status='PENDING',
-                created_at__date=self.date 
+                created_at__gte=day_start,
+                created_at__lt=day_end,
             ).prefetch_related('items__product')
             
             for order in active_orders:
@@ -513,4 +581,75 @@ class Appointment(models.Model):
 
     def save(self, *args, **kwargs):
         self.clean()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+
+class TableVersion(models.Model):
+    """
+    Contador de versión por tabla, incrementado en cada escritura.
+    Permite validar cachés y ETags sin consultar los datos.
+    """
+
+    table = models.CharField(max_length=100, unique=True, verbose_name="Tabla")
+    version = models.PositiveBigIntegerField(default=0, verbose_name="Versión")
+    updated_at = models.DateTimeField(default=timezone.now, verbose_name="Última Modificación")
+
+    class Meta:
+        verbose_name = "Versión de Tabla"
+        verbose_name_plural = "Versiones de Tablas"
+
+    def __str__(self):
+        return f"{self.table} v{self.version}"
+
+
+class ChangeLogEntry(models.Model):
+    """
+    Registro append-only de altas, cambios y bajas de las tablas que
+    sincronizan los clientes offline. El id creciente sirve de cursor; las
+    entradas se escriben al confirmarse la transacción (ver changelog.py) y
+    la base de datos les pone la fecha al insertarlas.
+    """
+
+    UPSERT = "UPSERT"
+    DELETE = "DELETE"
+    ACTION_CHOICES = [
+        (UPSERT, "Creado / Modificado"),
+        (DELETE, "Eliminado"),
+    ]
+
+    table = models.CharField(max_length=100, verbose_name="Tabla")
+    object_id = models.BigIntegerField(verbose_name="ID del Registro")
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES, verbose_name="Acción")
+    created_at = models.DateTimeField(
+        db_default=Now(), db_index=True, verbose_name="Fecha"
+    )
+
+    class Meta:
+        verbose_name = "Cambio Registrado"
+        verbose_name_plural = "Registro de Cambios"
+
+    def __str__(self):
+        return f"{self.table} #{self.object_id} {self.action}"
+
+
+class ApiKey(models.Model):
+    """
+    Clave de acceso al API para integraciones. Solo se guarda un HMAC de la
+    clave; el prefijo la identifica en los listados y en el comando api_key.
+    """
+
+    user = models.ForeignKey(
+        User, related_name="api_keys", on_delete=models.CASCADE, verbose_name="Usuario"
+    )
+    name = models.CharField(max_length=100, verbose_name="Nombre")
+    prefix = models.CharField(max_length=16, unique=True, verbose_name="Prefijo")
+    digest = models.CharField(max_length=64, unique=True, verbose_name="Huella")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
+    revoked_at = models.DateTimeField(null=True, blank=True, verbose_name="Revocada el")
+
+    class Meta:
+        verbose_name = "Clave de API"
+        verbose_name_plural = "Claves de API"
+
+    def __str__(self):
+        return f"{self.name} ({self.prefix})"
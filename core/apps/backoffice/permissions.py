@@ -0,0 +1,81 @@
+"""
+Permission tree of the group form.
+
+Grouping every permission by app and model and giving it a Spanish label
+needs the app registry and each content type's model class, which don't
+change while the process runs. `get_permission_tree()` builds the tree once
+per Permission table version and keeps it in memory, so rendering the group
+form costs a single version lookup.
+"""
+
+from collections import namedtuple
+
+from django.apps import apps
+from django.contrib.auth.models import Permission
+
+from core.apps.backoffice.versioning import cache_stamp
+
+PermissionNode = namedtuple("PermissionNode", "label permissions")
+
+ACTION_LABELS = {
+    "add": "Agregar",
+    "change": "Editar",
+    "delete": "Eliminar",
+    "view": "Ver",
+}
+
+_tree = None
+
+
+class PermissionTree:
+    """
+    `groups` holds a PermissionNode per app and model, in display order,
+    with `(pk, label)` pairs; `choices` the same pairs as one flat list for
+    the form field.
+    """
+
+    def __init__(self, stamp, groups):
+        self.stamp = stamp
+        self.groups = tuple(groups)
+        self.choices = [choice for group in self.groups for choice in group.permissions]
+
+
+def app_verbose_name(app_label):
+    try:
+        return apps.get_app_config(app_label).verbose_name
+    except LookupError:
+        return app_label.title()
+
+
+def permission_label(permission, model_verbose):
+    action, separator, _ = permission.codename.partition("_")
+    if separator and action in ACTION_LABELS:
+        return f"{ACTION_LABELS[action]} {model_verbose.lower()}"
+    return permission.name
+
+
+def build_groups():
+    permissions = Permission.objects.select_related("content_type").order_by(
+        "content_type__app_label", "content_type__model", "codename"
+    )
+    groups = {}
+    for permission in permissions:
+        content_type = permission.content_type
+        model_class = content_type.model_class()
+        model_verbose = (
+            model_class._meta.verbose_name if model_class else content_type.name
+        )
+        label = f"{app_verbose_name(content_type.app_label)} | {model_verbose.title()}"
+        # Custom permissions of unknown models keep their own name.
+        name = permission_label(permission, model_verbose) if model_class else permission.name
+        groups.setdefault(label, []).append((permission.pk, name))
+    return [PermissionNode(label, tuple(perms)) for label, perms in groups.items()]
+
+
+def get_permission_tree():
+    global _tree
+    stamp = cache_stamp(Permission)
+    tree = _tree
+    if tree is None or tree.stamp != stamp:
+        _tree = tree = PermissionTree(stamp, build_groups())
+    return tree
@@ -0,0 +1,283 @@
+"""
+Indexed substring search for the backoffice filters and the API search box.
+
+`icontains` compiles to `LIKE '%term%'`, which scans the whole table. The
+fields in SEARCH_FIELDS get a backend-specific index instead:
+
+* PostgreSQL: a trigram GIN index on `UPPER(column::text)`, the exact
+  expression Django emits for `icontains`, so the lookup itself is served
+  by the index.
+* SQLite: an FTS5 table with the trigram tokenizer per model, kept in sync
+  by triggers (so `bulk_update()` and `update()` are covered too) and
+  queried with MATCH.
+
+Other backends, other fields and terms shorter than a trigram fall back to
+`icontains`. The fields in PREFIX_FIELDS also get a b-tree index matching
+`istartswith` on each backend, for autocompletes. The structures are
+created once by the `0002_search_indexes` migration (pg_trgm through
+TrigramExtension, which needs a role allowed to create it). On SQLite a
+later migration that rebuilds a table drops its triggers, so after each
+`migrate` the models whose triggers are gone, and only those, get theirs
+back.
+"""
+
+import sqlite3
+
+from django.contrib.auth.models import Group, User
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from core.apps.backoffice.models import (
+    Appointment,
+    BarberProfile,
+    Category,
+    Order,
+    Product,
+    SupplyEntry,
+)
+
+SEARCH_FIELDS = {
+    Category: ["name"],
+    Product: ["name"],
+    Order: ["client_name"],
+    SupplyEntry: ["supplier"],
+    BarberProfile: ["nickname"],
+    Appointment: ["client_name", "client_phone"],
+    User: ["username", "first_name", "email"],
+    Group: ["name"],
+}
+
+# Looked up with `istartswith` (autocomplete).
+PREFIX_FIELDS = {
+    Product: ["name"],
+}
+
+
+def prefix_indexes():
+    """Yields (index name, table, column) for every field in PREFIX_FIELDS."""
+    for model, fields in PREFIX_FIELDS.items():
+        table = model._meta.db_table
+        for name in fields:
+            column = model._meta.get_field(name).column
+            yield f"{table}_{column}_prefix", table, column
+
+
+class SearchBackend:
+    """Plain `icontains`; the fallback for every other database."""
+
+    def is_supported(self, connection):
+        return True
+
+    def install(self, connection):
+        pass
+
+    def uninstall(self, connection):
+        pass
+
+    def repair(self, connection):
+        pass
+
+    def matching_pks(self, model, field, term, connection):
+        """
+        Returns an expression selecting the pks of `model` whose `field`
+        contains `term`, or None to let the caller use `icontains`.
+        """
+        return None
+
+
+class PostgresTrigramBackend(SearchBackend):
+    @staticmethod
+    def trigram_indexes():
+        for model, fields in SEARCH_FIELDS.items():
+            table = model._meta.db_table
+            for name in fields:
+                column = model._meta.get_field(name).column
+                yield f"{table}_{column}_trgm", table, column
+
+    def install(self, connection):
+        with connection.cursor() as cursor:
+            for index, table, column in self.trigram_indexes():
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS "{index}" '
+                    f'ON "{table}" USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+                )
+            # `istartswith` is `UPPER(col::text) LIKE UPPER('term%')`.
+            for index, table, column in prefix_indexes():
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS "{index}" '
+                    f'ON "{table}" ((UPPER("{column}"::text)) text_pattern_ops)'
+                )
+
+    def uninstall(self, connection):
+        with connection.cursor() as cursor:
+            for index, _, _ in [*self.trigram_indexes(), *prefix_indexes()]:
+                cursor.execute(f'DROP INDEX IF EXISTS "{index}"')
+
+
+class SQLiteFTSBackend(SearchBackend):
+    min_length = 3
+
+    def is_supported(self, connection):
+        # The trigram tokenizer was added in SQLite 3.34.
+        return sqlite3.sqlite_version_info >= (3, 34)
+
+    @staticmethod
+    def fts_table(model):
+        return f"{model._meta.db_table}_fts"
+
+    def install(self, connection):
+        with connection.cursor() as cursor:
+            for model, fields in SEARCH_FIELDS.items():
+                self.install_model(cursor, model, fields)
+            self.install_prefix_indexes(cursor)
+
+    def uninstall(self, connection):
+        with connection.cursor() as cursor:
+            for model in SEARCH_FIELDS:
+                self.drop_model(cursor, model)
+            for index, _, _ in prefix_indexes():
+                cursor.execute(f'DROP INDEX IF EXISTS "{index}"')
+
+    def repair(self, connection):
+        """Reinstalls the models whose triggers a table rebuild dropped."""
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+            triggers = {name for (name,) in cursor.fetchall()}
+            for model, fields in SEARCH_FIELDS.items():
+                fts = self.fts_table(model)
+                if not {f"{fts}_ai", f"{fts}_ad", f"{fts}_au"} <= triggers:
+                    self.install_model(cursor, model, fields)
+            self.install_prefix_indexes(cursor)
+
+    @staticmethod
+    def install_prefix_indexes(cursor):
+        # `istartswith` is a case-insensitive LIKE 'term%', which SQLite
+        # only serves from a NOCASE index.
+        for index, table, column in prefix_indexes():
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS "{index}" '
+                f'ON "{table}" ("{column}" COLLATE NOCASE)'
+            )
+
+    def drop_model(self, cursor, model):
+        fts = self.fts_table(model)
+        for suffix in ("ai", "ad", "au"):
+            cursor.execute(f'DROP TRIGGER IF EXISTS "{fts}_{suffix}"')
+        cursor.execute(f'DROP TABLE IF EXISTS "{fts}"')
+
+    def install_model(self, cursor, model, fields):
+        table = model._meta.db_table
+        fts = self.fts_table(model)
+        pk = model._meta.pk.column
+        columns = [model._meta.get_field(name).column for name in fields]
+        names = ", ".join(f'"{column}"' for column in columns)
+        new = ", ".join(f'new."{column}"' for column in columns)
+        old = ", ".join(f'old."{column}"' for column in columns)
+
+        # From scratch, as the rows may have changed while triggers were
+        # missing.
+        self.drop_model(cursor, model)
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE "{fts}" USING fts5({names}, '
+            f"content='{table}', content_rowid='{pk}', tokenize='trigram')"
+        )
+        cursor.execute(
+            f'CREATE TRIGGER "{fts}_ai" AFTER INSERT ON "{table}" BEGIN '
+            f'INSERT INTO "{fts}"(rowid, {names}) VALUES (new."{pk}", {new}); END'
+        )
+        cursor.execute(
+            f'CREATE TRIGGER "{fts}_ad" AFTER DELETE ON "{table}" BEGIN '
+            f'INSERT INTO "{fts}"("{fts}", rowid, {names}) '
+            f"VALUES ('delete', old.\"{pk}\", {old}); END"
+        )
+        cursor.execute(
+            f'CREATE TRIGGER "{fts}_au" AFTER UPDATE OF {names} ON "{table}" BEGIN '
+            f'INSERT INTO "{fts}"("{fts}", rowid, {names}) '
+            f"VALUES ('delete', old.\"{pk}\", {old}); "
+            f'INSERT INTO "{fts}"(rowid, {names}) VALUES (new."{pk}", {new}); END'
+        )
+        cursor.execute(f'INSERT INTO "{fts}"("{fts}") VALUES (\'rebuild\')')
+
+    def matching_pks(self, model, field, term, connection):
+        if len(term) < self.min_length:
+            return None
+        fts = self.fts_table(model)
+        column = model._meta.get_field(field).column
+        phrase = '"{}"'.format(term.replace('"', '""'))
+        return RawSQL(
+            f'SELECT rowid FROM "{fts}" WHERE "{fts}" MATCH %s',
+            [f'"{column}" : {phrase}'],
+        )
+
+
+BACKENDS = {
+    "postgresql": PostgresTrigramBackend(),
+    "sqlite": SQLiteFTSBackend(),
+}
+
+
+def get_backend(connection):
+    backend = BACKENDS.get(connection.vendor)
+    if backend is None or not backend.is_supported(connection):
+        return SearchBackend()
+    return backend
+
+
+def search_q(model, lookup, term, using=DEFAULT_DB_ALIAS):
+    """
+    Returns a Q for `<lookup>__icontains=term` on `model` that goes through
+    the search index when the target field has one. `lookup` may follow
+    relations, as in "product__name".
+    """
+    *path, field = lookup.split("__")
+    target = model
+    for name in path:
+        target = target._meta.get_field(name).related_model
+
+    pks = None
+    if field in SEARCH_FIELDS.get(target, ()):
+        connection = connections[using]
+        pks = get_backend(connection).matching_pks(target, field, term, connection)
+    if pks is None:
+        return Q(**{f"{lookup}__icontains": term})
+    return Q(**{"__".join(path + ["pk__in"]): pks})
+
+
+def search(queryset, lookups, term):
+    """Rows of `queryset` where any of `lookups` contains `term`."""
+    q = Q()
+    for lookup in lookups:
+        q |= search_q(queryset.model, lookup, term, queryset.db)
+    return queryset.filter(q)
+
+
+def search_method(*lookups):
+    """
+    django-filter `method` searching `lookups` (by default the filter's own
+    field name) through the search index.
+    """
+
+    def method(queryset, name, value):
+        if not value:
+            return queryset
+        return search(queryset, lookups or [name], value)
+
+    return method
+
+
+def install(apps, schema_editor):
+    """RunPython operation creating the search structures."""
+    connection = schema_editor.connection
+    get_backend(connection).install(connection)
+
+
+def uninstall(apps, schema_editor):
+    connection = schema_editor.connection
+    get_backend(connection).uninstall(connection)
+
+
+def repair(using=DEFAULT_DB_ALIAS, **kwargs):
+    """post_migrate receiver restoring structures a migration dropped."""
+    connection = connections[using]
+    get_backend(connection).repair(connection)
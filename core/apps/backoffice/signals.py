@@ -0,0 +1,153 @@
+from django.contrib.auth.models import Group, Permission, User
+from django.core.signals import request_finished, request_started
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_delete,
+)
+
+from core.apps.backoffice import choices
+from core.apps.backoffice.changelog import record_changes
+from core.apps.backoffice.models import (
+    ApiKey,
+    Appointment,
+    BarberProfile,
+    Category,
+    ChangeLogEntry,
+    Order,
+    OrderItem,
+    Product,
+    WorkSchedule,
+)
+from core.apps.backoffice.versioning import bump_version
+
+VERSIONED_MODELS = [
+    Category,
+    Product,
+    BarberProfile,
+    WorkSchedule,
+    Appointment,
+    Order,
+    User,
+    Group,
+    Permission,
+    ApiKey,
+]
+
+# Relations that grant permissions: m2m changes skip post_save, so they
+# bump the version of the model the cached permissions are keyed on.
+PERMISSION_RELATIONS = {
+    User.user_permissions.through: User,
+    User.groups.through: User,
+    Group.permissions.through: Group,
+}
+
+SYNCED_MODELS = [Product, Category, Order, Appointment, BarberProfile]
+
+# Nested model -> (parent model, foreign key attribute)
+SYNCED_CHILDREN = {
+    OrderItem: (Order, "order_id"),
+    WorkSchedule: (BarberProfile, "barber_id"),
+}
+
+
+def bump_table_version(sender, update_fields=None, **kwargs):
+    # Logins only touch last_login, which nothing versioned depends on.
+    if update_fields and set(update_fields) == {"last_login"}:
+        return
+    bump_version(sender)
+
+
+def record_upsert(sender, instance, **kwargs):
+    record_changes(sender, [instance.pk])
+
+
+def record_delete(sender, instance, **kwargs):
+    record_changes(sender, [instance.pk], ChangeLogEntry.DELETE)
+
+
+def record_parent_upsert(sender, instance, **kwargs):
+    parent, attname = SYNCED_CHILDREN[sender]
+    record_changes(parent, [getattr(instance, attname)])
+
+
+def record_services_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if reverse:
+        record_changes(Appointment, pk_set or [])
+    else:
+        record_changes(Appointment, [instance.pk])
+
+
+def bump_permission_relation(sender, action, **kwargs):
+    if action.startswith("post_"):
+        bump_version(PERMISSION_RELATIONS[sender])
+
+
+def bump_permissions(**kwargs):
+    # migrate creates the permissions of new models with bulk_create.
+    bump_version(Permission)
+
+
+def record_category_products(sender, instance, **kwargs):
+    # Deleting a category nulls its products with an UPDATE that skips
+    # their signals.
+    pks = list(Product.objects.filter(category=instance).values_list("pk", flat=True))
+    if pks:
+        record_changes(Product, pks)
+        bump_version(Product)
+
+
+def connect():
+    for model in VERSIONED_MODELS:
+        label = model._meta.label_lower
+        post_save.connect(
+            bump_table_version, sender=model, dispatch_uid=f"version_save_{label}"
+        )
+        post_delete.connect(
+            bump_table_version, sender=model, dispatch_uid=f"version_delete_{label}"
+        )
+        # Choice lists memoized earlier in this request are stale now.
+        post_save.connect(
+            choices.forget, sender=model, dispatch_uid=f"choices_save_{label}"
+        )
+        post_delete.connect(
+            choices.forget, sender=model, dispatch_uid=f"choices_delete_{label}"
+        )
+    request_started.connect(choices.start, dispatch_uid="choices_request")
+    request_finished.connect(choices.finish, dispatch_uid="choices_request_finished")
+
+    for model in SYNCED_MODELS:
+        label = model._meta.label_lower
+        post_save.connect(record_upsert, sender=model, dispatch_uid=f"sync_save_{label}")
+        post_delete.connect(record_delete, sender=model, dispatch_uid=f"sync_delete_{label}")
+
+    for model in SYNCED_CHILDREN:
+        label = model._meta.label_lower
+        post_save.connect(
+            record_parent_upsert, sender=model, dispatch_uid=f"sync_save_{label}"
+        )
+        post_delete.connect(
+            record_parent_upsert, sender=model, dispatch_uid=f"sync_delete_{label}"
+        )
+
+    pre_delete.connect(
+        record_category_products,
+        sender=Category,
+        dispatch_uid="sync_category_products",
+    )
+    for through in PERMISSION_RELATIONS:
+        m2m_changed.connect(
+            bump_permission_relation,
+            sender=through,
+            dispatch_uid=f"version_m2m_{through._meta.label_lower}",
+        )
+    post_migrate.connect(bump_permissions, dispatch_uid="version_migrate_permissions")
+    m2m_changed.connect(
+        record_services_change,
+        sender=Appointment.services.through,
+        dispatch_uid="sync_appointment_services",
+    )
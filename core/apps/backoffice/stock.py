@@ -0,0 +1,76 @@
+"""
+Set-based stock checks for order lines.
+
+`check_stock()` fetches every product referenced by a set of lines in one
+query, adds up the quantities requested per product (the same product may
+be on several lines) and reports the ones that fall short. It backs the
+order item formset, `Order.mark_as_paid()` and, through it, the API.
+"""
+
+from collections import Counter
+
+from django.utils import timezone
+
+from core.apps.backoffice.changelog import record_changes
+from core.apps.backoffice.models import Product
+from core.apps.backoffice.versioning import bump_version
+
+
+def shortage_message(product, requested):
+    return (
+        f"Stock insuficiente para '{product.name}'. "
+        f"Solicitado: {requested}, Disponible: {product.stock_qty}"
+    )
+
+
+def requested_quantities(lines):
+    """Adds up `(product pk, quantity)` lines per product."""
+    requested = Counter()
+    for pk, quantity in lines:
+        requested[pk] += quantity
+    return requested
+
+
+def check_stock(lines, products=None, lock=False):
+    """
+    Checks `(product pk, quantity)` lines against the current stock.
+
+    `products` ({pk: Product}) skips the fetch when the caller already has
+    them; otherwise they are read in one query, locked in pk order when
+    `lock` is set. Services are never short. Returns the products and
+    `{pk: message}` for the ones without enough stock.
+    """
+    requested = requested_quantities(lines)
+    if products is None:
+        queryset = Product.objects.filter(pk__in=requested).order_by("pk")
+        if lock:
+            queryset = queryset.select_for_update()
+        products = {product.pk: product for product in queryset}
+
+    shortages = {}
+    for pk, quantity in requested.items():
+        product = products.get(pk)
+        if product is not None and not product.is_service and product.stock_qty < quantity:
+            shortages[pk] = shortage_message(product, quantity)
+    return products, shortages
+
+
+def deduct_stock(lines, products):
+    """
+    Takes the quantities of `lines` out of the locked `products` with one
+    `bulk_update`, keeping the catalog version and change log in step.
+    """
+    now = timezone.now()
+    changed = []
+    for pk, quantity in requested_quantities(lines).items():
+        product = products[pk]
+        if product.is_service:
+            continue
+        product.stock_qty -= quantity
+        product.updated_at = now
+        changed.append(product)
+
+    if changed:
+        Product.objects.bulk_update(changed, ["stock_qty", "updated_at"])
+        record_changes(Product, sorted(product.pk for product in changed))
+        bump_version(Product)
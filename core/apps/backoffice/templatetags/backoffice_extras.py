@@ -20,4 +20,15 @@ def param_replace(context, **kwargs):
 
 @register.simple_tag
 def get_pagination_range(page_obj, on_each_side=2, on_ends=1):
-    return page_obj.paginator.get_elided_page_range(page_obj.number, on_each_side=on_each_side, on_ends=on_ends)
\ No newline at end of file
+    """
+    Elided page range for `page_obj`. With a CappedPaginator the last page
+    is only the last one counted, so an ellipsis stands for the rest
+    instead of a COUNT(*) over the whole table.
+    """
+    paginator = page_obj.paginator
+    page_range = list(
+        paginator.get_elided_page_range(page_obj.number, on_each_side=on_each_side, on_ends=on_ends)
+    )
+    if getattr(paginator, "has_more", False):
+        page_range.append(paginator.ELLIPSIS)
+    return page_range
\ No newline at end of file
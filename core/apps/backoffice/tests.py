@@ -1,7 +1,63 @@
-from django.test import TestCase, Client
+import asyncio
+import io
+import json
+import contextvars
+import threading
+import time as timer
+import uuid
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipUnless
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import parse_http_date
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
 from django.urls import reverse
-from django.contrib.auth.models import User, Permission
-from core.apps.backoffice.models import Order, Category, Product
+from django.utils import timezone
+from django.contrib.auth.models import Group, User, Permission
+from django.contrib.contenttypes.models import ContentType
+from core.apps.backoffice.models import (
+    Order,
+    OrderItem,
+    Category,
+    Product,
+    SupplyEntry,
+    BarberProfile,
+    WorkSchedule,
+    Appointment,
+    ChangeLogEntry,
+    ApiKey,
+    TableVersion,
+)
+from core import fastjson
+from core.api.parsers import FastJSONParser
+from core.api.renderers import FastJSONRenderer
+from core.apps.backoffice import choices
+from core.apps.backoffice.versioning import bump_version, cache_stamp, get_versions
+from core.apps.backoffice.catalog import get_catalog
+from core.apps.backoffice.filters import AppointmentFilter
+from core.apps.backoffice import search as search_index
+from core.apps.backoffice.search import search
+from core.apps.backoffice.forms import GroupForm
+from core.apps.backoffice.views.orders import OrderItemFormSet
+from core.api.keys import issue_key, key_digest
+from core.api.views import ProductViewSet
+from core.cache import (
+    aget_or_compute, cached_fragment, cached_result, get_or_compute, versioned_key,
+)
+from core.cache.flight import AsyncSingleFlight, SingleFlight, compute_once
+from core.cache.keys import MAX_KEY_LENGTH
+from core.pagination import CappedPaginator, keyset_q
+from core.testing import CommitOnWriteMixin, QueryBudgetMixin, QueryPlanMixin
 
 class OrderPrintViewTest(TestCase):
     def setUp(self):
@@ -42,4 +98,1638 @@ class ProductDurationTest(TestCase):
             duration=45
         )
         self.assertEqual(service.duration, 45)
-        self.assertTrue(service.is_service)
\ No newline at end of file
+        self.assertTrue(service.is_service)
+
+
+class ApiQueryBudgetTest(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="apiuser", password="password", first_name="Api", last_name="User"
+        )
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(name="Cat")
+        self.product = Product.objects.create(
+            name="Shampoo", price=10, category=self.category, stock_qty=1000
+        )
+        self.service = Product.objects.create(
+            name="Corte", price=20, category=self.category, is_service=True
+        )
+        self.seq = 0
+
+    def next_seq(self):
+        self.seq += 1
+        return self.seq
+
+    def make_products(self, count):
+        Product.objects.bulk_create(
+            Product(name=f"Prod {self.next_seq()}", price=5, category=self.category)
+            for _ in range(count)
+        )
+
+    def make_orders(self, count):
+        for _ in range(count):
+            order = Order.objects.create(created_by=self.user, client_name="Cliente")
+            OrderItem.objects.bulk_create(
+                OrderItem(
+                    order=order, product=product, quantity=1,
+                    unit_price=product.price, subtotal=product.price,
+                )
+                for product in (self.product, self.service)
+            )
+
+    def make_supplies(self, count):
+        SupplyEntry.objects.bulk_create(
+            SupplyEntry(
+                product=self.product, created_by=self.user, quantity=1, unit_cost=2
+            )
+            for _ in range(count)
+        )
+
+    def make_barbers(self, count):
+        for _ in range(count):
+            user = User.objects.create_user(username=f"barber{self.next_seq()}")
+            barber = BarberProfile.objects.create(user=user, nickname=user.username)
+            WorkSchedule.objects.bulk_create(
+                WorkSchedule(
+                    barber=barber, day_of_week=day,
+                    start_hour=time(9), end_hour=time(18),
+                )
+                for day in range(2)
+            )
+
+    def make_appointments(self, count):
+        user = User.objects.create_user(username=f"barber{self.next_seq()}")
+        barber = BarberProfile.objects.create(user=user, nickname="Barbero")
+        date = timezone.localdate() + timedelta(days=1)
+        appointments = Appointment.objects.bulk_create(
+            Appointment(
+                client_name="Cliente", client_phone="999", barber=barber,
+                date=date, start_time=time(10), end_time=time(10, 30),
+                total_amount=20,
+            )
+            for _ in range(count)
+        )
+        Appointment.services.through.objects.bulk_create(
+            Appointment.services.through(appointment=appt, product=self.service)
+            for appt in appointments
+        )
+
+    def test_product_list(self):
+        self.assertConstantQueries("/api/products/", self.make_products)
+
+    def test_order_list(self):
+        self.assertConstantQueries("/api/orders/", self.make_orders)
+
+    def test_supply_list(self):
+        self.assertConstantQueries("/api/supplies/", self.make_supplies)
+
+    def test_barber_list(self):
+        self.assertConstantQueries("/api/barbers/", self.make_barbers)
+
+    def test_appointment_list(self):
+        self.assertConstantQueries("/api/appointments/", self.make_appointments)
+
+
+class ApiSparseFieldsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="pos", password="password")
+        self.client.force_login(self.user)
+        category = Category.objects.create(name="Cat")
+        self.product = Product.objects.create(name="Gel", price=10, category=category)
+        self.order = Order.objects.create(created_by=self.user, client_name="Cliente")
+        self.order.items.create(
+            product=self.product, quantity=2, unit_price=10, subtotal=20
+        )
+
+    def test_full_representation_by_default(self):
+        response = self.client.get("/api/orders/")
+        self.assertIn("items", response.json()[0])
+        self.assertIn("created_by_name", response.json()[0])
+
+    def test_fields_limits_payload_and_queries(self):
+        url = "/api/orders/?fields=id,client_name,status,total_amount"
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(
+            set(response.json()[0]), {"id", "client_name", "status", "total_amount"}
+        )
+
+    def test_expand_adds_nested_items(self):
+        response = self.client.get("/api/orders/?fields=id&expand=items")
+        data = response.json()[0]
+        self.assertEqual(set(data), {"id", "items"})
+        self.assertEqual(data["items"][0]["product_name"], "Gel")
+
+    def test_expand_without_fields_is_rejected(self):
+        response = self.client.get("/api/orders/?expand=items")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("expand", response.json())
+
+    def test_fields_with_relation_name(self):
+        response = self.client.get("/api/products/?fields=id,category_name")
+        self.assertEqual(
+            response.json()[0], {"id": self.product.pk, "category_name": "Cat"}
+        )
+
+
+class ApiFastListTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="barber", first_name="Juan", last_name="Perez"
+        )
+        self.client.force_login(self.user)
+        category = Category.objects.create(name="Cortes")
+        Product.objects.create(name="Sin categoria", price=5, category=None)
+        service = Product.objects.create(
+            name="Corte", price="25.50", category=category, is_service=True
+        )
+        barber = BarberProfile.objects.create(
+            user=self.user, nickname="Juancho", photo="barbers/juan.jpg"
+        )
+        WorkSchedule.objects.create(
+            barber=barber, day_of_week=2, start_hour=time(9), end_hour=time(18),
+            lunch_start=time(13), lunch_end=time(14),
+        )
+        BarberProfile.objects.create(user=User.objects.create_user(username="otro"))
+        appointment = Appointment.objects.bulk_create([
+            Appointment(
+                client_name="Cliente", client_phone="999", barber=barber,
+                date=timezone.localdate(), start_time=time(10), end_time=time(10, 30),
+                total_amount="25.50",
+            )
+        ])[0]
+        appointment.services.add(service)
+
+    def assertSameAsSerializer(self, url):
+        expected = self.client.get(url)
+        with override_settings(API_FAST_LIST=True):
+            fast = self.client.get(url)
+        self.assertEqual(fast.content, expected.content)
+        self.assertTrue(expected.json())
+
+    def test_products(self):
+        self.assertSameAsSerializer("/api/products/")
+
+    def test_categories(self):
+        self.assertSameAsSerializer("/api/categories/")
+
+    def test_barbers(self):
+        self.assertSameAsSerializer("/api/barbers/")
+
+    def test_appointments(self):
+        self.assertSameAsSerializer("/api/appointments/")
+
+    def test_respects_sparse_fields(self):
+        self.assertSameAsSerializer("/api/products/?fields=id,category_name")
+
+
+JSON_SAMPLES = [
+    {},
+    [],
+    {"client_name": "Peña Ñandú", "emoji": "✂️💈", "quote": 'dice "hola"\n\t/'},
+    {"control": "\x00\x1f\x7f", "separators": "a\u2028b\u2029c"},
+    {"price": Decimal("25.50"), "zero": Decimal("0.00"), "big": Decimal("12345678.90")},
+    {
+        "utc": datetime(2025, 3, 1, 14, 5, 9, 123456, tzinfo=dt_timezone.utc),
+        "lima": datetime(2025, 3, 1, 9, 5, tzinfo=dt_timezone(timedelta(hours=-5))),
+        "naive": datetime(2025, 3, 1, 9, 5, 0, 500),
+        "date": date(2025, 12, 31),
+        "time": time(13, 30),
+        "time_us": time(13, 30, 15, 250000),
+    },
+    {"duration": timedelta(minutes=45), "uuid": uuid.UUID(int=7)},
+    {1: "int key", "nested": [{"a": [1, 2.5, 0.1, -3]}, (True, False, None)]},
+    {"huge": 2 ** 70, "lazy": gettext_lazy("Agenda")},
+    ["10:00 AM", "10:30 AM", "11:00 AM"],
+]
+
+
+class FastJsonCompatibilityTest(SimpleTestCase):
+    def stdlib_dumps(self, data, encoder):
+        return json.dumps(
+            data, cls=encoder, separators=(",", ":"), ensure_ascii=False
+        ).encode()
+
+    def test_dumps_matches_stdlib(self):
+        for data in JSON_SAMPLES:
+            with self.subTest(data=data):
+                self.assertEqual(
+                    fastjson.dumps(data), self.stdlib_dumps(data, DjangoJSONEncoder)
+                )
+
+    def test_dumps_fallback_without_orjson(self):
+        with mock.patch.object(fastjson, "orjson", None):
+            for data in JSON_SAMPLES:
+                with self.subTest(data=data):
+                    self.assertEqual(
+                        fastjson.dumps(data),
+                        self.stdlib_dumps(data, DjangoJSONEncoder),
+                    )
+
+    def test_backends_match_on_floats_and_non_ascii(self):
+        data = {
+            "floats": [
+                0.1, -2.25, 1e-4, 1e-5, -1.5e-5, 1.234e-7, 1e15, 1e16, -1.5e22,
+                1.7976931348623157e308, 5e-324, -0.0, float("nan"), float("inf"),
+            ],
+            "text": "Peluquería Ñandú ☕ \u2028 \"ok\"",
+        }
+        with_orjson = fastjson.dumps(data)
+        with mock.patch.object(fastjson, "orjson", None):
+            self.assertEqual(fastjson.dumps(data), with_orjson)
+        self.assertIn(b"1.234e-7,", with_orjson)
+        self.assertIn(b"0.000015", with_orjson)
+        self.assertIn(b"null,null]", with_orjson)
+        self.assertIn("Ñandú ☕".encode(), with_orjson)
+
+    def test_renderer_matches_drf(self):
+        for data in JSON_SAMPLES:
+            with self.subTest(data=data):
+                self.assertEqual(
+                    FastJSONRenderer().render(data), JSONRenderer().render(data)
+                )
+
+    def test_renderer_without_orjson_uses_fallback(self):
+        data = {"floats": [1.234e-7, 1e16, float("nan")], "text": "a\u2028b"}
+        with_orjson = FastJSONRenderer().render(data)
+        with mock.patch.object(fastjson, "orjson", None):
+            self.assertEqual(FastJSONRenderer().render(data), with_orjson)
+            for sample in JSON_SAMPLES:
+                with self.subTest(data=sample):
+                    self.assertEqual(
+                        FastJSONRenderer().render(sample), JSONRenderer().render(sample)
+                    )
+        self.assertEqual(with_orjson, b'{"floats":[1.234e-7,1e16,null],"text":"a\\u2028b"}')
+
+    def test_renderer_indent_uses_drf(self):
+        data = JSON_SAMPLES[2]
+        media_type = "application/json; indent=4"
+        self.assertEqual(
+            FastJSONRenderer().render(data, media_type),
+            JSONRenderer().render(data, media_type),
+        )
+
+    def test_parser_matches_drf(self):
+        for data in JSON_SAMPLES:
+            body = JSONRenderer().render(data)
+            with self.subTest(body=body):
+                self.assertEqual(
+                    FastJSONParser().parse(io.BytesIO(body)),
+                    JSONParser().parse(io.BytesIO(body)),
+                )
+
+    def test_parser_rejects_invalid_json(self):
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b"{invalid"))
+
+    def test_json_response(self):
+        response = fastjson.FastJsonResponse({"slots": ["09:00 AM"]})
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response.content, b'{"slots":["09:00 AM"]}')
+        with self.assertRaises(TypeError):
+            fastjson.FastJsonResponse(["no", "dict"])
+
+
+class VersionBumpTest(TestCase):
+    def version(self):
+        row = TableVersion.objects.filter(table="backoffice.product").first()
+        return row.version if row else 0
+
+    def test_bump_waits_for_the_commit(self):
+        before = cache_stamp(Product)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Product.objects.create(name="Gel", price=12)
+            self.assertEqual(self.version(), 0)
+            # The writer doesn't read its own changes through the old stamp.
+            version, updated_at = get_versions(Product)["backoffice.product"]
+            self.assertTrue(version.startswith("0+"))
+            self.assertIsNone(updated_at)
+            self.assertNotEqual(cache_stamp(Product), before)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.version(), 1)
+
+    def test_rollback_bumps_nothing(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(IntegrityError):
+                with transaction.atomic():
+                    Product.objects.create(name="Gel", price=12)
+                    raise IntegrityError
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.version(), 0)
+
+
+class ConditionalGetTest(CommitOnWriteMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tablet", password="password")
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(name="Cat")
+        self.product = Product.objects.create(
+            name="Cera", price=15, category=self.category
+        )
+
+    def test_unchanged_products_answer_304(self):
+        response = self.client.get("/api/products/")
+        etag = response["ETag"]
+
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/products/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_last_modified_waits_for_its_second_to_end(self):
+        now = timezone.now().replace(microsecond=500000)
+        TableVersion.objects.update(updated_at=now)
+        clock = "core.apps.backoffice.versioning.timezone.now"
+        with mock.patch(clock, return_value=now + timedelta(milliseconds=400)):
+            response = self.client.get("/api/products/")
+        self.assertFalse(response.has_header("Last-Modified"))
+
+        with mock.patch(clock, return_value=now + timedelta(seconds=1)):
+            last_modified = self.client.get("/api/products/")["Last-Modified"]
+            # Rounded up, so a write later in the same second still changes it.
+            self.assertEqual(parse_http_date(last_modified), int(now.timestamp()) + 1)
+            response = self.client.get(
+                "/api/products/", HTTP_IF_MODIFIED_SINCE=last_modified
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_changes_etag(self):
+        etag = self.client.get("/api/products/")["ETag"]
+        self.product.price = 20
+        self.product.save()
+        response = self.client.get("/api/products/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_related_table_changes_etag(self):
+        etag = self.client.get("/api/products/")["ETag"]
+        self.category.name = "Otra"
+        self.category.save()
+        response = self.client.get("/api/products/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_query_string_is_part_of_etag(self):
+        etag = self.client.get("/api/products/")["ETag"]
+        response = self.client.get("/api/products/?fields=id", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_calendar_events_answer_304(self):
+        url = reverse("backoffice:appointment_events")
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+@mock.patch("core.api.sync.SyncView.settle_delay", timedelta(0))
+class ApiDeltaSyncTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tablet")
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(name="Cat")
+        self.product = Product.objects.create(
+            name="Cera", price=15, category=self.category
+        )
+
+    def sync(self, cursor=None):
+        url = "/api/sync/" + (f"?since={cursor}" if cursor else "")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_snapshot_then_empty_delta(self):
+        data = self.sync()
+        self.assertEqual(data["changes"]["products"]["updated"][0]["name"], "Cera")
+        delta = self.sync(data["cursor"])
+        self.assertEqual(delta["changes"]["products"], {"updated": [], "deleted": []})
+
+    def test_delta_contains_changes_and_tombstones(self):
+        cursor = self.sync()["cursor"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = 18
+            self.product.save()
+            order = Order.objects.create(created_by=self.user, client_name="Cliente")
+            OrderItem.objects.create(
+                order=order, product=self.product, quantity=1, unit_price=18
+            )
+            category_id = self.category.pk
+            self.category.delete()
+
+        data = self.sync(cursor)
+        products = data["changes"]["products"]["updated"]
+        self.assertEqual(len(products), 1)
+        self.assertEqual(products[0]["price"], "18.00")
+        self.assertIsNone(products[0]["category"])
+        self.assertEqual(data["changes"]["categories"]["deleted"], [category_id])
+        orders = data["changes"]["orders"]["updated"]
+        self.assertEqual(len(orders), 1)
+        self.assertEqual(len(orders[0]["items"]), 1)
+        self.assertEqual(self.sync(data["cursor"])["changes"]["orders"]["updated"], [])
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/sync/?since=bogus")
+        self.assertEqual(response.status_code, 400)
+
+    def test_reconnect_cost_depends_on_changes(self):
+        Product.objects.bulk_create(
+            Product(name=f"P{i}", price=1, category=self.category) for i in range(50)
+        )
+        cursor = self.sync()["cursor"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        with self.assertNumQueries(5):
+            data = self.sync(cursor)
+        self.assertEqual(len(data["changes"]["products"]["updated"]), 1)
+
+    def test_entries_are_written_on_commit(self):
+        cursor = self.sync()["cursor"]
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.product.save()
+            # A transaction still open leaves nothing for a cursor to pass.
+            self.assertEqual(self.sync(cursor)["changes"]["products"]["updated"], [])
+        for callback in callbacks:
+            callback()
+        products = self.sync(cursor)["changes"]["products"]["updated"]
+        self.assertEqual([row["id"] for row in products], [self.product.pk])
+
+    def test_entries_are_stamped_when_written(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.product.save()
+        timer.sleep(0.05)
+        committed = timezone.now()
+        for callback in callbacks:
+            callback()
+        entry = ChangeLogEntry.objects.get()
+        self.assertGreater(entry.created_at, committed - timedelta(milliseconds=10))
+
+    def test_cursor_older_than_prune_is_gone(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        cursor = self.sync()["cursor"]
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.product.save()
+        timer.sleep(0.01)
+        call_command("prune_changelog", days=0, stdout=io.StringIO())
+        self.assertEqual(ChangeLogEntry.objects.count(), 1)
+        response = self.client.get(f"/api/sync/?since={cursor}")
+        self.assertEqual(response.status_code, 410)
+
+        ChangeLogEntry.objects.all().delete()
+        response = self.client.get(f"/api/sync/?since={cursor}")
+        self.assertEqual(response.status_code, 410)
+
+    @mock.patch("core.api.sync.SyncView.page_size", 2)
+    def test_snapshot_is_paginated(self):
+        Product.objects.create(name="Gel", price=12, category=self.category)
+        Category.objects.create(name="Otra")
+        pages = [self.sync()]
+        while pages[-1]["has_more"]:
+            pages.append(self.sync(pages[-1]["cursor"]))
+        self.assertGreater(len(pages), 1)
+        names = [
+            row["name"] for page in pages
+            for key in ("categories", "products")
+            for row in page["changes"][key]["updated"]
+        ]
+        self.assertEqual(sorted(names), ["Cat", "Cera", "Gel", "Otra"])
+        delta = self.sync(pages[-1]["cursor"])
+        self.assertFalse(delta["has_more"])
+        self.assertEqual(delta["changes"]["products"]["updated"], [])
+
+
+class ApiOrderBulkIngestTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="pos")
+        self.user.user_permissions.add(Permission.objects.get(codename="add_order"))
+        self.client.force_login(self.user)
+        self.product = Product.objects.create(name="Gel", price=12)
+        self.service = Product.objects.create(name="Corte", price=25, is_service=True)
+
+    def post(self, entries):
+        return self.client.post(
+            "/api/orders/bulk/", entries, content_type="application/json"
+        )
+
+    def entry(self, ref, **extra):
+        data = {
+            "client_ref": ref,
+            "client_name": "Cliente",
+            "items": [
+                {"product": self.product.pk, "quantity": 2},
+                {"product": self.service.pk, "quantity": 1, "unit_price": "20.00"},
+            ],
+        }
+        data.update(extra)
+        return data
+
+    def test_creates_orders_with_items_and_totals(self):
+        response = self.post([self.entry("pos-1"), self.entry("pos-2")])
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([r["status"] for r in results], ["created", "created"])
+        order = Order.objects.get(client_ref="pos-1")
+        self.assertEqual(order.pk, results[0]["id"])
+        self.assertEqual(order.total_amount, 44)
+        self.assertEqual(order.items.count(), 2)
+        self.assertEqual(order.created_by, self.user)
+
+    def test_reports_errors_and_duplicates_per_order(self):
+        self.post([self.entry("pos-1")])
+        response = self.post([
+            self.entry("pos-1"),
+            self.entry("pos-2", items=[{"product": 9999, "quantity": 1}]),
+            self.entry("pos-3", items=[]),
+            self.entry("pos-4"),
+            self.entry("pos-4"),
+        ])
+        results = response.json()["results"]
+        self.assertEqual(
+            [r["status"] for r in results],
+            ["duplicate", "error", "error", "created", "error"],
+        )
+        self.assertEqual(results[0]["id"], Order.objects.get(client_ref="pos-1").pk)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_keeps_the_capture_time(self):
+        captured = timezone.now() - timedelta(days=2)
+        results = self.post([
+            self.entry("pos-1", created_at=captured.isoformat()),
+            self.entry("pos-2", created_at=(timezone.now() + timedelta(hours=1)).isoformat()),
+        ]).json()["results"]
+        self.assertEqual([r["status"] for r in results], ["created", "error"])
+        self.assertEqual(Order.objects.get(client_ref="pos-1").created_at, captured)
+
+    def test_retry_of_duplicates_keeps_versions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post([self.entry("pos-1")])
+        version = TableVersion.objects.get(table="backoffice.order").version
+        entries = ChangeLogEntry.objects.count()
+        with self.captureOnCommitCallbacks(execute=True):
+            results = self.post([self.entry("pos-1")]).json()["results"]
+        self.assertEqual(results[0]["status"], "duplicate")
+        self.assertEqual(
+            TableVersion.objects.get(table="backoffice.order").version, version
+        )
+        self.assertEqual(ChangeLogEntry.objects.count(), entries)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        # The first request also creates version rows and caches permissions.
+        self.post([self.entry("warm-up")])
+        counts = []
+        for size, prefix in ((2, "a"), (20, "b")):
+            with CaptureQueriesContext(connection) as ctx:
+                self.post([self.entry(f"{prefix}-{i}") for i in range(size)])
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_rejects_non_list(self):
+        response = self.post({"client_ref": "x"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ApiProductSupplyBulkTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="almacen")
+        self.user.user_permissions.add(
+            *Permission.objects.filter(
+                codename__in=["add_product", "change_product", "add_supplyentry"]
+            )
+        )
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(name="Ceras")
+        self.gel = Product.objects.create(
+            name="Gel", price=12, cost=Decimal("5.00"), stock_qty=10,
+            category=self.category,
+        )
+        self.wax = Product.objects.create(name="Cera", price=15)
+
+    def post(self, url, rows):
+        return self.client.post(url, rows, content_type="application/json")
+
+    def test_upserts_products(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post("/api/products/bulk/", [
+                {"id": self.gel.pk, "price": "14.50"},
+                {"id": self.wax.pk, "category": self.category.pk},
+                {"name": "Pomada", "price": "20.00", "category": self.category.pk},
+            ])
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([row["name"] for row in data], ["Gel", "Cera", "Pomada"])
+        self.assertEqual(data[1]["category_name"], "Ceras")
+        self.gel.refresh_from_db()
+        self.wax.refresh_from_db()
+        self.assertEqual(self.gel.price, Decimal("14.50"))
+        self.assertEqual(self.gel.stock_qty, 10)
+        self.assertEqual(self.wax.category, self.category)
+        self.assertTrue(Product.objects.filter(name="Pomada").exists())
+        # setUp's entries are never committed in a TestCase; these are the batch.
+        self.assertEqual(
+            ChangeLogEntry.objects.filter(table="backoffice.product").count(), 3
+        )
+
+    def test_rejected_batch_writes_nothing(self):
+        response = self.post("/api/products/bulk/", [
+            {"id": self.gel.pk, "price": "14.50"},
+            {"id": 9999, "price": "1.00"},
+            {"name": "Sin precio"},
+        ])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()["errors"]
+        self.assertEqual(errors[0], {})
+        self.assertIn("id", errors[1])
+        self.assertIn("price", errors[2])
+        self.gel.refresh_from_db()
+        self.assertEqual(self.gel.price, 12)
+
+    def test_supplies_match_one_by_one_entries(self):
+        lines = [
+            {"product": self.gel.pk, "quantity": 1, "unit_cost": "7.00"},
+            {"product": self.wax.pk, "quantity": 4, "unit_cost": "3.00"},
+            {"product": self.gel.pk, "quantity": 2, "unit_cost": "8.00",
+             "supplier": "Distribuidora"},
+        ]
+        response = self.post("/api/supplies/bulk/", lines)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()), 3)
+        self.assertEqual(SupplyEntry.objects.filter(created_by=self.user).count(), 3)
+        bulk = {p.pk: (p.stock_qty, p.cost) for p in Product.objects.all()}
+
+        Product.objects.filter(pk=self.gel.pk).update(stock_qty=10, cost=5)
+        Product.objects.filter(pk=self.wax.pk).update(stock_qty=0, cost=0)
+        for line in lines:
+            SupplyEntry.objects.create(
+                product_id=line["product"], quantity=line["quantity"],
+                unit_cost=Decimal(line["unit_cost"]),
+            )
+        one_by_one = {p.pk: (p.stock_qty, p.cost) for p in Product.objects.all()}
+        self.assertEqual(bulk, one_by_one)
+        # Rounded after each line: 5.45 then 5.61 (5.62 over all lines at once).
+        self.assertEqual(bulk[self.gel.pk], (13, Decimal("5.61")))
+
+    def test_supplies_reject_services(self):
+        service = Product.objects.create(name="Corte", price=25, is_service=True)
+        response = self.post("/api/supplies/bulk/", [
+            {"product": service.pk, "quantity": 1, "unit_cost": "1.00"},
+        ])
+        self.assertEqual(response.status_code, 400)
+        response = self.post(
+            "/api/supplies/", {"product": service.pk, "quantity": 1, "unit_cost": "1.00"}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("product", response.json())
+        with self.assertRaises(ValidationError):
+            SupplyEntry.objects.create(product=service, quantity=1, unit_cost=1)
+        self.assertFalse(SupplyEntry.objects.exists())
+
+    def test_query_count_does_not_grow_with_batch(self):
+        # The first request also creates version rows and caches permissions.
+        self.post("/api/supplies/bulk/", [
+            {"product": self.gel.pk, "quantity": 1, "unit_cost": "2.00"},
+        ])
+        counts = []
+        for size in (2, 40):
+            rows = [
+                {"product": (self.gel, self.wax)[i % 2].pk, "quantity": 1,
+                 "unit_cost": "2.00"}
+                for i in range(size)
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                self.post("/api/supplies/bulk/", rows)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(username="contador")
+        self.client.force_login(self.user)
+        self.product = Product.objects.create(name="Gel", price=12)
+        self.paid = Order.objects.create(
+            client_name="Ana", created_by=self.user, status="PAID"
+        )
+        self.pending = Order.objects.create(client_name="Luis", created_by=self.user)
+        for order in (self.paid, self.pending):
+            OrderItem.objects.create(
+                order=order, product=self.product, quantity=2, unit_price=12
+            )
+
+    def content(self, response):
+        return b"".join(response.streaming_content).decode()
+
+    def test_backoffice_csv_respects_filters(self):
+        response = self.client.get(
+            reverse("backoffice:order_export"), {"status": "PAID", "output": "csv"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment;", response["Content-Disposition"])
+        lines = self.content(response).lstrip("\ufeff").splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["id", "created_at", "client_name"])
+        self.assertEqual(len(lines), 2)
+        self.assertIn("Ana", lines[1])
+
+    def test_backoffice_bare_url_uses_list_defaults(self):
+        response = self.client.get(reverse("backoffice:order_export"))
+        lines = self.content(response).splitlines()
+        # OrderFilter shows this week's pending orders by default.
+        self.assertEqual(len(lines), 2)
+        self.assertIn("Luis", lines[1])
+
+    def test_api_ndjson_items(self):
+        response = self.client.get(
+            "/api/orders/items/export/", {"status": "PAID", "output": "ndjson"}
+        )
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["order_id"], self.paid.pk)
+        self.assertEqual(rows[0]["product_name"], "Gel")
+        self.assertEqual(rows[0]["subtotal"], "24.00")
+
+    def test_streams_in_constant_queries(self):
+        Order.objects.bulk_create(
+            Order(client_name=f"Cliente {i}", created_by=self.user) for i in range(50)
+        )
+        response = self.client.get("/api/orders/export/", {"status": "PENDING"})
+        with CaptureQueriesContext(connection) as ctx:
+            lines = self.content(response).splitlines()
+        self.assertEqual(len(lines), 52)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_non_filter_params_keep_the_defaults(self):
+        for url, params in [
+            (reverse("backoffice:order_export"), {"cursor": "abc", "output": "csv"}),
+            ("/api/orders/export/", {"search": "a", "fields": "id", "cursor": "abc"}),
+        ]:
+            content = self.content(self.client.get(url, params))
+            # OrderFilter only shows pending orders by default.
+            self.assertIn("Luis", content)
+            self.assertNotIn("Ana", content)
+
+    def test_csv_formulas_are_escaped(self):
+        Order.objects.filter(pk=self.pending.pk).update(client_name="=HYPERLINK(1)")
+        response = self.client.get(reverse("backoffice:order_export"))
+        content = self.content(response)
+        self.assertIn(",'=HYPERLINK(1),", content)
+        ndjson = self.client.get(
+            "/api/orders/export/", {"status": "PENDING", "output": "ndjson"}
+        )
+        self.assertIn('"=HYPERLINK(1)"', self.content(ndjson))
+
+    async def test_asgi_streams_an_async_iterator(self):
+        await self.async_client.aforce_login(self.user)
+        for url in [reverse("backoffice:order_export"), "/api/orders/export/"]:
+            with self.subTest(url=url):
+                response = await self.async_client.get(url, {"status": "PAID"})
+                self.assertTrue(response.is_async)
+                content = b"".join([chunk async for chunk in response])
+                self.assertIn("Ana", content.decode())
+
+    def test_unknown_output_is_rejected(self):
+        response = self.client.get("/api/orders/export/", {"output": "xlsx"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(
+            reverse("backoffice:supply_export"), {"output": "xlsx"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(username="buscador")
+        self.client.force_login(self.user)
+        self.gel = Product.objects.create(name="Gel Fijador Extra", price=12)
+        self.wax = Product.objects.create(name="Cera Mate", price=15)
+
+    def names(self, queryset):
+        return sorted(queryset.values_list("name", flat=True))
+
+    def test_matches_substrings_like_icontains(self):
+        for term in ("fijador", "JADOR EX", "ra ma", "ge"):
+            self.assertEqual(
+                self.names(search(Product.objects.all(), ["name"], term)),
+                self.names(Product.objects.filter(name__icontains=term)),
+                term,
+            )
+
+    def test_index_follows_updates_and_deletes(self):
+        Product.objects.filter(pk=self.wax.pk).update(name="Pomada Brillo")
+        self.gel.delete()
+        self.assertEqual(self.names(search(Product.objects.all(), ["name"], "cera")), [])
+        self.assertEqual(self.names(search(Product.objects.all(), ["name"], "fijador")), [])
+        self.assertEqual(
+            self.names(search(Product.objects.all(), ["name"], "brillo")), ["Pomada Brillo"]
+        )
+
+    @skipUnless(connection.vendor == "sqlite", "SQLite FTS5 backend")
+    def test_sqlite_queries_go_through_fts(self):
+        with CaptureQueriesContext(connection) as ctx:
+            list(search(Product.objects.all(), ["name"], "fijador"))
+        self.assertIn("backoffice_product_fts", ctx.captured_queries[0]["sql"])
+        self.assertNotIn("LIKE", ctx.captured_queries[0]["sql"])
+
+    @skipUnless(connection.vendor == "sqlite", "SQLite FTS5 backend")
+    def test_migrate_restores_only_dropped_triggers(self):
+        # What a table rebuild in a later migration leaves behind.
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER "backoffice_product_fts_ai"')
+        with CaptureQueriesContext(connection) as ctx:
+            search_index.repair()
+        rebuilt = [q["sql"] for q in ctx.captured_queries if "'rebuild'" in q["sql"]]
+        self.assertEqual(len(rebuilt), 1)
+        self.assertIn("backoffice_product_fts", rebuilt[0])
+        Product.objects.create(name="Pomada Nueva", price=10)
+        self.assertEqual(
+            self.names(search(Product.objects.all(), ["name"], "nueva")), ["Pomada Nueva"]
+        )
+
+    def test_api_search_across_relations(self):
+        SupplyEntry.objects.create(
+            product=self.gel, quantity=1, unit_cost=5, supplier="Distribuidora Sur"
+        )
+        SupplyEntry.objects.create(product=self.wax, quantity=1, unit_cost=5)
+        response = self.client.get("/api/supplies/", {"search": "fijador"})
+        self.assertEqual([row["product"] for row in response.json()], [self.gel.pk])
+        response = self.client.get("/api/supplies/", {"search": "sur fijador"})
+        self.assertEqual(len(response.json()), 1)
+        response = self.client.get("/api/supplies/", {"search": "sur cera"})
+        self.assertEqual(response.json(), [])
+
+    def test_backoffice_filter_method(self):
+        Order.objects.create(client_name="Ana María", created_by=self.user)
+        Order.objects.create(client_name="Luis", created_by=self.user)
+        response = self.client.get(
+            reverse("backoffice:order_list"), {"client_name": "maría"}
+        )
+        self.assertEqual(
+            [order.client_name for order in response.context["orders"]], ["Ana María"]
+        )
+
+
+class IndexUsageTest(QueryPlanMixin, TestCase):
+    """Each Meta.indexes entry is hit by the view query it was added for."""
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(username="admin_idx")
+        self.client.force_login(self.user)
+        self.barber = BarberProfile.objects.create(user=self.user, nickname="Toño")
+        self.service = Product.objects.create(name="Corte", price=25, is_service=True)
+        self.day = timezone.localdate() + timedelta(days=1)
+        WorkSchedule.objects.create(
+            barber=self.barber, day_of_week=self.day.weekday(),
+            start_hour=time(9), end_hour=time(12),
+            lunch_start=time(13), lunch_end=time(14),
+        )
+        Appointment.objects.create(
+            client_name="Ana", client_phone="999", barber=self.barber, date=self.day,
+            start_time=time(10), end_time=time(10, 30), total_amount=25,
+        )
+        Order.objects.create(client_name="Luis", created_by=self.user)
+        Order.objects.create(
+            client_name="Eva", created_by=self.user, status="PAID",
+            paid_at=timezone.now(),
+        )
+
+    def get(self, url, data=None):
+        return lambda: self.assertEqual(self.client.get(url, data).status_code, 200)
+
+    def test_dashboard(self):
+        plans = self.capture_plans(self.get(reverse("backoffice:dashboard")))
+        self.assertIndexUsed(plans, "order_paid_idx")
+        self.assertIndexUsed(plans, "order_created_idx")
+        self.assertIndexUsed(plans, "product_stock_idx")
+
+    def test_order_list_default_view(self):
+        plans = self.capture_plans(self.get(reverse("backoffice:order_list")))
+        self.assertIndexUsed(plans, "order_pending_idx")
+
+    def test_availability(self):
+        plans = self.capture_plans(
+            self.get(
+                reverse("storefront:availability_api"),
+                {"barber_id": self.barber.pk, "date": self.day.isoformat()},
+            )
+        )
+        self.assertIndexUsed(plans, "appt_barber_day_idx")
+        self.assertIndexUsed(plans, "order_creator_status_idx")
+
+    def test_product_autocomplete(self):
+        plans = self.capture_plans(
+            self.get(reverse("product-autocomplete"), {"q": "cor"})
+        )
+        self.assertIndexUsed(plans, "backoffice_product_name_prefix")
+
+    def test_calendar_events(self):
+        plans = self.capture_plans(
+            self.get(
+                reverse("backoffice:appointment_events"),
+                {"start": self.day.isoformat(), "end": self.day.isoformat()},
+            )
+        )
+        self.assertIndexUsed(plans, "appt_date_start_idx")
+
+
+@mock.patch.object(CappedPaginator, "count_cap", 10)
+class BackofficePaginationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(username="paginador")
+        self.client.force_login(self.user)
+        start = timezone.now() - timedelta(days=1)
+        self.orders = []
+        for i in range(25):
+            order = Order.objects.create(client_name=f"Cliente {i}", created_by=self.user)
+            # Pairs share a timestamp so the pk has to break the tie.
+            Order.objects.filter(pk=order.pk).update(
+                created_at=start + timedelta(minutes=i // 2)
+            )
+            self.orders.append(order)
+        self.url = reverse("backoffice:order_list")
+        self.expected = [
+            order.pk
+            for order in Order.objects.order_by("-created_at", "-pk")
+        ]
+
+    def test_count_is_capped(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        paginator = response.context["paginator"]
+        self.assertTrue(paginator.has_more)
+        self.assertEqual(paginator.count_display, "10+")
+        count_sql = [q["sql"] for q in ctx.captured_queries if "COUNT" in q["sql"]]
+        self.assertEqual(len(count_sql), 1)
+        self.assertIn("LIMIT", count_sql[0])
+
+        response = self.client.get(self.url, {"page": 3})
+        self.assertEqual(
+            [order.pk for order in response.context["orders"]], self.expected[20:]
+        )
+        self.assertFalse(response.context["paginator"].has_more)
+
+    def test_keyset_navigation_walks_every_row_once(self):
+        response = self.client.get(self.url)
+        seen = [order.pk for order in response.context["orders"]]
+        cursor = response.context["page_obj"].next_cursor
+        while cursor:
+            response = self.client.get(self.url, {"cursor": cursor})
+            page = response.context["page_obj"]
+            self.assertTrue(page.is_keyset)
+            self.assertEqual(page.start_index(), len(seen) + 1)
+            seen += [order.pk for order in response.context["orders"]]
+            cursor = page.next_cursor
+        self.assertEqual(seen, self.expected)
+        self.assertContains(
+            response, '<span class="page-link">Siguiente</span>', html=True
+        )
+
+    def test_keyset_q_handles_mixed_directions(self):
+        for ordering in [("-created_at", "-pk"), ("created_at", "-pk")]:
+            rows = list(Order.objects.order_by(*ordering))
+            anchor = rows[10]
+            after = Order.objects.filter(
+                keyset_q(ordering, [anchor.created_at, anchor.pk])
+            ).order_by(*ordering)
+            self.assertEqual(list(after), rows[11:])
+        # Same-direction orderings seek with a single row comparison.
+        seek = keyset_q(("-created_at", "-pk"), [anchor.created_at, anchor.pk])
+        self.assertIn(
+            '"created_at", "backoffice_order"."id") < (',
+            str(Order.objects.filter(seek).query),
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {"cursor": "manipulado"})
+        self.assertEqual(response.status_code, 404)
+
+
+class ChoiceCacheTest(CommitOnWriteMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(username="cajero")
+        self.product = Product.objects.create(name="Cera", price=Decimal("15.00"))
+        barber_user = User.objects.create_user(
+            username="barbero", first_name="Ana", last_name="Ruiz"
+        )
+        self.barber = BarberProfile.objects.create(user=barber_user)
+
+    def render_formset(self, rows):
+        order = Order.objects.create(created_by=self.user)
+        for _ in range(rows):
+            OrderItem.objects.create(
+                order=order, product=self.product, quantity=1, unit_price=15
+            )
+        forms = OrderItemFormSet(instance=order).forms
+        with CaptureQueriesContext(connection) as ctx:
+            html = "".join(str(form["product"]) for form in forms)
+        return html, ctx.captured_queries
+
+    def test_formset_rows_share_one_list(self):
+        self.enterContext(choices.memoized())
+        _, queries = self.render_formset(3)
+        product_queries = [
+            q for q in queries if "backoffice_product" in q["sql"]
+        ]
+        self.assertEqual(len(product_queries), 1)
+
+        choices.forget()
+        html, queries = self.render_formset(10)
+        # Only the version lookup: the list comes from the cache.
+        self.assertEqual(len(queries), 1)
+        self.assertIn("backoffice_tableversion", queries[0]["sql"])
+        self.assertEqual(html.count("Cera (Producto)"), 10)
+
+    def test_save_invalidates(self):
+        self.render_formset(1)
+        self.product.name = "Cera mate"
+        self.product.save()
+        html, _ = self.render_formset(1)
+        self.assertIn("Cera mate (Producto)", html)
+        self.assertNotIn("Cera (Producto)", html)
+
+    def test_filter_labels_follow_user_changes(self):
+        form = AppointmentFilter(data={}).form
+        self.assertIn("Ana Ruiz", str(form["barber"]))
+        self.barber.user.first_name = "Rosa"
+        self.barber.user.save()
+        form = AppointmentFilter(data={}).form
+        self.assertIn("Rosa Ruiz", str(form["barber"]))
+        self.assertEqual(
+            AppointmentFilter(data={"barber": self.barber.pk}).qs.count(), 0
+        )
+
+    def test_memo_is_scoped(self):
+        # Outside a request the version is checked on every call, so writes
+        # that skip signals are picked up.
+        self.assertIn((self.product.pk, "Cera (Producto)"), choices.PRODUCTS.choices())
+        Product.objects.filter(pk=self.product.pk).update(name="Cera mate")
+        bump_version(Product)
+        self.assertIn((self.product.pk, "Cera mate (Producto)"), choices.PRODUCTS.choices())
+
+        with choices.memoized():
+            choices.PRODUCTS.choices()
+            with self.assertNumQueries(0):
+                choices.PRODUCTS.choices()
+        with self.assertNumQueries(1):
+            choices.PRODUCTS.choices()
+
+        # Concurrent requests sharing a thread run in their own contexts,
+        # so one request's memo is never seen by another.
+        with choices.memoized():
+            choices.PRODUCTS.choices()
+            with self.assertNumQueries(1):
+                contextvars.Context().run(choices.PRODUCTS.choices)
+
+        # A request's memo ends with it.
+        self.client.force_login(self.user)
+        self.client.get(reverse("backoffice:order_add"))
+        with self.assertNumQueries(1):
+            choices.PRODUCTS.choices()
+
+
+class ProductAutocompleteTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(username="vendedor")
+        self.client.force_login(self.user)
+        category = Category.objects.create(name="Cuidado")
+        self.wax = Product.objects.create(
+            name="Cera mate", price=Decimal("15.00"), stock_qty=4, category=category
+        )
+        Product.objects.create(name="Cepillo", price=Decimal("8.50"), stock_qty=2)
+        Product.objects.create(name="Corte clásico", price=25, is_service=True)
+        Product.objects.create(name="Shampoo cera", price=12, stock_qty=1)
+        self.url = reverse("product-autocomplete")
+
+    def test_prefix_match(self):
+        response = self.client.get(self.url, {"q": "CE"})
+        self.assertEqual(
+            [row["name"] for row in response.json()], ["Cepillo", "Cera mate"]
+        )
+        row = response.json()[1]
+        self.assertEqual(row["id"], self.wax.pk)
+        self.assertEqual(row["price"], "15.00")
+        self.assertEqual(row["stock_qty"], 4)
+        self.assertFalse(row["is_service"])
+        self.assertEqual(row["category_name"], "Cuidado")
+
+    def test_limit(self):
+        with mock.patch.object(ProductViewSet, "autocomplete_limit", 2):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_order_form_only_renders_selected_product(self):
+        order = Order.objects.create(created_by=self.user)
+        OrderItem.objects.create(
+            order=order, product=self.wax, quantity=1, unit_price=15
+        )
+        response = self.client.get(
+            reverse("backoffice:order_edit", args=[order.pk])
+        )
+        self.assertContains(response, "Cera mate (Producto)", count=1)
+        self.assertNotContains(response, "Cepillo (Producto)")
+        self.assertContains(response, f'data-autocomplete-url="{self.url}"')
+
+
+class OrderStockValidationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(username="cobrador")
+        self.gel = Product.objects.create(name="Gel", price=10, stock_qty=5)
+        self.wax = Product.objects.create(name="Cera", price=15, stock_qty=9)
+        self.cut = Product.objects.create(name="Corte", price=25, is_service=True)
+
+    def formset_data(self, rows):
+        data = {
+            "items-TOTAL_FORMS": str(len(rows)),
+            "items-INITIAL_FORMS": "0",
+            "items-MIN_NUM_FORMS": "0",
+            "items-MAX_NUM_FORMS": "1000",
+        }
+        for i, (product, quantity) in enumerate(rows):
+            data[f"items-{i}-product"] = str(product.pk)
+            data[f"items-{i}-quantity"] = str(quantity)
+            data[f"items-{i}-unit_price"] = str(product.price)
+        return data
+
+    def test_duplicate_lines_are_added_up(self):
+        formset = OrderItemFormSet(
+            self.formset_data(
+                [(self.gel, 3), (self.wax, 2), (self.gel, 3), (self.cut, 99)]
+            ),
+            instance=Order(),
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertFalse(formset.is_valid())
+        product_queries = [
+            q for q in ctx.captured_queries if "backoffice_product" in q["sql"]
+        ]
+        self.assertEqual(len(product_queries), 1)
+
+        message = "Stock insuficiente para 'Gel'. Solicitado: 6, Disponible: 5"
+        self.assertEqual(formset.errors[0], {"quantity": [message]})
+        self.assertEqual(formset.errors[1], {})
+        self.assertEqual(formset.errors[2], {"quantity": [message]})
+        self.assertEqual(formset.errors[3], {})
+
+    def test_product_is_validated_by_the_field(self):
+        data = self.formset_data([(self.gel, 1)])
+        data["items-0-product"] = "999999"
+        formset = OrderItemFormSet(data, instance=Order())
+        self.assertFalse(formset.is_valid())
+        self.assertIn("product", formset.errors[0])
+
+        order = self.make_order((self.gel, 1))
+        item = order.items.get()
+        data = self.formset_data([(self.gel, 1)])
+        data.update({"items-INITIAL_FORMS": "1", "items-0-id": str(item.pk)})
+        formset = OrderItemFormSet(data, instance=order)
+        self.assertTrue(formset.is_valid())
+        self.assertFalse(formset.forms[0].has_changed())
+        self.assertEqual(formset.forms[0].instance.product, self.gel)
+
+    def test_within_stock(self):
+        formset = OrderItemFormSet(
+            self.formset_data([(self.gel, 2), (self.gel, 3)]), instance=Order()
+        )
+        self.assertTrue(formset.is_valid())
+
+    def make_order(self, *rows):
+        order = Order.objects.create(created_by=self.user)
+        for product, quantity in rows:
+            OrderItem.objects.create(
+                order=order, product=product, quantity=quantity,
+                unit_price=product.price,
+            )
+        return order
+
+    def test_mark_as_paid_adds_up_lines(self):
+        order = self.make_order((self.gel, 3), (self.gel, 3))
+        response = self.client_for(self.user).post(
+            reverse("order-mark-as-paid", args=[order.pk])
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()["detail"],
+            "Stock insuficiente para 'Gel'. Solicitado: 6, Disponible: 5",
+        )
+        self.gel.refresh_from_db()
+        self.assertEqual(self.gel.stock_qty, 5)
+
+    def test_mark_as_paid_deducts_stock(self):
+        order = self.make_order((self.gel, 2), (self.wax, 4), (self.gel, 1), (self.cut, 1))
+        ChangeLogEntry.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            order.mark_as_paid(self.user)
+
+        self.gel.refresh_from_db()
+        self.wax.refresh_from_db()
+        self.assertEqual((self.gel.stock_qty, self.wax.stock_qty), (2, 5))
+        self.assertEqual(order.status, "PAID")
+        synced = set(
+            ChangeLogEntry.objects.filter(table="backoffice.product").values_list(
+                "object_id", flat=True
+            )
+        )
+        self.assertEqual(synced, {self.gel.pk, self.wax.pk})
+
+    def client_for(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+
+class ServiceCatalogTest(CommitOnWriteMixin, TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name="Cortes")
+        self.cut = Product.objects.create(
+            name="Corte", price=25, duration=30, category=self.category, is_service=True
+        )
+        Product.objects.create(name="Cera", price=10)
+
+    def test_snapshot_is_reused_until_a_change(self):
+        catalog = get_catalog()
+        with self.assertNumQueries(1):
+            self.assertIs(get_catalog(), catalog)
+        self.assertEqual(list(catalog.services), [self.cut.pk])
+        self.assertEqual(
+            json.loads(catalog.json), {str(self.cut.pk): {"price": 25.0, "duration": 30}}
+        )
+
+        self.cut.price = 28
+        self.cut.save()
+        self.assertEqual(get_catalog()[self.cut.pk].price, Decimal("28.00"))
+
+        self.category.status = False
+        self.category.save()
+        catalog = get_catalog()
+        self.assertEqual(catalog.public, ())
+        self.assertIn(self.cut.pk, catalog)
+
+    def test_appointment_form_embeds_catalog_json(self):
+        self.client.force_login(User.objects.create_superuser(username="recepcion"))
+        response = self.client.get(reverse("backoffice:appointment_add"))
+        self.assertEqual(response.context["services_json"], get_catalog().json)
+
+
+class VersionedCacheTest(CommitOnWriteMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(username="cajero")
+        self.order = Order.objects.create(client_name="Ana", created_by=self.user)
+
+    def test_cached_result_until_a_write(self):
+        calls = []
+
+        @cached_result([Order], name="tests.pending")
+        def pending(status):
+            calls.append(status)
+            return Order.objects.filter(status=status).count()
+
+        self.assertEqual(pending("PENDING"), 1)
+        with self.assertNumQueries(1):  # The version lookup.
+            self.assertEqual(pending("PENDING"), 1)
+        self.assertEqual(pending("PAID"), 0)
+        self.assertEqual(calls, ["PENDING", "PAID"])
+
+        Order.objects.create(client_name="Luis", created_by=self.user)
+        self.assertEqual(pending("PENDING"), 2)
+        self.assertEqual(pending.uncached("PENDING"), 2)
+
+    def test_cached_fragment_serves_until_a_write(self):
+        calls = []
+
+        @cached_fragment([Order], name="tests.fragment")
+        def view(request):
+            calls.append(request.GET.get("page"))
+            return HttpResponse(f"<b>{Order.objects.count()}</b>")
+
+        factory = RequestFactory()
+        self.assertEqual(view(factory.get("/f/", {"page": 1})).content, b"<b>1</b>")
+        self.assertEqual(view(factory.get("/f/", {"page": 1})).content, b"<b>1</b>")
+        view(factory.get("/f/", {"page": 2}))
+        self.assertEqual(calls, ["1", "2"])
+
+        self.order.status = "PAID"
+        self.order.save()
+        view(factory.get("/f/", {"page": 1}))
+        self.assertEqual(calls, ["1", "2", "1"])
+
+    def test_long_keys_are_hashed(self):
+        key = versioned_key("tests.long", [Order], "x" * 500)
+        self.assertLess(len(key), MAX_KEY_LENGTH)
+        self.assertNotEqual(key, versioned_key("tests.long", [Order], "y" * 500))
+
+    def test_dashboard_is_cached_until_an_order_changes(self):
+        self.client.force_login(self.user)
+        url = reverse("backoffice:dashboard")
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        self.assertFalse(
+            [q for q in ctx.captured_queries if "backoffice_order" in q["sql"]]
+        )
+        self.order.status = "PAID"
+        self.order.paid_at = timezone.now()
+        self.order.save()
+        response = self.client.get(url)
+        self.assertEqual(response.context["stats"]["pending_orders"], 0)
+
+
+class PermissionCacheTest(CommitOnWriteMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="cajero", password="x")
+        self.group = Group.objects.create(name="Caja")
+        self.view_order = Permission.objects.get(codename="view_order")
+        self.add_order = Permission.objects.get(codename="add_order")
+        self.group.permissions.add(self.view_order)
+        self.user.groups.add(self.group)
+
+    def fresh_user(self):
+        # A new instance per check, like request.user on each request.
+        return User.objects.get(pk=self.user.pk)
+
+    def test_cached_across_requests(self):
+        self.assertTrue(self.fresh_user().has_perm("backoffice.view_order"))
+        user = self.fresh_user()
+        with self.assertNumQueries(1):  # The version lookup.
+            self.assertTrue(user.has_perm("backoffice.view_order"))
+            self.assertFalse(user.has_perm("backoffice.add_order"))
+
+    def test_group_permission_change_invalidates(self):
+        self.assertFalse(self.fresh_user().has_perm("backoffice.add_order"))
+        self.group.permissions.add(self.add_order)
+        self.assertTrue(self.fresh_user().has_perm("backoffice.add_order"))
+        self.group.permissions.clear()
+        self.assertFalse(self.fresh_user().has_perm("backoffice.view_order"))
+
+    def test_user_permission_and_membership_changes_invalidate(self):
+        self.assertFalse(self.fresh_user().has_perm("backoffice.add_order"))
+        self.user.user_permissions.add(self.add_order)
+        self.assertTrue(self.fresh_user().has_perm("backoffice.add_order"))
+        self.user.groups.remove(self.group)
+        self.assertFalse(self.fresh_user().has_perm("backoffice.view_order"))
+
+    def test_deactivated_user_loses_permissions(self):
+        self.assertTrue(self.fresh_user().has_perm("backoffice.view_order"))
+        self.user.is_active = False
+        self.user.save()
+        self.assertFalse(self.fresh_user().has_perm("backoffice.view_order"))
+
+    def test_backoffice_page_checks_without_permission_queries(self):
+        self.group.permissions.add(Permission.objects.get(codename="view_product"))
+        self.client.login(username="cajero", password="x")
+        url = reverse("backoffice:product_list")
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertFalse(
+            [q for q in ctx.captured_queries if "auth_permission" in q["sql"]]
+        )
+
+
+class PermissionTreeTest(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser(username="admin"))
+        self.group = Group.objects.create(name="Caja")
+        self.group.permissions.add(Permission.objects.get(codename="view_order"))
+
+    def test_grouped_labels(self):
+        grouped = dict(GroupForm(instance=self.group).get_grouped_permissions())
+        widgets = grouped["Backoffice | Venta"]
+        labels = {int(str(widget.data["value"])): widget.custom_label for widget in widgets}
+        view_order = Permission.objects.get(codename="view_order")
+        paid = Permission.objects.get(codename="can_mark_order_as_paid")
+        self.assertEqual(labels[view_order.pk], "Ver venta")
+        self.assertEqual(labels[paid.pk], paid.name)
+        checked = [widget for widget in widgets if widget.data["selected"]]
+        self.assertEqual([int(str(w.data["value"])) for w in checked], [view_order.pk])
+
+    def test_tree_built_once_per_version(self):
+        GroupForm().get_grouped_permissions()
+        with self.assertNumQueries(1):  # The version lookup.
+            GroupForm().get_grouped_permissions()
+
+        content_type = ContentType.objects.get_for_model(Order)
+        Permission.objects.create(
+            codename="can_refund_order", name="Puede reembolsar", content_type=content_type
+        )
+        grouped = dict(GroupForm().get_grouped_permissions())
+        self.assertIn(
+            "Puede reembolsar",
+            [widget.custom_label for widget in grouped["Backoffice | Venta"]],
+        )
+
+    def test_edit_group_permissions(self):
+        add_order = Permission.objects.get(codename="add_order")
+        url = reverse("backoffice:group_edit", args=[self.group.pk])
+        self.assertContains(self.client.get(url), "Agregar venta")
+        response = self.client.post(url, {"name": "Caja", "permissions": [add_order.pk]})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(self.group.permissions.all()), [add_order])
+
+
+class ApiKeyAuthenticationTest(CommitOnWriteMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="integracion")
+        self.user.user_permissions.add(Permission.objects.get(codename="view_product"))
+        Product.objects.create(name="Gel", price=12)
+
+    def issue(self):
+        out = io.StringIO()
+        call_command("api_key", "issue", "integracion", "--name", "ERP", stdout=out)
+        return out.getvalue().splitlines()[-1]
+
+    def get(self, key):
+        return self.client.get("/api/products/", HTTP_AUTHORIZATION=f"Api-Key {key}")
+
+    def test_key_authenticates_and_is_cached(self):
+        key = self.issue()
+        self.assertEqual(ApiKey.objects.get().digest, key_digest(key))
+        self.assertEqual(self.get(key).status_code, 200)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.get(key).status_code, 200)
+        self.assertFalse(
+            [q for q in ctx.captured_queries if "backoffice_apikey" in q["sql"]]
+        )
+
+    def test_unknown_and_malformed_keys_are_rejected(self):
+        self.issue()
+        self.assertEqual(self.get("00000000.nope").status_code, 401)
+        # Guesses don't take cache entries.
+        key = versioned_key("apikey", [ApiKey, User], key_digest("00000000.nope"))
+        self.assertIsNone(cache.get(key))
+        response = self.client.get("/api/products/", HTTP_AUTHORIZATION="Api-Key")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response["WWW-Authenticate"], "Api-Key")
+
+    def test_revoke_and_rotate(self):
+        key = self.issue()
+        self.assertEqual(self.get(key).status_code, 200)
+        prefix = key.split(".")[0]
+
+        out = io.StringIO()
+        call_command("api_key", "rotate", prefix, stdout=out)
+        new_key = out.getvalue().splitlines()[-1]
+        self.assertEqual(self.get(key).status_code, 401)
+        self.assertEqual(self.get(new_key).status_code, 200)
+
+        call_command("api_key", "revoke", new_key.split(".")[0], stdout=io.StringIO())
+        self.assertEqual(self.get(new_key).status_code, 401)
+        with self.assertRaises(CommandError):
+            call_command("api_key", "revoke", prefix, stdout=io.StringIO())
+
+    def test_inactive_user_is_rejected(self):
+        key = self.issue()
+        self.assertEqual(self.get(key).status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get(key).status_code, 401)
+
+
+@override_settings(RATE_LIMITS={"api": "2/min"})
+class ApiThrottleTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="integracion")
+        self.user.user_permissions.add(Permission.objects.get(codename="view_category"))
+
+    def test_keyed_per_api_key(self):
+        _, key = issue_key(self.user, "ERP")
+        _, other_key = issue_key(self.user, "Web")
+        for _ in range(2):
+            response = self.client.get("/api/categories/", HTTP_AUTHORIZATION=f"Api-Key {key}")
+            self.assertEqual(response.status_code, 200)
+        response = self.client.get("/api/categories/", HTTP_AUTHORIZATION=f"Api-Key {key}")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "30")
+        response = self.client.get(
+            "/api/categories/", HTTP_AUTHORIZATION=f"Api-Key {other_key}"
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_keyed_per_user(self):
+        self.client.force_login(self.user)
+        for _ in range(2):
+            self.client.get("/api/categories/")
+        self.assertEqual(self.client.get("/api/categories/").status_code, 429)
+        other = User.objects.create_superuser(username="otro")
+        self.client.force_login(other)
+        self.assertEqual(self.client.get("/api/categories/").status_code, 200)
+
+
+class SingleFlightTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def run_threads(self, target, count=8):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(target())) for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_calls_share_one_computation(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            timer.sleep(0.1)
+            return ["09:00 AM"]
+
+        results = self.run_threads(lambda: get_or_compute("tests:flight", compute, 60))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [["09:00 AM"]] * 8)
+        # Later calls are served from the cache.
+        self.assertEqual(get_or_compute("tests:flight", compute, 60), ["09:00 AM"])
+        self.assertEqual(len(calls), 1)
+
+    def test_waiters_get_the_leaders_exception(self):
+        flight = SingleFlight()
+        errors = []
+
+        def compute():
+            timer.sleep(0.1)
+            raise ValueError("boom")
+
+        def call():
+            try:
+                flight.do("key", compute)
+            except ValueError as error:
+                errors.append(error)
+
+        self.run_threads(call, count=4)
+        self.assertEqual(len(errors), 4)
+        self.assertEqual(len({id(error) for error in errors}), 1)
+        self.assertEqual(flight.calls, {})
+
+    def test_waits_for_another_worker(self):
+        cache.add("tests:worker:lock", 1)
+        timer = threading.Timer(0.1, lambda: cache.set("tests:worker", "done"))
+        timer.start()
+        compute = mock.Mock(return_value="mine")
+        self.assertEqual(compute_once("tests:worker", compute, 60), "done")
+        compute.assert_not_called()
+        timer.join()
+
+    @mock.patch("core.cache.flight.LOCK_TIMEOUT", 0.2)
+    def test_computes_when_the_other_worker_stalls(self):
+        cache.add("tests:stalled:lock", 1)
+        self.assertEqual(compute_once("tests:stalled", lambda: "mine", 60), "mine")
+        self.assertEqual(cache.get("tests:stalled"), "mine")
+
+    async def test_concurrent_coroutines_share_one_computation(self):
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return ["09:00 AM"]
+
+        results = await asyncio.gather(
+            *(aget_or_compute("tests:aflight", compute, 60) for _ in range(8))
+        )
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [["09:00 AM"]] * 8)
+        # The sync and async variants share the cached value.
+        self.assertEqual(get_or_compute("tests:aflight", mock.Mock(), 60), ["09:00 AM"])
+
+    async def test_waiting_coroutines_get_the_leaders_exception(self):
+        flight = AsyncSingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.1)
+            raise ValueError("boom")
+
+        errors = await asyncio.gather(
+            *(flight.do("key", compute) for _ in range(4)), return_exceptions=True
+        )
+        self.assertEqual([type(error) for error in errors], [ValueError] * 4)
+        self.assertEqual(flight.calls, {})
+
+    async def test_cancelled_leader_doesnt_fail_the_others(self):
+        flight = AsyncSingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.1)
+            return 42
+
+        leader = asyncio.ensure_future(flight.do("key", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("key", compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        self.assertEqual(await follower, 42)
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+        self.assertEqual(flight.calls, {})
+
+    @mock.patch("core.cache.flight.LOCK_TIMEOUT", 0.1)
+    def test_expired_lock_of_another_worker_is_kept(self):
+        def compute():
+            # Our lock expires and another worker takes it meanwhile.
+            timer.sleep(0.2)
+            self.assertTrue(cache.add("tests:slow:lock", "theirs"))
+            return "mine"
+
+        self.assertEqual(compute_once("tests:slow", compute, 60), "mine")
+        self.assertEqual(cache.get("tests:slow:lock"), "theirs")
@@ -26,11 +26,14 @@ from core.apps.backoffice.views.orders import (
     OrderCreateView,
     OrderUpdateView,
     OrderPrintView,
+    OrderExportView,
+    OrderItemExportView,
 )
 from core.apps.backoffice.views.supplies import (
     SupplyListView,
     SupplyCreateView,
     SupplyUpdateView,
+    SupplyExportView,
 )
 from core.apps.backoffice.views.barbers import (
     BarberListView,
@@ -44,6 +47,7 @@ from core.apps.backoffice.views.appointments import (
     AppointmentCalendarView,
     AppointmentJSONView,
     AppointmentConvertToOrderView,
+    AppointmentExportView,
 )
 from core.apps.backoffice.views.profile import ProfileUpdateView
 
@@ -84,12 +88,15 @@ urlpatterns = [
     # Orders URLs
     path("orders/", OrderListView.as_view(), name="order_list"),
     path("orders/add/", OrderCreateView.as_view(), name="order_add"),
+    path("orders/export/", OrderExportView.as_view(), name="order_export"),
+    path("orders/items/export/", OrderItemExportView.as_view(), name="order_item_export"),
     path("orders/<int:pk>/edit/", OrderUpdateView.as_view(), name="order_edit"),
     path("orders/<int:pk>/print/", OrderPrintView.as_view(), name="order_print"),
 
     # Supplies URLs
     path("supplies/", SupplyListView.as_view(), name="supply_list"),
     path("supplies/add/", SupplyCreateView.as_view(), name="supply_add"),
+    path("supplies/export/", SupplyExportView.as_view(), name="supply_export"),
     path("supplies/<int:pk>/edit/", SupplyUpdateView.as_view(), name="supply_edit"),
 
     # Barbers URLs
@@ -102,6 +109,7 @@ urlpatterns = [
     path("appointments/calendar/", AppointmentCalendarView.as_view(), name="appointment_calendar"),
     path("api/appointments/events/", AppointmentJSONView.as_view(), name="appointment_events"),
     path("appointments/add/", AppointmentCreateView.as_view(), name="appointment_add"),
+    path("appointments/export/", AppointmentExportView.as_view(), name="appointment_export"),
     path("appointments/<int:pk>/edit/", AppointmentUpdateView.as_view(), name="appointment_edit"),
     path("appointments/<int:pk>/convert/", AppointmentConvertToOrderView.as_view(), name="appointment_convert"),
 ]
\ No newline at end of file
@@ -0,0 +1,185 @@
+"""
+Per-table version stamps used to validate caches and ETags.
+
+Every write to a tracked model bumps its TableVersion row (see signals.py),
+so "has anything in these tables changed?" is a single indexed lookup.
+Bulk writes that skip model signals (`bulk_create`, `bulk_update`,
+`QuerySet.update`) must call `bump_version()` themselves.
+
+Inside a transaction the bump waits for the commit and runs as its own
+statement, so the version row is locked for that statement only, not for
+the whole writer transaction, and concurrent writers of a table don't queue
+up behind each other. Between the commit and the bump, other connections
+can still get a cached copy from before the write; a cache filled then
+with the new data is keyed on the old stamp, which the bump retires. A
+rolled-back transaction bumps nothing.
+
+Until it commits, the writing transaction itself must not read its own
+tables through the old stamp, or it would serve what it has just changed
+from the cache. get_versions() therefore reports the tables it has written
+as pending, with a token unique to each call, so its cache lookups miss and
+its ETags never match a client's.
+"""
+
+import hashlib
+import math
+import uuid
+import weakref
+
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from core.apps.backoffice.models import TableVersion
+
+
+def table_label(model):
+    return model._meta.label_lower
+
+
+# Connection -> labels of the tables its open transaction wrote.
+PENDING = weakref.WeakKeyDictionary()
+
+
+def bump_version(*models):
+    """
+    Increments the version of each model's table: right away in autocommit
+    mode, otherwise once the current transaction commits.
+    """
+    labels = {table_label(model) for model in models}
+    if transaction.get_autocommit():
+        write_versions(labels)
+        return
+
+    PENDING.setdefault(connections[DEFAULT_DB_ALIAS], set()).update(labels)
+    transaction.on_commit(write_pending)
+
+
+def write_pending():
+    # The first callback of the transaction writes every label it bumped.
+    write_versions(PENDING.pop(connections[DEFAULT_DB_ALIAS], ()))
+
+
+def write_versions(labels):
+    now = timezone.now()
+    for label in sorted(labels):
+        versions = TableVersion.objects.filter(table=label)
+        if versions.update(version=F("version") + 1, updated_at=now):
+            continue
+        try:
+            with transaction.atomic():
+                TableVersion.objects.create(table=label, version=1, updated_at=now)
+        except IntegrityError:
+            versions.update(version=F("version") + 1, updated_at=now)
+
+
+def pending_labels():
+    """Labels of the tables this connection's open transaction wrote."""
+    connection = connections[DEFAULT_DB_ALIAS]
+    if transaction.get_autocommit():
+        # Left over from a rolled back transaction.
+        PENDING.pop(connection, None)
+        return set()
+    return PENDING.get(connection, set())
+
+
+def get_versions(*models):
+    """
+    Returns {label: (version, updated_at)} for the given models in one query.
+    Tables never written since versioning was added report version 0;
+    tables the open transaction has written report "<version>+<token>",
+    with a token unique to the call, and no updated_at.
+    """
+    labels = [table_label(model) for model in models]
+    return fill_versions(labels, versions_query(labels), pending_labels())
+
+
+async def aget_versions(*models):
+    """get_versions() for async views, with the async ORM."""
+    labels = [table_label(model) for model in models]
+    return fill_versions(labels, [row async for row in versions_query(labels)])
+
+
+def versions_query(labels):
+    return TableVersion.objects.filter(table__in=labels).values_list(
+        "table", "version", "updated_at"
+    )
+
+
+def fill_versions(labels, rows, pending=()):
+    found = {table: (version, updated_at) for table, version, updated_at in rows}
+    versions = {label: found.get(label, (0, None)) for label in labels}
+    token = uuid.uuid4().hex
+    for label in pending & versions.keys():
+        versions[label] = (f"{versions[label][0]}+{token}", None)
+    return versions
+
+
+def format_stamp(versions):
+    return "-".join(
+        f"{version}.{updated_at.timestamp() if updated_at else 0}"
+        for version, updated_at in versions.values()
+    )
+
+
+def cache_stamp(*models):
+    """
+    Returns a string identifying the current versions of `models`, for
+    cache keys. updated_at is part of it in case a table's versions start
+    over (test rollbacks, a restored database) while the cache survives.
+    """
+    return format_stamp(get_versions(*models))
+
+
+async def acache_stamp(*models):
+    return format_stamp(await aget_versions(*models))
+
+
+def version_stamp(models, *parts):
+    """
+    Returns (etag, last_modified) for the current versions of `models`.
+    `parts` are mixed into the ETag for anything else the response depends
+    on (query string, negotiated format, ...).
+    """
+    versions = get_versions(*models)
+    key = "|".join(
+        [f"{label}:{version}" for label, (version, _) in sorted(versions.items())]
+        + [str(part) for part in parts]
+    )
+    etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+    stamps = [updated_at for _, updated_at in versions.values() if updated_at]
+    last_modified = math.ceil(max(stamps).timestamp()) if stamps else None
+    if any(isinstance(version, str) for version, _ in versions.values()):
+        # Pending writes: only the transaction-unique ETag can validate.
+        last_modified = None
+    # HTTP dates have whole seconds: until that second is over, another
+    # write could land in it without changing the header, and a client
+    # sending only If-Modified-Since would get a stale 304. The ETag alone
+    # validates meanwhile.
+    if last_modified is not None and last_modified > timezone.now().timestamp():
+        last_modified = None
+    return etag, last_modified
+
+
+def conditional_response(request, models, parts, render, use_last_modified=True):
+    """
+    Answers `request` with 304 Not Modified when the version stamp matches
+    the client's validators; otherwise calls `render()`. The validators are
+    set on whichever response is returned.
+    """
+    etag, last_modified = version_stamp(models, *parts)
+    if not use_last_modified:
+        last_modified = None
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = render()
+    if request.method in ("GET", "HEAD") and response.status_code in (200, 304):
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+    return response
@@ -1,4 +1,3 @@
-import json
 from django.urls import reverse_lazy, reverse
 from django.db.models import Sum, Q, F
 from django.utils import timezone
@@ -11,18 +10,22 @@ from django.views.generic import (
 )
 from django_filters.views import FilterView
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from core.mixins import BasePageMixin
-from core.apps.backoffice.models import Appointment, BarberProfile, Product
+from core.mixins import BasePageMixin, ConditionalGetMixin, ExportMixin
+from core.pagination import KeysetPaginationMixin
+from core.apps.backoffice import exports
+from core.apps.backoffice.catalog import get_catalog
+from core.apps.backoffice.models import Appointment, BarberProfile
 from core.apps.backoffice.forms import AppointmentForm
 from core.apps.backoffice.filters import AppointmentFilter
 
 
-class AppointmentListView(BasePageMixin, FilterView):
+class AppointmentListView(BasePageMixin, KeysetPaginationMixin, FilterView):
     model = Appointment
     template_name = "backoffice/appointments/list.html"
     context_object_name = "appointments"
     filterset_class = AppointmentFilter
     paginate_by = 10
+    keyset_ordering = ("-date", "start_time", "pk")
     page_title = "Agenda de Citas"
     permission_required = "backoffice.view_appointment"
 
@@ -30,6 +33,10 @@ class AppointmentListView(BasePageMixin, FilterView):
         return Appointment.objects.all().order_by("-date", "start_time")
 
 
+class AppointmentExportView(ExportMixin, AppointmentListView):
+    export = exports.APPOINTMENTS
+
+
 class AppointmentCalendarView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
     template_name = 'backoffice/appointments/calendar.html'
     permission_required = 'backoffice.view_appointment'
@@ -40,7 +47,13 @@ class AppointmentCalendarView(LoginRequiredMixin, PermissionRequiredMixin, Templ
         return context
 
 
-class AppointmentJSONView(LoginRequiredMixin, View):
+class AppointmentJSONView(LoginRequiredMixin, ConditionalGetMixin, View):
+    version_models = [Appointment, BarberProfile]
+
+    def get_version_parts(self):
+        # The default range depends on the current date.
+        return [self.request.get_full_path(), timezone.localdate()]
+
     def get(self, request, *args, **kwargs):
         start = request.GET.get('start')
         end = request.GET.get('end')
@@ -100,12 +113,7 @@ class AppointmentCreateView(BasePageMixin, CreateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        services = Product.objects.filter(is_service=True)
-        services_data = {
-            s.id: {'price': float(s.price), 'duration': s.duration} 
-            for s in services
-        }
-        context['services_json'] = json.dumps(services_data)
+        context['services_json'] = get_catalog().json
         return context
 
 
@@ -119,12 +127,7 @@ class AppointmentUpdateView(BasePageMixin, UpdateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        services = Product.objects.filter(is_service=True)
-        services_data = {
-            s.id: {'price': float(s.price), 'duration': s.duration} 
-            for s in services
-        }
-        context['services_json'] = json.dumps(services_data)
+        context['services_json'] = get_catalog().json
         return context
 
 
@@ -14,9 +14,11 @@ from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
 from reportlab.lib import colors
 
-from core.mixins import BasePageMixin
+from core.mixins import BasePageMixin, ExportMixin
+from core.pagination import KeysetPaginationMixin
+from core.apps.backoffice import exports
 from core.apps.backoffice.models import Order, OrderItem
-from core.apps.backoffice.forms import OrderForm, OrderItemForm
+from core.apps.backoffice.forms import BaseOrderItemFormSet, OrderForm, OrderItemForm
 from core.apps.backoffice.filters import OrderFilter
 
 
@@ -24,17 +26,19 @@ OrderItemFormSet = inlineformset_factory(
     Order,
     OrderItem,
     form=OrderItemForm,
+    formset=BaseOrderItemFormSet,
     extra=1,
     can_delete=True,
 )
 
 
-class OrderListView(BasePageMixin, FilterView):
+class OrderListView(BasePageMixin, KeysetPaginationMixin, FilterView):
     model = Order
     template_name = "backoffice/orders/list.html"
     context_object_name = "orders"
     filterset_class = OrderFilter
     paginate_by = 10
+    keyset_ordering = ("-created_at", "-pk")
     page_title = "Ordenes"
     permission_required = "backoffice.view_order"
 
@@ -46,6 +50,14 @@ class OrderListView(BasePageMixin, FilterView):
         )
 
 
+class OrderExportView(ExportMixin, OrderListView):
+    export = exports.ORDERS
+
+
+class OrderItemExportView(ExportMixin, OrderListView):
+    export = exports.ORDER_ITEMS
+
+
 class OrderCreateView(BasePageMixin, CreateView):
     model = Order
     form_class = OrderForm
@@ -5,18 +5,21 @@ from django.contrib import messages
 from django.shortcuts import redirect
 from django.db import transaction
 
-from core.mixins import BasePageMixin
+from core.mixins import BasePageMixin, ExportMixin
+from core.pagination import KeysetPaginationMixin
+from core.apps.backoffice import exports
 from core.apps.backoffice.models import SupplyEntry
 from core.apps.backoffice.forms import SupplyEntryForm
 from core.apps.backoffice.filters import SupplyEntryFilter
 
 
-class SupplyListView(BasePageMixin, FilterView):
+class SupplyListView(BasePageMixin, KeysetPaginationMixin, FilterView):
     model = SupplyEntry
     template_name = "backoffice/supplies/list.html"
     context_object_name = "supplies"
     filterset_class = SupplyEntryFilter
     paginate_by = 10
+    keyset_ordering = ("-date", "-pk")
     page_title = "Entradas de Insumos"
     permission_required = "backoffice.view_supplyentry"
 
@@ -26,6 +29,10 @@ class SupplyListView(BasePageMixin, FilterView):
         )
 
 
+class SupplyExportView(ExportMixin, SupplyListView):
+    export = exports.SUPPLIES
+
+
 class SupplyCreateView(BasePageMixin, CreateView):
     model = SupplyEntry
     form_class = SupplyEntryForm
@@ -6,14 +6,16 @@ from django.contrib import messages
 from core.apps.backoffice.forms import UserForm
 from core.apps.backoffice.filters import UserFilter
 from core.mixins import BasePageMixin
+from core.pagination import KeysetPaginationMixin
 
 
-class UserListView(BasePageMixin, FilterView):
+class UserListView(BasePageMixin, KeysetPaginationMixin, FilterView):
     model = User
     template_name = "backoffice/users/list.html"
     context_object_name = "users"
     filterset_class = UserFilter
     paginate_by = 10
+    keyset_ordering = ("-pk",)
     permission_required = "auth.view_user"
     page_title = "Lista de Usuarios"
 
@@ -0,0 +1,250 @@
+"""
+Free booking slots of the barbers, computed for many barbers and days at once.
+
+A slot is a 30-minute start time inside the barber's shift that doesn't
+overlap lunch, an active appointment or a walk-in order still in progress
+(its services' duration counted from the order's creation), and that is at
+least an hour ahead when the day is today.
+
+`availability()` reads the schedules, appointments and walk-ins of every
+requested barber and day in three queries, so the storefront can inline
+the next days for all barbers and `availability_api` shares the same code.
+Both cached results are filled single-flight: a burst of visitors after
+the same barber and day (a booking link shared on social media) waits for
+one computation instead of running it once each.
+"""
+
+import hashlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from core import fastjson
+from core.apps.backoffice.dates import day_range
+from core.apps.backoffice.models import Appointment, BarberProfile, Order, WorkSchedule
+from core.cache import (
+    aget_or_compute,
+    aversioned_key,
+    get_or_compute,
+    versioned_key,
+)
+
+SLOT = timedelta(minutes=30)
+LEAD_TIME = timedelta(hours=1)
+ACTIVE_STATUSES = ["REQUESTED", "CONFIRMED", "COMPLETED"]
+
+# Same escapes as the json_script filter, for JSON inside a <script>.
+JSON_SCRIPT_ESCAPES = {ord(">"): "\\u003E", ord("<"): "\\u003C", ord("&"): "\\u0026"}
+
+# Tables the slots are computed from.
+SOURCE_MODELS = [BarberProfile, WorkSchedule, Appointment, Order]
+
+# Days inlined in the storefront page, starting today, and the most the
+# batch endpoint returns at once.
+INLINE_DAYS = 3
+MAX_BATCH_DAYS = 14
+# Writes invalidate the cached slots, but the lead time moves with the clock.
+CACHE_TIMEOUT = 60
+
+
+def day_slots(day, schedule, busy, now):
+    """
+    Free slots of one barber's `day` as "09:30 AM" strings. `busy` holds
+    naive local (start, end) datetimes; `now` is the naive local time.
+    """
+    if schedule is None:
+        return []
+
+    periods = list(busy)
+    if schedule.lunch_start and schedule.lunch_end:
+        periods.append(
+            (
+                datetime.combine(day, schedule.lunch_start),
+                datetime.combine(day, schedule.lunch_end),
+            )
+        )
+    earliest = now + LEAD_TIME if day == now.date() else None
+
+    slots = []
+    current = datetime.combine(day, schedule.start_hour)
+    end = datetime.combine(day, schedule.end_hour)
+    while current + SLOT <= end:
+        slot_end = current + SLOT
+        if (earliest is None or current >= earliest) and not any(
+            current < busy_end and slot_end > busy_start
+            for busy_start, busy_end in periods
+        ):
+            slots.append(current.strftime("%I:%M %p"))
+        current = slot_end
+    return slots
+
+
+def source_queries(barbers, days):
+    """
+    The three querysets availability is computed from: the schedules, the
+    appointments and the walk-in orders (with their services' minutes) of
+    `barbers` over `days`.
+    """
+    pks = [barber.pk for barber in barbers]
+    first_day, last_day = min(days), max(days)
+    schedules = WorkSchedule.objects.filter(
+        barber__in=pks, day_of_week__in={day.weekday() for day in days}
+    )
+    appointments = Appointment.objects.filter(
+        barber__in=pks,
+        date__gte=first_day,
+        date__lte=last_day,
+        status__in=ACTIVE_STATUSES,
+    ).values_list("barber_id", "date", "start_time", "end_time")
+    orders = (
+        Order.objects.filter(
+            created_by__in=[barber.user_id for barber in barbers],
+            status="PENDING",
+            created_at__gte=day_range(first_day)[0],
+            created_at__lt=day_range(last_day)[1],
+        )
+        .values("created_by", "created_at")
+        .annotate(
+            minutes=Sum(
+                F("items__product__duration") * F("items__quantity"),
+                filter=Q(items__product__is_service=True),
+            )
+        )
+    )
+    return schedules, appointments, orders
+
+
+def busy_periods(barbers, appointments, orders):
+    """
+    {(barber pk, day): [(start, end), ...]} from the appointment and
+    walk-in order rows of source_queries().
+    """
+    busy = defaultdict(list)
+    for barber_id, day, start, end in appointments:
+        busy[barber_id, day].append(
+            (datetime.combine(day, start), datetime.combine(day, end))
+        )
+
+    barber_by_user = {barber.user_id: barber.pk for barber in barbers}
+    for order in orders:
+        if not order["minutes"]:
+            continue
+        start = timezone.localtime(order["created_at"]).replace(tzinfo=None)
+        busy[barber_by_user[order["created_by"]], start.date()].append(
+            (start, start + timedelta(minutes=order["minutes"]))
+        )
+    return busy
+
+
+def local_now():
+    return timezone.localtime(timezone.now()).replace(tzinfo=None)
+
+
+def compute_availability(barbers, days, now, schedules, appointments, orders):
+    schedules = {
+        (schedule.barber_id, schedule.day_of_week): schedule for schedule in schedules
+    }
+    busy = busy_periods(barbers, appointments, orders)
+    result = {barber.pk: {} for barber in barbers}
+    for barber in barbers:
+        for day in days:
+            result[barber.pk][day] = day_slots(
+                day,
+                schedules.get((barber.pk, day.weekday())),
+                busy.get((barber.pk, day), ()),
+                now,
+            )
+    return result
+
+
+def availability(barbers, days):
+    """
+    {barber pk: {day: [slots]}} for `barbers` (BarberProfile instances)
+    over `days`. Past days have no slots.
+    """
+    now = local_now()
+    days = [day for day in days if day >= now.date()]
+    if not barbers or not days:
+        return {barber.pk: {} for barber in barbers}
+    rows = [list(queryset) for queryset in source_queries(barbers, days)]
+    return compute_availability(barbers, days, now, *rows)
+
+
+async def aavailability(barbers, days):
+    """availability() for async views, with the async ORM."""
+    now = local_now()
+    days = [day for day in days if day >= now.date()]
+    if not barbers or not days:
+        return {barber.pk: {} for barber in barbers}
+    rows = [
+        [row async for row in queryset] for queryset in source_queries(barbers, days)
+    ]
+    return compute_availability(barbers, days, now, *rows)
+
+
+def by_iso_day(result):
+    """availability() result with "YYYY-MM-DD" keys, for JSON."""
+    return {
+        barber_pk: {day.isoformat(): slots for day, slots in by_day.items()}
+        for barber_pk, by_day in result.items()
+    }
+
+
+async def abarber_slots(barber_id, day):
+    """Free slots of the barber `barber_id` on `day`, cached."""
+
+    async def compute():
+        barber = (
+            await BarberProfile.objects.filter(pk=barber_id).only("pk", "user_id").afirst()
+        )
+        if barber is None:
+            return []
+        return (await aavailability([barber], [day]))[barber.pk].get(day, [])
+
+    key = await aversioned_key("storefront:slots", SOURCE_MODELS, barber_id, day)
+    return await aget_or_compute(key, compute, CACHE_TIMEOUT)
+
+
+async def abatch_availability(first_day, day_count, barber_ids=None):
+    """
+    by_iso_day() availability of the active barbers (those in `barber_ids`
+    when given) for `day_count` days from `first_day`, cached.
+    """
+
+    async def compute():
+        barbers = BarberProfile.objects.filter(is_active=True).only("pk", "user_id")
+        if barber_ids:
+            barbers = barbers.filter(pk__in=barber_ids)
+        barbers = [barber async for barber in barbers.order_by("pk")]
+        days = [first_day + timedelta(days=offset) for offset in range(day_count)]
+        return by_iso_day(await aavailability(barbers, days))
+
+    ids = ",".join(map(str, sorted(barber_ids))) if barber_ids else "all"
+    key = await aversioned_key(
+        "storefront:batch", SOURCE_MODELS, first_day, day_count, ids
+    )
+    return await aget_or_compute(key, compute, CACHE_TIMEOUT)
+
+
+def inline_availability():
+    """
+    Returns (stamp, json) with the next INLINE_DAYS of availability of the
+    active barbers, cached for CACHE_TIMEOUT seconds. `json` is escaped
+    for a <script type="application/json"> element; `stamp` identifies
+    its content for ETags.
+    """
+    today = timezone.localdate()
+
+    def compute():
+        barbers = list(BarberProfile.objects.filter(is_active=True).only("pk", "user_id"))
+        days = [today + timedelta(days=offset) for offset in range(INLINE_DAYS)]
+        data = by_iso_day(availability(barbers, days))
+        content = fastjson.dumps(data).decode().translate(JSON_SCRIPT_ESCAPES)
+        return hashlib.md5(content.encode()).hexdigest(), content
+
+    key = versioned_key("storefront:availability", SOURCE_MODELS, today)
+    stamp, content = get_or_compute(key, compute, CACHE_TIMEOUT)
+    return stamp, mark_safe(content)
@@ -1,4 +1,5 @@
 from django import forms
+from core.apps.backoffice.catalog import get_catalog
 from core.apps.backoffice.models import Appointment, Product, BarberProfile
 from datetime import datetime, timedelta
 
@@ -19,25 +20,27 @@ class PublicAppointmentForm(forms.ModelForm):
             "start_time",
         ]
 
+    def clean_services(self):
+        services = self.cleaned_data['services']
+        public_ids = get_catalog().public_ids
+        if any(svc.pk not in public_ids for svc in services):
+            raise forms.ValidationError("Servicio no disponible.")
+        return services
+
     def save(self, commit=True):
         instance = super().save(commit=False)
         
         # 1. Default Status
         instance.status = 'REQUESTED'
         
-        # 2. Calculate Total & Duration
-        total = 0
-        duration_minutes = 0
-        
+        # 2. Calculate Total & Duration (from the catalog snapshot)
         # We need to save m2m after saving instance if commit=True
         # But for calculation we need access to services. 
         # Since this is a ModelForm, 'services' is in cleaned_data
         
         services = self.cleaned_data.get('services', [])
-        for svc in services:
-            total += svc.price
-            duration_minutes += svc.duration
-            
+        total, duration_minutes = get_catalog().totals(svc.pk for svc in services)
+
         instance.total_amount = total
         
         # 3. Calculate End Time
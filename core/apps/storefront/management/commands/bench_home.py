@@ -0,0 +1,73 @@
+import time as timer
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory, override_settings
+
+from core.apps.backoffice.models import BarberProfile, Category, Product
+from core.apps.storefront.views import HomeView
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide las peticiones por segundo de la portada de la tienda con y sin "
+        "la caché de página. Los datos de prueba se revierten al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--barbers", type=int, default=10)
+        parser.add_argument("--services", type=int, default=30)
+        parser.add_argument("--requests", type=int, default=500)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options["barbers"], options["services"])
+                self.run(options["requests"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, barbers, services):
+        users = User.objects.bulk_create(
+            User(username=f"bench_home_{i}", first_name="Bench") for i in range(barbers)
+        )
+        BarberProfile.objects.bulk_create(
+            BarberProfile(user=user, nickname=user.username) for user in users
+        )
+        category = Category.objects.create(name="Bench portada")
+        Product.objects.bulk_create(
+            Product(
+                name=f"Servicio bench {i}", price="25.00", duration=30,
+                category=category, is_service=True,
+            )
+            for i in range(services)
+        )
+
+    def run(self, requests):
+        factory = RequestFactory()
+        view = HomeView.as_view()
+        results = {}
+        for cached in (False, True):
+            with override_settings(PAGE_CACHE=cached):
+                cache.clear()
+                start = timer.perf_counter()
+                for _ in range(requests):
+                    request = factory.get("/")
+                    request.user = AnonymousUser()
+                    response = view(request)
+                    if hasattr(response, "render"):
+                        response.render()
+                results[cached] = requests / (timer.perf_counter() - start)
+
+        self.stdout.write(
+            f"portada  sin caché {results[False]:8.1f} req/s"
+            f"  con caché {results[True]:8.1f} req/s"
+            f"  x{results[True] / results[False]:.1f}"
+        )
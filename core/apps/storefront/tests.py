@@ -1,3 +1,345 @@
-from django.test import TestCase
+import json
+import re
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth.models import User
+from core.apps.backoffice.models import (
+    Appointment,
+    BarberProfile,
+    Category,
+    Order,
+    OrderItem,
+    Product,
+    WorkSchedule,
+)
+from core.testing import CommitOnWriteMixin
 
-# Create your tests here.
+
+class HomeConditionalGetTest(CommitOnWriteMixin, TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="barber", first_name="Luis")
+        self.barber = BarberProfile.objects.create(user=user, nickname="Lucho")
+        category = Category.objects.create(name="Cortes")
+        Product.objects.create(
+            name="Corte Clásico", price=25, category=category, is_service=True
+        )
+
+    def test_unchanged_home_answers_304(self):
+        url = reverse("storefront:home")
+        self.client.get(url)  # First visit sets the CSRF cookie.
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_barber_change_invalidates_home(self):
+        url = reverse("storefront:home")
+        self.client.get(url)
+        etag = self.client.get(url)["ETag"]
+        self.barber.nickname = "Lucho B."
+        self.barber.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Lucho B.")
+
+
+class BookingCatalogTest(CommitOnWriteMixin, TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="barber")
+        self.barber = BarberProfile.objects.create(user=user, nickname="Lucho")
+        self.day = timezone.localdate() + timedelta(days=1)
+        WorkSchedule.objects.create(
+            barber=self.barber, day_of_week=self.day.weekday(),
+            start_hour=time(9), end_hour=time(18),
+        )
+        self.category = Category.objects.create(name="Cortes")
+        self.cut = Product.objects.create(
+            name="Corte", price=25, duration=30, category=self.category, is_service=True
+        )
+        self.beard = Product.objects.create(
+            name="Barba", price=15, duration=20, category=self.category, is_service=True
+        )
+        self.wax = Product.objects.create(name="Cera", price=10)
+
+    def book(self, *services):
+        return self.client.post(
+            reverse("storefront:booking_submit"),
+            {
+                "client_name": "Ana",
+                "client_phone": "999",
+                "barber": self.barber.pk,
+                "services": [service.pk for service in services],
+                "date": self.day.isoformat(),
+                "start_time": "10:00",
+            },
+        )
+
+    def test_total_and_end_time_from_catalog(self):
+        response = self.book(self.cut, self.beard)
+        self.assertEqual(response.status_code, 200)
+        appointment = Appointment.objects.get()
+        self.assertEqual(appointment.total_amount, Decimal("40.00"))
+        self.assertEqual(appointment.end_time.strftime("%H:%M"), "10:50")
+
+    def test_price_change_is_picked_up(self):
+        self.book(self.cut)
+        self.cut.price = 30
+        self.cut.save()
+        Appointment.objects.all().delete()
+        self.book(self.cut)
+        self.assertEqual(Appointment.objects.get().total_amount, Decimal("30.00"))
+
+    def test_only_public_services_can_be_booked(self):
+        self.assertEqual(self.book(self.wax).status_code, 400)
+        self.category.status = False
+        self.category.save()
+        self.assertEqual(self.book(self.cut).status_code, 400)
+        self.assertFalse(Appointment.objects.exists())
+
+    def test_overlapping_booking_is_rejected(self):
+        self.assertEqual(self.book(self.cut).status_code, 200)
+        response = self.book(self.beard)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["success"], False)
+        self.assertEqual(Appointment.objects.count(), 1)
+
+
+class HomePageCacheTest(CommitOnWriteMixin, TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="barber", first_name="Luis")
+        self.barber = BarberProfile.objects.create(user=user, nickname="Lucho")
+        category = Category.objects.create(name="Cortes")
+        self.service = Product.objects.create(
+            name="Corte Clásico", price=25, category=category, is_service=True
+        )
+        self.url = reverse("storefront:home")
+
+    def csrf_token(self, response):
+        return re.search(
+            r"'csrfmiddlewaretoken', '([^']+)'", response.content.decode()
+        ).group(1)
+
+    def test_cached_page_skips_rendering_queries(self):
+        self.client.get(self.url)
+        # Only the version lookups of the ETag, the cache key and the
+        # inlined availability.
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertContains(response, "Lucho")
+        self.assertNotContains(response, "__live_")
+
+    def test_cached_page_carries_a_working_csrf_token(self):
+        self.client.get(self.url)
+        client = Client(enforce_csrf_checks=True)
+        response = client.get(self.url)
+        token = self.csrf_token(response)
+        response = client.post(
+            reverse("storefront:booking_submit"), {"csrfmiddlewaretoken": token}
+        )
+        # Rejected by the form, not by the CSRF check.
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["success"], False)
+
+    def test_catalog_change_invalidates(self):
+        self.client.get(self.url)
+        self.service.name = "Corte Moderno"
+        self.service.save()
+        self.assertContains(self.client.get(self.url), "Corte Moderno")
+        self.barber.nickname = "Lucho B."
+        self.barber.save()
+        self.assertContains(self.client.get(self.url), "Lucho B.")
+
+
+class InlineAvailabilityTest(CommitOnWriteMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="barber")
+        self.barber = BarberProfile.objects.create(user=self.user, nickname="Lucho")
+        self.day = timezone.localdate() + timedelta(days=1)
+        WorkSchedule.objects.create(
+            barber=self.barber, day_of_week=self.day.weekday(),
+            start_hour=time(9), end_hour=time(12),
+        )
+        category = Category.objects.create(name="Cortes")
+        self.cut = Product.objects.create(
+            name="Corte", price=25, duration=60, category=category, is_service=True
+        )
+        self.url = reverse("storefront:home")
+
+    def inline(self, response):
+        data = re.search(
+            r'<script type="application/json" id="availability-data">(.*?)</script>',
+            response.content.decode(),
+        ).group(1)
+        return json.loads(data)[str(self.barber.pk)]
+
+    def slots_api(self):
+        return self.client.get(
+            reverse("storefront:availability_api"),
+            {"barber_id": self.barber.pk, "date": self.day.isoformat()},
+        ).json()["slots"]
+
+    def test_home_inlines_the_next_days(self):
+        days = self.inline(self.client.get(self.url))
+        self.assertEqual(len(days), 3)
+        self.assertEqual(
+            days[self.day.isoformat()],
+            ["09:00 AM", "09:30 AM", "10:00 AM", "10:30 AM", "11:00 AM", "11:30 AM"],
+        )
+        self.assertEqual(days[self.day.isoformat()], self.slots_api())
+
+    def test_slots_api_writes_json_response_bytes(self):
+        response = self.client.get(
+            reverse("storefront:availability_api"),
+            {"barber_id": self.barber.pk, "date": self.day.isoformat()},
+        )
+        self.assertEqual(
+            response.content, json.dumps({"slots": self.slots_api()}).encode()
+        )
+
+    def test_appointments_and_walk_ins_block_slots(self):
+        self.assertEqual(len(self.slots_api()), 6)
+        Appointment.objects.create(
+            client_name="Ana", client_phone="999", barber=self.barber, date=self.day,
+            start_time=time(9), end_time=time(9, 30), total_amount=25,
+        )
+        order = Order.objects.create(client_name="Luis", created_by=self.user)
+        Order.objects.filter(pk=order.pk).update(
+            created_at=timezone.make_aware(datetime.combine(self.day, time(10)))
+        )
+        # Adding the item saves the order, which bumps its version.
+        OrderItem.objects.create(order=order, product=self.cut, quantity=1, unit_price=25)
+        expected = ["09:30 AM", "11:00 AM", "11:30 AM"]
+        self.assertEqual(self.slots_api(), expected)
+        self.assertEqual(self.inline(self.client.get(self.url))[self.day.isoformat()], expected)
+
+    def test_lunch_and_busy_periods_are_independent(self):
+        WorkSchedule.objects.update(lunch_start=time(11), lunch_end=time(11, 30))
+        WorkSchedule.objects.create(
+            barber=self.barber, day_of_week=(self.day.weekday() + 1) % 7,
+            start_hour=time(9), end_hour=time(10),
+        )
+        Appointment.objects.create(
+            client_name="Ana", client_phone="999", barber=self.barber,
+            date=self.day + timedelta(days=1),
+            start_time=time(9), end_time=time(9, 30), total_amount=25,
+        )
+        days = self.inline(self.client.get(self.url))
+        self.assertNotIn("11:00 AM", days[self.day.isoformat()])
+        # Without lunch the appointment still blocks its slot.
+        self.assertEqual(days[(self.day + timedelta(days=1)).isoformat()], ["09:30 AM"])
+
+    def test_batched_for_all_barbers(self):
+        for index in range(5):
+            user = User.objects.create_user(username=f"barber{index}")
+            BarberProfile.objects.create(user=user, nickname=f"B{index}")
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        availability = [
+            query["sql"] for query in queries.captured_queries
+            if "backoffice_workschedule" in query["sql"]
+            or "backoffice_appointment" in query["sql"]
+            or "backoffice_order" in query["sql"]
+        ]
+        # Schedules, appointments and walk-ins, whatever the barber count.
+        self.assertEqual(len(availability), 3)
+
+    def test_slots_api_is_cached(self):
+        self.slots_api()
+        with self.assertNumQueries(1):  # The version lookup.
+            self.assertEqual(len(self.slots_api()), 6)
+        response = self.client.get(
+            reverse("storefront:availability_api"),
+            {"barber_id": "x", "date": self.day.isoformat()},
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_api(self):
+        other = BarberProfile.objects.create(
+            user=User.objects.create_user(username="other"), nickname="Pepe"
+        )
+        url = reverse("storefront:availability_batch_api")
+        today = timezone.localdate()
+        data = self.client.get(url, {"date": today.isoformat(), "days": 3}).json()
+        availability = data["availability"]
+        self.assertEqual(set(availability), {str(self.barber.pk), str(other.pk)})
+        self.assertEqual(
+            availability[str(self.barber.pk)],
+            self.inline(self.client.get(self.url)),
+        )
+        self.assertEqual(availability[str(self.barber.pk)][self.day.isoformat()], self.slots_api())
+
+        data = self.client.get(
+            url, {"date": self.day.isoformat(), "days": 1, "barber_ids": str(self.barber.pk)}
+        ).json()
+        self.assertEqual(list(data["availability"]), [str(self.barber.pk)])
+        # Past days are left out.
+        data = self.client.get(
+            url, {"date": (today - timedelta(days=2)).isoformat(), "days": 3}
+        ).json()
+        self.assertEqual(list(data["availability"][str(self.barber.pk)]), [today.isoformat()])
+
+        for params in [
+            {}, {"date": "x"}, {"date": today.isoformat(), "days": 15},
+            {"date": today.isoformat(), "barber_ids": "1,x"},
+        ]:
+            self.assertEqual(self.client.get(url, params).status_code, 400)
+
+    def test_booking_updates_inline_slots(self):
+        self.client.get(self.url)
+        Appointment.objects.create(
+            client_name="Ana", client_phone="999", barber=self.barber, date=self.day,
+            start_time=time(9), end_time=time(9, 30), total_amount=25,
+        )
+        days = self.inline(self.client.get(self.url))
+        self.assertNotIn("09:00 AM", days[self.day.isoformat()])
+
+
+@override_settings(RATE_LIMITS={"booking": "2/min", "availability": "3/min"})
+class RateLimitTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.barber = BarberProfile.objects.create(
+            user=User.objects.create_user(username="barber"), nickname="Lucho"
+        )
+        self.day = timezone.localdate() + timedelta(days=1)
+
+    def slots(self, **extra):
+        return self.client.get(
+            reverse("storefront:availability_api"),
+            {"barber_id": self.barber.pk, "date": self.day.isoformat()},
+            **extra,
+        )
+
+    def test_availability_answers_429_before_any_query(self):
+        for _ in range(3):
+            self.assertEqual(self.slots().status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.slots()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "20")
+        # Another client has its own bucket.
+        self.assertEqual(self.slots(REMOTE_ADDR="10.0.0.2").status_code, 200)
+
+    def test_bucket_refills(self):
+        with mock.patch("core.ratelimit.time.time", return_value=1000.0):
+            for _ in range(3):
+                self.slots()
+            self.assertEqual(self.slots().status_code, 429)
+        with mock.patch("core.ratelimit.time.time", return_value=1020.0):
+            self.assertEqual(self.slots().status_code, 200)
+            self.assertEqual(self.slots().status_code, 429)
+
+    def test_booking_is_limited(self):
+        url = reverse("storefront:booking_submit")
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, {}).status_code, 400)
+        response = self.client.post(url, {})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.json()["success"], False)
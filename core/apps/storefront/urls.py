@@ -1,8 +1,9 @@
 from django.urls import path
-from core.apps.storefront.views import HomeView, BookingView, availability_api
+from core.apps.storefront.views import HomeView, BookingView, availability_api, availability_batch_api
 
 urlpatterns = [
     path("", HomeView.as_view(), name="home"),
     path("book/", BookingView.as_view(), name="booking_submit"),
     path("api/slots/", availability_api, name="availability_api"),
+    path("api/slots/batch/", availability_batch_api, name="availability_batch_api"),
 ]
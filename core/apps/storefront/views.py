@@ -1,48 +1,92 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
 from django.views.generic import TemplateView, View
 from django.http import JsonResponse
-from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.utils.functional import cached_property
 from django.core.exceptions import ValidationError
-from datetime import datetime, timedelta, time
-import json
+from datetime import datetime
 
+from core.mixins import ConditionalGetMixin, PageCacheMixin
 from core.apps.storefront.forms import PublicAppointmentForm
-from core.apps.backoffice.models import Appointment, BarberProfile, WorkSchedule, Product, Order
-
-class HomeView(TemplateView):
+from core.apps.backoffice.models import BarberProfile, Product, Category
+from core.apps.backoffice.catalog import get_catalog
+from core.apps.storefront.availability import (
+    MAX_BATCH_DAYS,
+    abarber_slots,
+    abatch_availability,
+    inline_availability,
+)
+from core.ratelimit import rate_limit
+
+class HomeView(ConditionalGetMixin, PageCacheMixin, TemplateView):
     template_name = "storefront/home.html"
+    version_models = [BarberProfile, User, Product, Category]
+    # The page embeds a CSRF token, so only the ETag (which includes the
+    # CSRF cookie) can validate it.
+    use_last_modified = False
+    # Availability changes with walk-ins and the clock, so it is filled in
+    # on every request instead of being cached with the page.
+    live_context = ["csrf_token", "availability_json"]
+
+    def get_version_parts(self):
+        return [
+            self.request.get_full_path(),
+            self.request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""),
+            self.availability[0],
+        ]
+
+    @cached_property
+    def availability(self):
+        return inline_availability()
+
+    def get_live_context(self):
+        live = super().get_live_context()
+        live["availability_json"] = self.availability[1]
+        return live
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Pass active barbers and services to the template for the initial render
-        context['barbers'] = BarberProfile.objects.filter(is_active=True)
-        # Only services (not products)
-        context['services'] = Product.objects.filter(is_service=True, category__status=True) 
+        context['barbers'] = BarberProfile.objects.filter(is_active=True).select_related('user')
+        # Only services (not products) of active categories
+        context['services'] = get_catalog().public
         return context
 
 
+@method_decorator(rate_limit("booking"), name="post")
 class BookingView(View):
-    def post(self, request, *args, **kwargs):
+    @staticmethod
+    @transaction.atomic
+    def book(data):
+        """
+        Validates and saves the booking. The form's checks read the same
+        schedules and appointments the insert depends on, so they run in
+        its transaction.
+        """
+        form = PublicAppointmentForm(data)
+        if not form.is_valid():
+            return form, None
+        return form, form.save()
+
+    async def post(self, request, *args, **kwargs):
         # We expect a standard POST form submission via AJAX
-        form = PublicAppointmentForm(request.POST)
-        if form.is_valid():
-            try:
-                appointment = form.save()
-                return JsonResponse({
-                    "success": True, 
-                    "message": "Cita solicitada con éxito.",
-                    "id": appointment.id
-                })
-            except ValidationError as e:
-                # e.messages is a list of clean strings from the ValidationError
-                return JsonResponse({
-                    "success": False, 
-                    "message": "Error de validación:", 
-                    "errors": e.messages
-                }, status=400)
-            except Exception as e:
-                return JsonResponse({"success": False, "message": str(e)}, status=400)
-        else:
+        try:
+            form, appointment = await sync_to_async(self.book)(request.POST)
+        except ValidationError as e:
+            # e.messages is a list of clean strings from the ValidationError
+            return JsonResponse({
+                "success": False, 
+                "message": "Error de validación:", 
+                "errors": e.messages
+            }, status=400)
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+        if appointment is None:
             # Extract plain text error messages for a cleaner display
             error_list = []
             for field, errors in form.errors.items():
@@ -55,8 +99,15 @@ class BookingView(View):
                 "errors": error_list
             }, status=400)
 
+        return JsonResponse({
+            "success": True, 
+            "message": "Cita solicitada con éxito.",
+            "id": appointment.id
+        })
+
 
-def availability_api(request):
+@rate_limit("availability")
+async def availability_api(request):
     """
     Returns available time slots for a specific barber and date.
     Query Params:
@@ -79,122 +130,56 @@ def availability_api(request):
     except ValueError:
         return JsonResponse({"error": "Fecha inválida"}, status=400)
 
-    # 1. Get Schedule for that day
-    # Django Weekday: 0=Monday, 6=Sunday. Python: same.
-    day_idx = query_date.weekday()
-    
-    schedule = WorkSchedule.objects.filter(barber_id=barber_id, day_of_week=day_idx).first()
-    
-    if not schedule:
-        return JsonResponse({"slots": []}) # Barber doesn't work this day
-
-    # 2. Get Existing Appointments
-    existing_appts = Appointment.objects.filter(
-        barber_id=barber_id, 
-        date=query_date,
-        status__in=['REQUESTED', 'CONFIRMED', 'COMPLETED'] # Ignore CANCELED
-    ).order_by('start_time')
-
-    # 3. Calculate Slots
-    # Logic: 
-    # - Start from StartHour
-    # - Iterate in 30min chunks (or strictly by duration? simplified to 30min start slots)
-    # - Check if slot overlaps with any existing appointment
-    # - Check if slot overlaps with lunch
-    
-    slots = []
-    
-    # Calculate Buffers
-    # 1. Start Time: Official shift start
-    start_dt = datetime.combine(query_date, schedule.start_hour)
-    
-    # 2. End Time: Official shift end (Allow bookings until the very end of the shift)
-    end_dt = datetime.combine(query_date, schedule.end_hour)
-    cutoff_time = end_dt
-    
-    current_time = start_dt
-
-    # Lunch times
-    lunch_start = None
-    lunch_end = None
-    if schedule.lunch_start and schedule.lunch_end:
-        lunch_start = datetime.combine(query_date, schedule.lunch_start)
-        lunch_end = datetime.combine(query_date, schedule.lunch_end)
-
-    while current_time + timedelta(minutes=30) <= cutoff_time:
-        slot_start = current_time
-        slot_end = current_time + timedelta(minutes=30) # Assuming min service is 30m for slot display
-        
-        is_available = True
-        
-        # Check Lunch Overlap
-        if lunch_start and lunch_end:
-            if not (slot_end <= lunch_start or slot_start >= lunch_end):
-                is_available = False
-        
-        # Check Appointment Overlap
-            # Add Order (Walk-in) Overlap Check
-            # We need to fetch active orders for this barber on this day
-            active_orders = Order.objects.filter(
-                created_by=barber_id, # Assumes barber_id passed is ID of BarberProfile, need to get User.
-                                      # Wait, availability_api gets valid 'barber_id' (BarberProfile PK).
-                                      # We need to get the User associated with this BarberProfile.
-            )
-            # Fetching barber user first
-            barber_profile = get_object_or_404(BarberProfile, pk=barber_id)
-            orders = Order.objects.filter(
-                created_by=barber_profile.user,
-                status='PENDING',
-                created_at__date=query_date
-            ).prefetch_related('items__product')
-
-            for order in orders:
-                 duration = 0
-                 for item in order.items.all():
-                     if item.product.is_service:
-                         duration += item.product.duration * item.quantity
-                 
-                 if duration > 0:
-                     o_start = timezone.localtime(order.created_at)
-                     o_end = o_start + timedelta(minutes=duration)
-                     # Using naive datetimes for comparison with slot_start/slot_end which are datetime objects
-                     # slot_start is naive (datetime.combine)
-                     # We should make o_start/o_end naive or make slot_start aware.
-                     # Since variables like 'current_time' are likely naive from datetime.combine(date, time)
-                     # let's make order times naive with same date
-                     
-                     # Actually, order.created_at includes date.
-                     # ensuring we compare apples to apples.
-                     # slot_start contains query_date.
-                     
-                     # Simple check:
-                     if slot_start < o_end.replace(tzinfo=None) and slot_end > o_start.replace(tzinfo=None):
-                         is_available = False
-                         
-            if is_available:
-                 for appt in existing_appts:
-                    appt_start = datetime.combine(query_date, appt.start_time)
-                    appt_end = datetime.combine(query_date, appt.end_time)
-                    
-                    # Strict overlap check
-                    if slot_start < appt_end and slot_end > appt_start:
-                        is_available = False
-                        break
-        
-        if is_available:
-             # Check if it's today and enforce Lead Time (1 hour buffer for confirmation)
-             if query_date == local_today:
-                 # Must be at least 1 hour in the future (Use LOCAL time)
-                 current_local_time = timezone.localtime(timezone.now())
-                 # Convert to naive to compare with slot_start (which is naive)
-                 min_booking_time = current_local_time.replace(tzinfo=None) + timedelta(minutes=60)
-                 
-                 if slot_start < min_booking_time:
-                     is_available = False
-            
-             if is_available:
-                 slots.append(slot_start.strftime("%I:%M %p"))
+    try:
+        barber_id = int(barber_id)
+    except ValueError:
+        return JsonResponse({"error": "Barbero inválido"}, status=400)
+
+    return JsonResponse({"slots": await abarber_slots(barber_id, query_date)})
 
-        current_time += timedelta(minutes=30)
 
-    return JsonResponse({"slots": slots})
\ No newline at end of file
+@rate_limit("availability")
+async def availability_batch_api(request):
+    """
+    Returns the available time slots of several barbers over several days,
+    keyed by barber id and date.
+    Query Params:
+    - date: YYYY-MM-DD, the first day
+    - days: int, 7 by default and at most MAX_BATCH_DAYS
+    - barber_ids: comma-separated ints, all active barbers by default
+    """
+    date_str = request.GET.get('date')
+    if not date_str:
+        return JsonResponse({"error": "Faltan parámetros"}, status=400)
+
+    try:
+        first_day = datetime.strptime(date_str, "%Y-%m-%d").date()
+    except ValueError:
+        return JsonResponse({"error": "Fecha inválida"}, status=400)
+
+    try:
+        days = int(request.GET.get('days', 7))
+    except ValueError:
+        return JsonResponse({"error": "Número de días inválido"}, status=400)
+    if not 1 <= days <= MAX_BATCH_DAYS:
+        return JsonResponse({"error": "Número de días inválido"}, status=400)
+
+    try:
+        barber_ids = [
+            int(barber_id)
+            for barber_id in request.GET.get('barber_ids', '').split(',')
+            if barber_id.strip()
+        ]
+    except ValueError:
+        return JsonResponse({"error": "Barbero inválido"}, status=400)
+
+    # Past days have no slots; skip them (Use LOCAL time, not UTC)
+    local_today = timezone.localtime(timezone.now()).date()
+    if first_day < local_today:
+        days -= (local_today - first_day).days
+        first_day = local_today
+    if days <= 0:
+        return JsonResponse({"availability": {}})
+
+    availability = await abatch_availability(first_day, days, barber_ids)
+    return JsonResponse({"availability": availability})
@@ -0,0 +1,25 @@
+"""
+Versioned caching for the whole project.
+
+Keys built with `versioned_key()` embed the current version of the tables
+their data comes from. The post_save/post_delete signals of the versioned
+models (core.apps.backoffice.signals) bump those versions, so any write
+orphans the entries built from the old data and nothing has to be deleted
+by hand. `cached_result` and `cached_fragment` apply it to functions and
+views. `get_or_compute` fills a key once for all the concurrent requests
+that miss it (single-flight). The `a`-prefixed functions are the same for
+async views.
+"""
+
+from core.cache.decorators import cached_fragment, cached_result
+from core.cache.flight import aget_or_compute, get_or_compute
+from core.cache.keys import aversioned_key, versioned_key
+
+__all__ = [
+    "aget_or_compute",
+    "aversioned_key",
+    "cached_fragment",
+    "cached_result",
+    "get_or_compute",
+    "versioned_key",
+]
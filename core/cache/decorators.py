@@ -0,0 +1,70 @@
+import functools
+
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.http import HttpResponse
+
+from core.cache.keys import versioned_key
+
+_missing = object()
+
+
+def cached_result(models, timeout=DEFAULT_TIMEOUT, name=None):
+    """
+    Caches what the decorated function returns for each set of arguments
+    until one of `models` changes or `timeout` seconds pass (the cache's
+    TIMEOUT by default). The result must be picklable, so return lists
+    rather than querysets. The undecorated function stays available as
+    `.uncached`.
+    """
+
+    def decorator(func):
+        key_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = versioned_key(key_name, models, *args, *sorted(kwargs.items()))
+            result = cache.get(key, _missing)
+            if result is _missing:
+                result = func(*args, **kwargs)
+                cache.set(key, result, timeout)
+            return result
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
+
+
+def cached_fragment(models, timeout=DEFAULT_TIMEOUT, name=None):
+    """
+    Caches the body of a function view answering GET requests with a page
+    fragment (a partial template, a JSON snippet) per full path, until one
+    of `models` changes or `timeout` seconds pass. Only 200 responses are
+    kept, so errors are always rendered again.
+    """
+
+    def decorator(view):
+        key_name = name or f"fragment.{view.__module__}.{view.__qualname__}"
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+
+            key = versioned_key(key_name, models, request.get_full_path())
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+
+            response = view(request, *args, **kwargs)
+            if hasattr(response, "render"):
+                response.render()
+            if response.status_code == 200 and not response.streaming:
+                cache.set(key, (response.content, response["Content-Type"]), timeout)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,190 @@
+import asyncio
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+
+# How long a worker may hold the computation of a key before the others
+# stop waiting for it, and how often they look for its result meanwhile.
+LOCK_TIMEOUT = 10
+POLL_INTERVAL = 0.05
+
+_missing = object()
+
+
+class Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs one call per key at a time within the process: threads asking for
+    a key already being computed wait for that call and share its result
+    (or its exception).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, func):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines. The first call runs `func()` as a task of
+    its own that every caller awaits through shield(), so a cancelled
+    caller (a client that went away) doesn't cancel it for the others.
+    Calls are tracked per event loop, since a task belongs to the loop
+    that created it.
+    """
+
+    def __init__(self):
+        self.calls = {}
+
+    async def do(self, key, func):
+        call_key = (id(asyncio.get_running_loop()), key)
+        task = self.calls.get(call_key)
+        if task is None:
+            task = self.calls[call_key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda task: self.finish(call_key, task))
+        return await asyncio.shield(task)
+
+    def finish(self, call_key, task):
+        if self.calls.get(call_key) is task:
+            del self.calls[call_key]
+        if not task.cancelled():
+            # Every caller may be gone; don't log it as never retrieved.
+            task.exception()
+
+
+flights = SingleFlight()
+async_flights = AsyncSingleFlight()
+
+
+def release(lock_key, token):
+    # Once the lock has expired another worker may hold it; leave theirs.
+    # (get then delete isn't atomic, but narrows the window to two calls.)
+    if cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+async def arelease(lock_key, token):
+    if await cache.aget(lock_key) == token:
+        await cache.adelete(lock_key)
+
+
+def compute_once(key, compute, timeout):
+    """
+    Computes `key` in one worker at a time: the worker that takes the lock
+    in the cache computes and stores the value, the others poll for it. If
+    the holder takes longer than LOCK_TIMEOUT, they compute it themselves.
+    """
+    lock_key = f"{key}:lock"
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, LOCK_TIMEOUT):
+        try:
+            value = compute()
+            cache.set(key, value, timeout)
+            return value
+        finally:
+            release(lock_key, token)
+
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        value = cache.get(key, _missing)
+        if value is not _missing:
+            return value
+        if cache.get(lock_key) is None:
+            break
+    value = compute()
+    cache.set(key, value, timeout)
+    return value
+
+
+def get_or_compute(key, compute, timeout):
+    """
+    Returns the cached value of `key`, computing it on a miss with
+    `compute()` once for all the concurrent requests for the same key:
+    within the process through SingleFlight, across workers through a lock
+    in the cache.
+    """
+    value = cache.get(key, _missing)
+    if value is not _missing:
+        return value
+
+    def fill():
+        # The previous holder may have stored it while this one waited.
+        value = cache.get(key, _missing)
+        if value is not _missing:
+            return value
+        return compute_once(key, compute, timeout)
+
+    return flights.do(key, fill)
+
+
+async def acompute_once(key, compute, timeout):
+    """compute_once() for async views; `compute` is a coroutine function."""
+    lock_key = f"{key}:lock"
+    token = uuid.uuid4().hex
+    if await cache.aadd(lock_key, token, LOCK_TIMEOUT):
+        try:
+            value = await compute()
+            await cache.aset(key, value, timeout)
+            return value
+        finally:
+            await arelease(lock_key, token)
+
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(POLL_INTERVAL)
+        value = await cache.aget(key, _missing)
+        if value is not _missing:
+            return value
+        if await cache.aget(lock_key) is None:
+            break
+    value = await compute()
+    await cache.aset(key, value, timeout)
+    return value
+
+
+async def aget_or_compute(key, compute, timeout):
+    """get_or_compute() for async views; `compute` is a coroutine function."""
+    value = await cache.aget(key, _missing)
+    if value is not _missing:
+        return value
+
+    async def fill():
+        value = await cache.aget(key, _missing)
+        if value is not _missing:
+            return value
+        return await acompute_once(key, compute, timeout)
+
+    return await async_flights.do(key, fill)
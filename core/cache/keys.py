@@ -0,0 +1,29 @@
+import hashlib
+
+from core.apps.backoffice.versioning import acache_stamp, cache_stamp
+
+# Longer keys are hashed; memcached rejects keys over 250 characters and
+# long keys only waste memory elsewhere.
+MAX_KEY_LENGTH = 200
+
+
+def versioned_key(name, models, *parts):
+    """
+    Cache key for `name` that stays valid while none of `models` changes.
+    `parts` (a path, the arguments of a call, ...) tell apart the entries
+    under the same name; they are turned into strings, so they must render
+    the same way every time.
+    """
+    return build_key(name, cache_stamp(*models), parts)
+
+
+async def aversioned_key(name, models, *parts):
+    """versioned_key() for async views."""
+    return build_key(name, await acache_stamp(*models), parts)
+
+
+def build_key(name, stamp, parts):
+    key = ":".join([name, stamp, *(str(part) for part in parts)])
+    if len(key) > MAX_KEY_LENGTH:
+        key = f"{name}:{hashlib.md5(key.encode()).hexdigest()}"
+    return key
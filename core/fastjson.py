@@ -0,0 +1,132 @@
+"""
+JSON encoding backed by orjson when it is installed, with the standard
+library as a fallback. Both give the same bytes: `json.dumps` with compact
+separators and `ensure_ascii=False` for the encoder class passed in, with
+floats written the way orjson writes them (`1e-7`, `1e16`, NaN and
+Infinity as null).
+"""
+
+import json
+import math
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Datetimes go through the encoder's default() so their format (Z suffix,
+# millisecond precision, ...) stays exactly the one the encoder defines.
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson else 0
+)
+
+
+def float_str(value):
+    """orjson's spelling of a float, from Python's shortest repr."""
+    if not math.isfinite(value):
+        return "null"
+    mantissa, _, exponent = float.__repr__(value).partition("e")
+    if not exponent:
+        return mantissa
+    if int(exponent) == -5:
+        # Python switches to exponents one power of ten earlier.
+        digits = mantissa.lstrip("-").replace(".", "")
+        return f"{'-' if value < 0 else ''}0.0000{digits}"
+    return f"{mantissa}e{int(exponent)}"
+
+
+def key_str(key):
+    """The string `json.dumps` makes of a dict key."""
+    if isinstance(key, str):
+        return key
+    if isinstance(key, float):
+        return float_str(key)
+    if isinstance(key, bool) or key is None:
+        return json.dumps(key)
+    if isinstance(key, int):
+        return int.__repr__(key)
+    raise TypeError(
+        f"keys must be str, int, float, bool or None, not {type(key).__name__}"
+    )
+
+
+def iterencode(value, default):
+    """
+    Compact, non-ASCII-escaped JSON chunks for `value`, in the same order of
+    type checks as the standard library encoder. The stdlib encoders always
+    write floats with repr(), so the structure is walked here instead.
+    """
+    if isinstance(value, str):
+        yield json.dumps(value, ensure_ascii=False)
+    elif value is None:
+        yield "null"
+    elif value is True:
+        yield "true"
+    elif value is False:
+        yield "false"
+    elif isinstance(value, int):
+        yield int.__repr__(value)
+    elif isinstance(value, float):
+        yield float_str(value)
+    elif isinstance(value, (list, tuple)):
+        yield "["
+        for index, item in enumerate(value):
+            if index:
+                yield ","
+            yield from iterencode(item, default)
+        yield "]"
+    elif isinstance(value, dict):
+        yield "{"
+        for index, (key, item) in enumerate(value.items()):
+            if index:
+                yield ","
+            yield json.dumps(key_str(key), ensure_ascii=False)
+            yield ":"
+            yield from iterencode(item, default)
+        yield "}"
+    else:
+        yield from iterencode(default(value), default)
+
+
+def stdlib_dumps(data, encoder):
+    return "".join(iterencode(data, encoder().default)).encode()
+
+
+def dumps(data, encoder=DjangoJSONEncoder):
+    """
+    Serializes `data` to UTF-8 bytes. Values orjson can't handle on its own
+    (integers beyond 64 bits, lone surrogates, ...) are retried with the
+    standard library so the result never depends on which backend ran.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=encoder().default, option=ORJSON_OPTIONS)
+        except TypeError:
+            pass
+    return stdlib_dumps(data, encoder)
+
+
+def loads(content):
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+class FastJsonResponse(HttpResponse):
+    """
+    JsonResponse that encodes with `dumps()`. Same arguments, but the body
+    is compact and not ASCII-escaped, so it isn't byte-for-byte the same:
+    use it only for responses whose clients don't depend on those bytes.
+    """
+
+    def __init__(self, data, encoder=DjangoJSONEncoder, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                "In order to allow non-dict objects to be serialized set the "
+                "safe parameter to False."
+            )
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=dumps(data, encoder), **kwargs)
@@ -1,4 +1,11 @@
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.middleware.csrf import get_token
+from core.apps.backoffice.exports import export_response, filter_data
+from core.apps.backoffice.versioning import conditional_response
+from core.cache import versioned_key
 
 
 class BasePageMixin(LoginRequiredMixin, PermissionRequiredMixin):
@@ -12,3 +19,111 @@ class BasePageMixin(LoginRequiredMixin, PermissionRequiredMixin):
         context = super().get_context_data(**kwargs)
         context["page_title"] = self.page_title
         return context
+
+
+class ConditionalGetMixin:
+    """
+    Mixin que responde 304 Not Modified mientras no cambie la versión de
+    las tablas en `version_models`, sin evaluar ninguna consulta.
+    """
+
+    version_models = []
+    use_last_modified = True
+
+    def get_version_parts(self):
+        return [self.request.get_full_path()]
+
+    def dispatch(self, request, *args, **kwargs):
+        parent = super().dispatch
+        if request.method not in ("GET", "HEAD"):
+            return parent(request, *args, **kwargs)
+        return conditional_response(
+            request,
+            self.version_models,
+            self.get_version_parts(),
+            lambda: parent(request, *args, **kwargs),
+            use_last_modified=self.use_last_modified,
+        )
+
+
+class PageCacheMixin:
+    """
+    Mixin para TemplateView que guarda en caché la página renderizada para
+    visitantes anónimos, bajo la versión de las tablas en `version_models`:
+    cualquier cambio en ellas la invalida. Las variables de `live_context`
+    (el token CSRF por defecto) se renderizan como marcadores que se
+    reemplazan por los valores de `get_live_context()` al servirla.
+    """
+
+    version_models = []
+    page_cache_timeout = 60 * 60
+    live_context = ["csrf_token"]
+
+    def get_page_cache_key(self):
+        # La página no depende del query string (?utm_...=).
+        return versioned_key("page", self.version_models, self.request.path)
+
+    def get_live_context(self):
+        """
+        Valores de `live_context` para esta petición. Se insertan tal cual
+        en la página, así que deben venir ya escapados.
+        """
+        # get_token() también hace que el middleware envíe la cookie CSRF.
+        return {"csrf_token": get_token(self.request)}
+
+    def live_placeholder(self, name):
+        return f"__live_{name}__"
+
+    def get(self, request, *args, **kwargs):
+        if not settings.PAGE_CACHE or request.user.is_authenticated:
+            return super().get(request, *args, **kwargs)
+
+        key = self.get_page_cache_key()
+        content = cache.get(key)
+        if content is None:
+            self.caching_page = True
+            response = super().get(request, *args, **kwargs)
+            content = response.render().content
+            cache.set(key, content, self.page_cache_timeout)
+
+        for name, value in self.get_live_context().items():
+            content = content.replace(
+                self.live_placeholder(name).encode(), str(value).encode()
+            )
+        return HttpResponse(content)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if getattr(self, "caching_page", False):
+            context.update({name: self.live_placeholder(name) for name in self.live_context})
+        else:
+            live = self.get_live_context()
+            live.pop("csrf_token", None)
+            context.update(live)
+        return context
+
+
+class ExportMixin:
+    """
+    Mixin para un FilterView que, en lugar de renderizar la lista, descarga
+    las filas filtradas como CSV o NDJSON (`?output=ndjson`) en streaming.
+    """
+
+    export = None
+
+    def get_filterset_kwargs(self, filterset_class):
+        kwargs = super().get_filterset_kwargs(filterset_class)
+        kwargs["data"] = filter_data(self.request.GET, filterset_class)
+        return kwargs
+
+    def get(self, request, *args, **kwargs):
+        self.filterset = self.get_filterset(self.get_filterset_class())
+        if self.filterset.is_valid() or not self.get_strict():
+            queryset = self.filterset.qs
+        else:
+            queryset = self.filterset.queryset.none()
+
+        response = export_response(request, self.export, queryset)
+        if response is None:
+            return HttpResponseBadRequest("Formato de exportación no soportado.")
+        return response
@@ -0,0 +1,206 @@
+"""
+Pagination for the backoffice lists without a COUNT(*) over the whole table.
+
+`CappedPaginator` counts at most up to the requested page (or `count_cap`
+rows) with a COUNT over a LIMITed subquery. `KeysetPaginationMixin` adds
+cursor-based "Siguiente" navigation, which doesn't use OFFSET, so large
+tables are walked at a constant cost per page.
+"""
+
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db import models
+from django.db.models import F, Func, Q, Value
+from django.db.models.lookups import GreaterThan, LessThan
+from django.http import Http404
+from django.utils.functional import cached_property
+
+CURSOR_SALT = "core.pagination"
+
+
+class CappedPage(Page):
+    is_keyset = False
+    next_cursor = None
+
+    def has_next(self):
+        return super().has_next() or (
+            self.paginator.has_more and self.number == self.paginator.num_pages
+        )
+
+    def next_page_number(self):
+        # Past the counted pages the paginator counts further on request.
+        if self.paginator.has_more and self.number == self.paginator.num_pages:
+            return self.number + 1
+        return super().next_page_number()
+
+
+class CappedPaginator(Paginator):
+    """
+    Paginator whose `count` stops at `count_cap` rows, or at as many as it
+    takes to reach the requested page. `has_more` means there are more rows
+    than were counted; the template shows them as "1000+".
+    """
+
+    count_cap = 1000
+
+    def __init__(self, *args, count_cap=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if count_cap is not None:
+            self.count_cap = count_cap
+        self.requested = 1
+        self.has_more = False
+
+    def validate_number(self, number):
+        try:
+            self.requested = max(int(number), 1)
+        except (TypeError, ValueError):
+            pass
+        return super().validate_number(number)
+
+    @cached_property
+    def count(self):
+        limit = max(self.count_cap, self.requested * self.per_page) + 1
+        object_list = self.object_list
+        if hasattr(object_list, "order_by"):
+            counted = object_list.order_by()[:limit].count()
+        else:
+            counted = len(object_list[:limit])
+        self.has_more = counted == limit
+        return min(counted, limit - 1)
+
+    @property
+    def count_display(self):
+        return f"{self.count}+" if self.has_more else str(self.count)
+
+    def _get_page(self, *args, **kwargs):
+        return CappedPage(*args, **kwargs)
+
+
+class KeysetPage:
+    """A page read from a cursor: it only knows whether more rows follow."""
+
+    is_keyset = True
+
+    def __init__(self, object_list, position, next_cursor):
+        self.object_list = object_list
+        self.position = position
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return True
+
+    def start_index(self):
+        return self.position + 1
+
+
+class Row(Func):
+    """SQL row value `(a, b, ...)`; rows compare column by column."""
+
+    function = ""
+    output_field = models.Field()
+
+
+def keyset_q(ordering, values):
+    """
+    Filter for the rows that come after `values` in `ordering` (field names,
+    "-" for descending).
+
+    When every field runs the same way this is a row comparison,
+    `(a, b) < (x, y)`, which the database can answer with a seek on the
+    composite index. Mixed directions can't be written as one, so they get
+    the equivalent OR chain: `a < x OR (a = x AND b > y) ...`.
+    """
+    descending = {field.startswith("-") for field in ordering}
+    if len(descending) == 1:
+        lookup = LessThan if descending.pop() else GreaterThan
+        return lookup(
+            Row(*(F(field.lstrip("-")) for field in ordering)),
+            Row(*(Value(value) for value in values)),
+        )
+
+    q = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        q |= Q(**equal, **{f"{name}__{lookup}": value})
+        equal[name] = value
+    return q
+
+
+class KeysetPaginationMixin:
+    """
+    ListView/FilterView mixin that paginates with CappedPaginator and, when
+    `keyset_ordering` is set (it must end with the pk to be unique), links
+    "Siguiente" to a signed `?cursor=` instead of an OFFSET.
+    """
+
+    paginator_class = CappedPaginator
+    keyset_ordering = None
+    cursor_kwarg = "cursor"
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.keyset_ordering:
+            queryset = queryset.order_by(*self.keyset_ordering)
+        return queryset
+
+    def paginate_queryset(self, queryset, page_size):
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        if cursor and self.keyset_ordering:
+            page = self.keyset_page(queryset, page_size, cursor)
+            return (None, page, page.object_list, True)
+
+        paginator, page, object_list, is_paginated = super().paginate_queryset(
+            queryset, page_size
+        )
+        if page is not None and self.keyset_ordering and paginator.has_more:
+            page.next_cursor = self.make_cursor(
+                page.object_list[len(page.object_list) - 1], page.end_index()
+            )
+        return paginator, page, object_list, is_paginated
+
+    def keyset_page(self, queryset, page_size, cursor):
+        try:
+            values, position = self.read_cursor(queryset.model, cursor)
+        except (signing.BadSignature, ValidationError, TypeError, ValueError):
+            raise Http404("Cursor inválido.")
+
+        rows = list(
+            queryset.filter(keyset_q(self.keyset_ordering, values))[: page_size + 1]
+        )
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = self.make_cursor(rows[-1], position + page_size)
+        return KeysetPage(rows, position, next_cursor)
+
+    def keyset_fields(self, model):
+        for field in self.keyset_ordering:
+            name = field.lstrip("-")
+            yield name, model._meta.pk if name == "pk" else model._meta.get_field(name)
+
+    def make_cursor(self, obj, position):
+        values = []
+        for name, field in self.keyset_fields(type(obj)):
+            value = getattr(obj, field.attname)
+            values.append(value.isoformat() if hasattr(value, "isoformat") else value)
+        return signing.dumps([values, position], salt=CURSOR_SALT)
+
+    def read_cursor(self, model, cursor):
+        values, position = signing.loads(cursor, salt=CURSOR_SALT)
+        fields = list(self.keyset_fields(model))
+        if len(values) != len(fields):
+            raise ValueError(cursor)
+        values = [field.to_python(value) for (_, field), value in zip(fields, values)]
+        return values, int(position)
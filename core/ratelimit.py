@@ -0,0 +1,138 @@
+"""
+Token-bucket rate limiting with the buckets kept in the cache.
+
+Each route names a bucket in `settings.RATE_LIMITS` ("10/min" holds up to
+10 requests and refills at 10 per minute). Clients are told apart by API
+key, user or IP (see `client_ident`). `rate_limit` guards Django views and
+answers 429 with Retry-After before the view runs; the DRF throttle in
+core.api.throttling takes from the same buckets.
+
+Reading and writing a bucket are two cache calls, not an atomic update, so
+concurrent requests may occasionally slip one extra request through.
+"""
+
+import functools
+import math
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+
+from core.fastjson import FastJsonResponse
+
+PERIODS = {"s": 1, "sec": 1, "min": 60, "h": 60 * 60, "hour": 60 * 60, "day": 60 * 60 * 24}
+
+
+def parse_rate(rate):
+    """Returns (capacity, tokens per second) for a "N/period" rate."""
+    count, period = rate.split("/")
+    return int(count), int(count) / PERIODS[period]
+
+
+class TokenBucket:
+    def __init__(self, name):
+        self.name = name
+        self.capacity, self.refill = parse_rate(settings.RATE_LIMITS[name])
+
+    def cache_key(self, ident):
+        return f"ratelimit:{self.name}:{ident}"
+
+    @property
+    def timeout(self):
+        # Once full again the bucket is the same as a missing one.
+        return math.ceil(self.capacity / self.refill) + 1
+
+    def refilled(self, state, now):
+        """
+        Returns the bucket `state` after refilling until `now` and taking a
+        token if there is one, plus the seconds to wait when there isn't.
+        """
+        tokens, updated = state or (self.capacity, now)
+        tokens = min(self.capacity, tokens + (now - updated) * self.refill)
+        if tokens >= 1:
+            return (tokens - 1, now), 0
+        return (tokens, now), (1 - tokens) / self.refill
+
+    def take(self, ident):
+        """
+        Takes a token for `ident`. Returns 0 when the request may go on,
+        otherwise the seconds until a token is available.
+        """
+        key = self.cache_key(ident)
+        state, retry_after = self.refilled(cache.get(key), time.time())
+        cache.set(key, state, self.timeout)
+        return retry_after
+
+    async def atake(self, ident):
+        """take() for async views."""
+        key = self.cache_key(ident)
+        state, retry_after = self.refilled(await cache.aget(key), time.time())
+        await cache.aset(key, state, self.timeout)
+        return retry_after
+
+
+def client_ip(request):
+    header = settings.RATE_LIMIT_IP_HEADER
+    if header and request.META.get(header):
+        # The proxy appends the address it saw last.
+        return request.META[header].split(",")[-1].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def client_ident(request, user=None, api_key=None):
+    """
+    API key prefix, user id or IP. `user` is only passed once it is
+    authenticated (DRF); plain views go by IP so that no session or user
+    query runs before the limit is checked.
+    """
+    if api_key:
+        return f"key:{api_key}"
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{client_ip(request)}"
+
+
+def too_many_requests(retry_after):
+    response = FastJsonResponse(
+        {
+            "success": False,
+            "message": "Demasiadas solicitudes. Intenta nuevamente en unos segundos.",
+        },
+        status=429,
+    )
+    response["Retry-After"] = str(math.ceil(retry_after))
+    return response
+
+
+def rate_limit(name):
+    """
+    Limits the decorated view to the `name` bucket per client. Works on
+    sync and async views; use method_decorator on the handler methods of
+    class-based views.
+    """
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+
+            @functools.wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if settings.RATE_LIMITS.get(name):
+                    retry_after = await TokenBucket(name).atake(client_ident(request))
+                    if retry_after:
+                        return too_many_requests(retry_after)
+                return await view(request, *args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if settings.RATE_LIMITS.get(name):
+                retry_after = TokenBucket(name).take(client_ident(request))
+                if retry_after:
+                    return too_many_requests(retry_after)
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
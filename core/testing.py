@@ -0,0 +1,93 @@
+from unittest import mock
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+
+def run_now(func, using=None, robust=False):
+    func()
+
+
+class CommitOnWriteMixin:
+    """
+    TestCase mixin that runs on_commit callbacks as soon as they are
+    registered, as if every write committed right away. TestCase never
+    commits, so tests of caches keyed on table versions need it to see the
+    bumps (see core/apps/backoffice/versioning.py).
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        patcher = mock.patch.object(transaction, "on_commit", run_now)
+        patcher.start()
+        cls.addClassCleanup(patcher.stop)
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin that checks a list endpoint runs a constant number of
+    queries no matter how many rows it returns.
+    """
+
+    query_budget_sizes = (1, 10, 100)
+
+    def assertConstantQueries(self, url, make_rows, sizes=None):
+        """
+        Grows the dataset to each size in `sizes` using `make_rows(count)`
+        (which must create `count` new rows) and requests `url` after each
+        step. Fails if the query count changes between sizes.
+        """
+        counts = {}
+        created = 0
+        for size in sizes or self.query_budget_sizes:
+            make_rows(size - created)
+            created = size
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            counts[size] = len(ctx.captured_queries)
+
+        self.assertEqual(
+            len(set(counts.values())),
+            1,
+            f"Query count grows with the number of rows for {url}: {counts}",
+        )
+        return counts
+
+
+class QueryPlanMixin:
+    """
+    TestCase mixin that runs EXPLAIN on the SELECTs issued while calling a
+    function, to check the real ORM queries of a view hit an index.
+    """
+
+    def capture_plans(self, func):
+        """Calls `func()` and returns a list of (sql, plan text) pairs."""
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+
+        plans = []
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # Test tables are tiny; make the planner show index usage.
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                prefix = "EXPLAIN "
+            else:
+                prefix = "EXPLAIN QUERY PLAN "
+            for query in ctx.captured_queries:
+                sql = query["sql"]
+                if not sql.lstrip().upper().startswith("SELECT"):
+                    continue
+                cursor.execute(prefix + sql)
+                plan = "\n".join(" ".join(map(str, row)) for row in cursor.fetchall())
+                plans.append((sql, plan))
+        return plans
+
+    def assertIndexUsed(self, plans, index_name):
+        used = [sql for sql, plan in plans if index_name in plan]
+        self.assertTrue(
+            used,
+            f"No query used {index_name}. Plans:\n"
+            + "\n\n".join(f"{sql}\n{plan}" for sql, plan in plans),
+        )
@@ -91,6 +91,12 @@ DATABASES = {
 }
 
 
+# Authentication
+
+# ModelBackend with each user's permissions cached across requests.
+AUTHENTICATION_BACKENDS = ["core.apps.backoffice.backends.CachedPermissionBackend"]
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -142,3 +148,79 @@ STATICFILES_DIRS = [BASE_DIR / "static"]
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+
+
+# Cache
+
+# "locmem" keeps a cache per process, "file" shares it between the processes
+# of one host and "redis" between hosts (needs the redis package). Entries
+# are keyed by table versions (see core.cache), so no backend serves stale
+# data after a write.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "locmem")
+CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "barbershop",
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("CACHE_LOCATION", str(BASE_DIR / ".cache")),
+    },
+    "redis": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("CACHE_LOCATION", "redis://127.0.0.1:6379/1"),
+    },
+}
+CACHES = {
+    "default": {
+        **CACHE_BACKENDS[CACHE_BACKEND],
+        "KEY_PREFIX": "barbershop",
+        "TIMEOUT": int(os.getenv("CACHE_TIMEOUT", "300")),
+    }
+}
+
+
+# API
+
+REST_FRAMEWORK = {
+    # Basic auth hashes the password on every request; it stays for the
+    # integrations that haven't moved to API keys yet.
+    "DEFAULT_AUTHENTICATION_CLASSES": [
+        "core.api.authentication.ApiKeyAuthentication",
+        "rest_framework.authentication.SessionAuthentication",
+        "rest_framework.authentication.BasicAuthentication",
+    ],
+    "DEFAULT_THROTTLE_CLASSES": ["core.api.throttling.BucketThrottle"],
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "core.api.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
+
+# Build read-only list responses from values() rows instead of serializers.
+API_FAST_LIST = os.getenv("API_FAST_LIST", "False") == "True"
+
+
+# Rate limiting
+
+# Token buckets per route ("N/period": N requests of burst, refilled at N
+# per period), kept in the cache. See core.ratelimit.
+RATE_LIMITS = {
+    "booking": os.getenv("RATE_LIMIT_BOOKING", "10/min"),
+    "availability": os.getenv("RATE_LIMIT_AVAILABILITY", "120/min"),
+    "api": os.getenv("RATE_LIMIT_API", "600/min"),
+}
+# Behind a reverse proxy, the META key with the client address
+# (e.g. "HTTP_X_FORWARDED_FOR"); REMOTE_ADDR otherwise.
+RATE_LIMIT_IP_HEADER = os.getenv("RATE_LIMIT_IP_HEADER", "")
+
+
+# Storefront
+
+# Cache the rendered storefront pages for anonymous visitors.
+PAGE_CACHE = os.getenv("PAGE_CACHE", "True") == "True"